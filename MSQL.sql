@@ -15,7 +15,8 @@ id INT AUTO_INCREMENT PRIMARY KEY,
 name VARCHAR(255) NOT NULL,
 domain VARCHAR(255) NOT NULL,
 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP
+updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+INDEX ix_enemies_domain (domain)
 );
 
 CREATE TABLE product_crawls (
@@ -23,18 +24,64 @@ id INT AUTO_INCREMENT PRIMARY KEY,
 prod_id INT NOT NULL,
 enemy_id INT NOT NULL,
 link TEXT NOT NULL,
+link_hash CHAR(64) NOT NULL,
 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+INDEX ix_product_crawls_link_hash (link_hash),
 FOREIGN KEY (prod_id) REFERENCES products(id) ON DELETE CASCADE,
 FOREIGN KEY (enemy_id) REFERENCES enemies(id) ON DELETE CASCADE
 );
 
+CREATE TABLE crawl_payloads (
+id INT AUTO_INCREMENT PRIMARY KEY,
+hash CHAR(64) NOT NULL UNIQUE,
+data_compressed MEDIUMBLOB NOT NULL,
+size INT NOT NULL,
+created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+);
+
 CREATE TABLE product_crawl_logs (
 id INT AUTO_INCREMENT PRIMARY KEY,
 product_crawl_id INT NOT NULL,
 name VARCHAR(255) NOT NULL,
 price DECIMAL(12,2),
 timestamp DATETIME DEFAULT CURRENT_TIMESTAMP,
-other_data JSON,
+payload_id INT,
+last_seen_at DATETIME,
+observation_count INT NOT NULL DEFAULT 1,
+INDEX ix_product_crawl_logs_crawl_timestamp (product_crawl_id, timestamp),
+FOREIGN KEY (product_crawl_id) REFERENCES product_crawls(id) ON DELETE CASCADE,
+FOREIGN KEY (payload_id) REFERENCES crawl_payloads(id)
+);
+
+CREATE TABLE product_crawl_log_rollups (
+id INT AUTO_INCREMENT PRIMARY KEY,
+product_crawl_id INT NOT NULL,
+granularity VARCHAR(10) NOT NULL,
+bucket_start DATETIME NOT NULL,
+first_at DATETIME NOT NULL,
+last_at DATETIME NOT NULL,
+first_price DECIMAL(12,2),
+last_price DECIMAL(12,2),
+min_price DECIMAL(12,2),
+max_price DECIMAL(12,2),
+count INT NOT NULL,
+last_name VARCHAR(255),
+UNIQUE KEY uq_product_crawl_log_rollups_bucket (product_crawl_id, granularity, bucket_start),
 FOREIGN KEY (product_crawl_id) REFERENCES product_crawls(id) ON DELETE CASCADE
-);
\ No newline at end of file
+);
+
+CREATE TABLE product_crawl_variant_prices (
+id INT AUTO_INCREMENT PRIMARY KEY,
+product_crawl_id INT NOT NULL,
+log_id INT,
+variant_type VARCHAR(10) NOT NULL,
+variant_key VARCHAR(255) NOT NULL,
+variant_label VARCHAR(255),
+price DECIMAL(12,2) NOT NULL,
+timestamp DATETIME NOT NULL,
+INDEX ix_variant_prices_key_price (variant_key, price),
+INDEX ix_variant_prices_crawl_key_timestamp (product_crawl_id, variant_key, timestamp),
+FOREIGN KEY (product_crawl_id) REFERENCES product_crawls(id) ON DELETE CASCADE,
+FOREIGN KEY (log_id) REFERENCES product_crawl_logs(id) ON DELETE SET NULL
+);
@@ -19,13 +19,22 @@ def create_app():
     
     # Initialize extensions with app
     db.init_app(app)
+    from NewApp.db_pool import install_pool_metrics
+    with app.app_context():
+        install_pool_metrics(db.engine)
     migrate.init_app(app, db)
     api.init_app(app)
+    from NewApp.serializers import output_json
+    api.representation('application/json')(output_json)
     from NewApp.routes.enemy_routes import api as enemy_ns
     from NewApp.routes.product_routes import api as product_ns
     from NewApp.routes.product_crawl_routes import api as product_crawl_ns
     from NewApp.routes.product_crawl_log_routes import api as product_crawl_log_ns
     from NewApp.routes.reminder_routes import api as reminder_ns
+    from NewApp.routes.variant_price_routes import api as variant_price_ns
+    from NewApp.routes.analytics_routes import api as analytics_ns
+    from NewApp.routes.schedule_routes import api as schedule_ns
+    from NewApp.routes.metrics_routes import api as metrics_ns
     from NewApp.index import ns as index_ns
 
     api.add_namespace(enemy_ns, path='/api/enemies')
@@ -33,9 +42,17 @@ def create_app():
     api.add_namespace(product_crawl_ns, path='/api/product-crawls')
     api.add_namespace(product_crawl_log_ns, path='/api/product-crawl-logs')
     api.add_namespace(reminder_ns, path='/api/reminder')
+    api.add_namespace(variant_price_ns, path='/api/variant-prices')
+    api.add_namespace(analytics_ns, path='/api/analytics')
+    api.add_namespace(schedule_ns, path='/api/schedules')
+    api.add_namespace(metrics_ns, path='/api/metrics')
     api.add_namespace(index_ns, path='/index')
-    
-    with app.app_context():
-        db.create_all()
+
+    from NewApp.commands import register_commands
+    register_commands(app)
+
+    # The schema is created by `flask db upgrade` (or `flask init-db`), not on every boot
+    from NewApp.scheduler import init_scheduler
+    init_scheduler(app)
         
     return app
\ No newline at end of file
@@ -0,0 +1,192 @@
+import datetime
+import numpy as np
+from flask import current_app
+from NewApp import db
+from NewApp.models import Enemy, Product, ProductCrawl
+from NewApp.log_rollup import load_price_series
+
+EPOCH = datetime.datetime(1970, 1, 1)
+
+
+def moving_average_days():
+    """Moving average windows in days, from ANALYTICS_MA_DAYS (e.g. '7,30')."""
+    return sorted({int(day) for day in str(current_app.config['ANALYTICS_MA_DAYS']).split(',') if day.strip()})
+
+
+def product_analytics(product_ids=None, now=None):
+    """Competitor price analytics for the given products (default: the whole
+    catalog), returned as {product_id: analytics} in product id order.
+
+    The price series of every competitor within ANALYTICS_LOOKBACK_DAYS are
+    loaded in one batch and flattened into numpy arrays, so latest prices,
+    volatility, moving averages and undercuts are computed for all crawls at
+    once instead of per product.
+    """
+    now = now or datetime.datetime.utcnow()
+    windows = moving_average_days()
+    start = now - datetime.timedelta(days=current_app.config['ANALYTICS_LOOKBACK_DAYS'])
+
+    products = db.session.query(Product.id, Product.name, Product.cur_price)
+    if product_ids is not None:
+        products = products.filter(Product.id.in_(list(product_ids)))
+    products = products.order_by(Product.id).all()
+    if not products:
+        return {}
+
+    crawls = db.session.query(
+        ProductCrawl.id, ProductCrawl.prod_id, ProductCrawl.enemy_id, Enemy.name.label('enemy_name')
+    ).outerjoin(Enemy, Enemy.id == ProductCrawl.enemy_id).filter(
+        ProductCrawl.prod_id.in_([product.id for product in products])
+    ).order_by(ProductCrawl.id).all()
+    series = load_price_series([crawl.id for crawl in crawls], start=start)
+
+    our_price = {product.id: float(product.cur_price) if product.cur_price is not None else np.nan for product in products}
+    metrics, window_sums, window_counts = _crawl_metrics(crawls, series, our_price, now, windows)
+
+    crawl_indices = {product.id: [] for product in products}
+    for i, crawl in enumerate(crawls):
+        crawl_indices[crawl.prod_id].append(i)
+
+    results = {}
+    for product in products:
+        indices = np.array(crawl_indices[product.id], dtype=int)
+        summary = _product_summary(product, [metrics[i] for i in indices], start, now, windows)
+        # Market moving averages over the observations of every competitor
+        for days in windows:
+            observed = window_counts[days][indices].sum()
+            if observed:
+                summary['moving_averages'][f'{days}d'] = _number(window_sums[days][indices].sum() / observed)
+        results[product.id] = summary
+    return results
+
+
+def _crawl_metrics(crawls, series, our_price, now, windows):
+    """Per-crawl metrics computed on the concatenated series of all crawls.
+
+    Returns the metric dicts (in crawl order) and, per moving average window,
+    the per-crawl price sums and observation counts.
+    """
+    count = len(crawls)
+    lengths = np.array([len(series[crawl.id]) for crawl in crawls], dtype=int)
+    total = int(lengths.sum())
+    # segment[i] is the crawl index of flattened point i
+    segment = np.repeat(np.arange(count), lengths)
+    prices = np.fromiter((point['price'] for crawl in crawls for point in series[crawl.id]), dtype=float, count=total)
+    seconds = np.fromiter(
+        ((point['timestamp'] - EPOCH).total_seconds() for crawl in crawls for point in series[crawl.id]),
+        dtype=float, count=total,
+    )
+    now_seconds = (now - EPOCH).total_seconds()
+    has_data = lengths > 0
+    ends = np.cumsum(lengths) - 1
+
+    latest = np.full(count, np.nan)
+    latest[has_data] = prices[ends[has_data]]
+    latest_at = np.full(count, np.nan)
+    latest_at[has_data] = seconds[ends[has_data]]
+
+    # Volatility: standard deviation of relative changes between consecutive
+    # observations of the same crawl
+    same_crawl = segment[1:] == segment[:-1]
+    previous = prices[:-1][same_crawl]
+    changes = np.divide(prices[1:][same_crawl] - previous, previous, out=np.zeros(len(previous)), where=previous != 0)
+    change_segment = segment[1:][same_crawl]
+    n = np.bincount(change_segment, minlength=count)
+    mean = np.divide(np.bincount(change_segment, changes, minlength=count), n, out=np.zeros(count), where=n > 0)
+    mean_sq = np.divide(np.bincount(change_segment, changes ** 2, minlength=count), n, out=np.zeros(count), where=n > 0)
+    volatility = np.where(n > 0, np.sqrt(np.maximum(mean_sq - mean ** 2, 0)), np.nan)
+
+    window_sums, window_counts, moving = {}, {}, {}
+    for days in windows:
+        in_window = seconds >= now_seconds - days * 86400
+        window_counts[days] = np.bincount(segment[in_window], minlength=count)
+        window_sums[days] = np.bincount(segment[in_window], prices[in_window], minlength=count)
+        moving[days] = np.divide(
+            window_sums[days], window_counts[days], out=np.full(count, np.nan), where=window_counts[days] > 0
+        )
+
+    # Newest observation below our own current price
+    ours = np.array([our_price[crawl.prod_id] for crawl in crawls], dtype=float)
+    undercut = prices < ours[segment]
+    last_undercut = np.full(count, -np.inf)
+    np.maximum.at(last_undercut, segment[undercut], seconds[undercut])
+
+    metrics = []
+    for i, crawl in enumerate(crawls):
+        undercut_at = last_undercut[i] if np.isfinite(last_undercut[i]) else None
+        metrics.append({
+            'product_crawl_id': crawl.id,
+            'enemy_id': crawl.enemy_id,
+            'enemy_name': crawl.enemy_name,
+            'observations': int(lengths[i]),
+            'latest_price': _number(latest[i]),
+            'latest_at': _isoformat(latest_at[i]),
+            'volatility': _number(volatility[i]),
+            'moving_averages': {f'{days}d': _number(moving[days][i]) for days in windows},
+            'undercutting': bool(latest[i] < ours[i]),
+            'last_undercut_at': _isoformat(undercut_at),
+            'hours_since_undercut': round((now_seconds - undercut_at) / 3600, 2) if undercut_at is not None else None,
+        })
+    return metrics, window_sums, window_counts
+
+
+def _product_summary(product, competitors, start, now, windows):
+    cur_price = float(product.cur_price) if product.cur_price is not None else None
+    current = np.array([c['latest_price'] for c in competitors if c['latest_price'] is not None], dtype=float)
+
+    summary = {
+        'product_id': product.id,
+        'name': product.name,
+        'cur_price': cur_price,
+        'competitors_tracked': len(competitors),
+        'competitors_priced': int(len(current)),
+        'min_price': None,
+        'median_price': None,
+        'max_price': None,
+        'price_gap': None,
+        'price_gap_pct': None,
+        'cheapest_product_crawl_id': None,
+        'volatility': None,
+        'moving_averages': {f'{days}d': None for days in windows},
+        'undercut_by': sum(1 for c in competitors if c['undercutting']),
+        'last_undercut_at': None,
+        'hours_since_undercut': None,
+        'lookback_start': start.isoformat(),
+        'computed_at': now.isoformat(),
+        'competitors': competitors,
+    }
+    if len(current):
+        min_price = float(current.min())
+        summary.update({
+            'min_price': min_price,
+            'median_price': float(np.median(current)),
+            'max_price': float(current.max()),
+            'cheapest_product_crawl_id': min(
+                (c for c in competitors if c['latest_price'] is not None), key=lambda c: c['latest_price']
+            )['product_crawl_id'],
+        })
+        if cur_price is not None:
+            # Positive gap: we are more expensive than the cheapest competitor
+            summary['price_gap'] = round(cur_price - min_price, 2)
+            summary['price_gap_pct'] = round((cur_price - min_price) / min_price * 100, 2) if min_price else None
+
+    volatilities = [c['volatility'] for c in competitors if c['volatility'] is not None]
+    if volatilities:
+        summary['volatility'] = float(np.median(volatilities))
+
+    undercuts = [c for c in competitors if c['last_undercut_at'] is not None]
+    if undercuts:
+        newest = min(undercuts, key=lambda c: c['hours_since_undercut'])
+        summary['last_undercut_at'] = newest['last_undercut_at']
+        summary['hours_since_undercut'] = newest['hours_since_undercut']
+    return summary
+
+
+def _number(value):
+    return None if value is None or np.isnan(value) else round(float(value), 6)
+
+
+def _isoformat(seconds):
+    if seconds is None or np.isnan(seconds):
+        return None
+    return (EPOCH + datetime.timedelta(seconds=float(seconds))).isoformat()
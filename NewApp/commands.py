@@ -0,0 +1,99 @@
+import click
+from flask.cli import with_appcontext
+
+
+@click.command('init-db')
+@with_appcontext
+def init_db_command():
+    """Create all tables of the models and mark the database as migrated to
+    the latest revision. Use `flask db upgrade` for existing databases."""
+    from flask_migrate import stamp
+    from NewApp import db
+    db.create_all()
+    stamp()
+    click.echo("Database tables created")
+
+
+@click.command('rollup-logs')
+@with_appcontext
+def rollup_logs_command():
+    """Compact old crawl logs into hourly/daily rollups and apply retention."""
+    from NewApp.log_rollup import rollup_logs
+    stats = rollup_logs()
+    click.echo(f"Rollup finished: {stats}")
+
+
+@click.command('backfill-variant-prices')
+@click.option('--batch-size', default=500, show_default=True)
+@with_appcontext
+def backfill_variant_prices_command(batch_size):
+    """Extract variant price rows from logs that do not have any yet."""
+    from NewApp import db
+    from NewApp.models import ProductCrawlLog, ProductCrawlVariantPrice
+    from NewApp.crawl_logs import variant_prices_for
+
+    done = db.session.query(ProductCrawlVariantPrice.log_id).filter(ProductCrawlVariantPrice.log_id.isnot(None))
+    last_id = 0
+    created = 0
+    while True:
+        logs = ProductCrawlLog.query.filter(
+            ProductCrawlLog.id > last_id, ~ProductCrawlLog.id.in_(done)
+        ).order_by(ProductCrawlLog.id).limit(batch_size).all()
+        if not logs:
+            break
+        for log in logs:
+            last_id = log.id
+            if log.other_data:
+                rows = variant_prices_for(log.product_crawl_id, log.other_data, log.timestamp)
+                log.variant_prices = rows
+                created += len(rows)
+        db.session.commit()
+    click.echo(f"Created {created} variant price rows")
+
+
+@click.command('reindex-search')
+@click.option('--batch-size', default=1000, show_default=True)
+@with_appcontext
+def reindex_search_command(batch_size):
+    """Rebuild the product search index from all products."""
+    from NewApp import db
+    from NewApp.search import reindex_all
+    indexed = reindex_all(batch_size)
+    db.session.commit()
+    click.echo(f"Indexed {indexed} products")
+
+
+@click.command('reextract')
+@click.option('--crawl-id', 'crawl_ids', type=int, multiple=True, help='Only logs of this product crawl (repeatable)')
+@click.option('--since', type=click.DateTime(), help='Only logs from this time on (UTC)')
+@click.option('--until', type=click.DateTime(), help='Only logs before this time (UTC)')
+@click.option('--limit', type=int, help='Re-extract at most this many logs')
+@click.option('--workers', type=int, help='Parallel extractions [default: REEXTRACT_MAX_WORKERS]')
+@click.option('--with-text', is_flag=True, help='Send the archived page text along with the screenshot')
+@click.option('--dry-run', is_flag=True, help='Extract and count changes without saving them')
+@click.option('--batch-size', default=100, show_default=True)
+@with_appcontext
+def reextract_command(crawl_ids, since, until, limit, workers, with_text, dry_run, batch_size):
+    """Extract crawl logs again from their archived page snapshots, e.g.
+    after changing PROMPT_TEXT, GEMINI_MODEL or the price parser."""
+    from NewApp.reextract import reextract_logs
+    stats = reextract_logs(crawl_ids=crawl_ids, since=since, until=until, limit=limit, max_workers=workers,
+                           with_text=with_text, dry_run=dry_run, batch_size=batch_size)
+    click.echo(f"Re-extraction {'dry run ' if dry_run else ''}finished: {stats}")
+
+
+@click.command('prune-snapshots')
+@with_appcontext
+def prune_snapshots_command():
+    """Delete archived page snapshots no longer referenced by any crawl log."""
+    from NewApp.snapshots import prune
+    click.echo(f"Deleted {prune()} snapshot files")
+
+
+def register_commands(app):
+    app.cli.add_command(init_db_command)
+    app.cli.add_command(rollup_logs_command)
+    app.cli.add_command(backfill_variant_prices_command)
+    app.cli.add_command(reindex_search_command)
+    app.cli.add_command(reextract_command)
+    app.cli.add_command(prune_snapshots_command)
@@ -10,14 +10,55 @@ db_user = os.getenv("DB_USER")
 db_password = os.getenv("DB_PASSWORD")
 db_name = os.getenv("DB_NAME")
 db_host = os.getenv("DB_HOST")
+db_port = os.getenv("DB_PORT")
 secret_key = os.getenv("SECRET_KEY")
 
 
+def database_uri():
+    """URI of the application database. DB_TYPE=sqlite uses the file DB_NAME,
+    or an in-memory database shared by all threads when DB_NAME is empty, so
+    tests and benchmarks can run without a MySQL server."""
+    if db_type and db_type.startswith('sqlite'):
+        return f'{db_type}:///{db_name}' if db_name else f'{db_type}://'
+    host = f'{db_host}:{db_port}' if db_port else db_host
+    return f'{db_type}://{db_user}:{db_password}@{host}/{db_name}'
+
+
+def engine_options():
+    """Connection pool settings of the database engine."""
+    if db_type and db_type.startswith('sqlite'):
+        # Flask-SQLAlchemy gives in-memory databases a single shared connection
+        return {}
+    return {
+        # Connections kept open, and opened beyond that under load
+        'pool_size': int(os.getenv('DB_POOL_SIZE', 10)),
+        'max_overflow': int(os.getenv('DB_MAX_OVERFLOW', 20)),
+        # Seconds to wait for a free connection before failing
+        'pool_timeout': int(os.getenv('DB_POOL_TIMEOUT', 30)),
+        # Reopen connections older than this, before MySQL's wait_timeout drops them
+        'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+        # Test each connection on checkout and replace it if the server closed it
+        'pool_pre_ping': os.getenv('DB_POOL_PRE_PING', 'True').lower() == 'true',
+        'connect_args': {'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10))},
+    }
+
+
 class Config:
-    SQLALCHEMY_DATABASE_URI = f'{db_type}://{db_user}:{db_password}@{db_host}/{db_name}'
+    SQLALCHEMY_DATABASE_URI = database_uri()
+    SQLALCHEMY_ENGINE_OPTIONS = engine_options()
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    
+    # Scheduled jobs are stored in this database (default: SQLALCHEMY_DATABASE_URI)
+    SCHEDULER_JOBSTORE_URL = os.getenv('SCHEDULER_JOBSTORE_URL', '')
+    SCHEDULER_JOBSTORE_TABLE = os.getenv('SCHEDULER_JOBSTORE_TABLE', 'apscheduler_jobs')
+    # A run missed by more than this (e.g. while the app was down) is skipped
+    SCHEDULER_MISFIRE_GRACE_SECONDS = int(os.getenv('SCHEDULER_MISFIRE_GRACE_SECONDS', 300))
+    # Production (wsgi.py): the worker holding the lease runs the scheduler; the
+    # lease is renewed every LEADER_RENEW_SECONDS and taken over once expired
+    SCHEDULER_ENABLED = os.getenv('SCHEDULER_ENABLED', 'True').lower() == 'true'
+    LEADER_LEASE_SECONDS = int(os.getenv('LEADER_LEASE_SECONDS', 30))
+    LEADER_RENEW_SECONDS = int(os.getenv('LEADER_RENEW_SECONDS', 10))
+
     # Mail settings
     MAIL_SERVER = os.getenv('MAIL_SERVER', 'smtp.gmail.com')
     MAIL_PORT = int(os.getenv('MAIL_PORT', 587))
@@ -25,4 +66,80 @@ class Config:
     MAIL_USE_SSL = os.getenv('MAIL_USE_SSL', 'False').lower() == 'true'
     MAIL_USERNAME = os.getenv('MAIL_USERNAME', '')
     MAIL_PASSWORD = os.getenv('MAIL_PASSWORD', '')
-    MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
\ No newline at end of file
+    MAIL_DEFAULT_SENDER = os.getenv('MAIL_DEFAULT_SENDER', 'noreply@example.com')
+    # Minutes between price reminder checks
+    MAIL_INTERVAL_MINUTES = float(os.getenv('Interval_Mail_Sent', 1))
+
+    # List endpoint page sizes (the 'limit' query parameter is capped at the max)
+    API_PAGE_SIZE = int(os.getenv('API_PAGE_SIZE', 50))
+    API_MAX_PAGE_SIZE = int(os.getenv('API_MAX_PAGE_SIZE', 500))
+    # Rows fetched per round trip (and flushed per chunk) by streaming exports
+    EXPORT_BATCH_SIZE = int(os.getenv('EXPORT_BATCH_SIZE', 1000))
+
+    # In-process cache of GET responses; entries are also dropped by any commit
+    # touching their tables. 0 disables storing (ETag/304 still work)
+    HTTP_CACHE_TTL_SECONDS = int(os.getenv('HTTP_CACHE_TTL_SECONDS', 300))
+    HTTP_CACHE_MAX_ENTRIES = int(os.getenv('HTTP_CACHE_MAX_ENTRIES', 1000))
+    # How long the shared cache_generations rows are reused before being read
+    # again, i.e. how stale a response may be after another process's commit.
+    # 0 reads them on every cached request
+    HTTP_CACHE_GENERATION_TTL_SECONDS = float(os.getenv('HTTP_CACHE_GENERATION_TTL_SECONDS', 1))
+
+    # Bulk product import: rows per request and per batched INSERT
+    IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', 100000))
+    IMPORT_BATCH_SIZE = int(os.getenv('IMPORT_BATCH_SIZE', 1000))
+
+    # Product search: word prefixes of at least this many characters are
+    # indexed (changing it needs `flask reindex-search`); results per request
+    SEARCH_MIN_PREFIX_LENGTH = int(os.getenv('SEARCH_MIN_PREFIX_LENGTH', 2))
+    SEARCH_MAX_RESULTS = int(os.getenv('SEARCH_MAX_RESULTS', 50))
+
+    # Price history responses are downsampled to this many points
+    PRICE_HISTORY_MAX_POINTS = int(os.getenv('PRICE_HISTORY_MAX_POINTS', 500))
+    PRICE_HISTORY_MAX_POINTS_LIMIT = int(os.getenv('PRICE_HISTORY_MAX_POINTS_LIMIT', 5000))
+
+    # Competitor analytics: days of history analysed and moving average windows
+    ANALYTICS_LOOKBACK_DAYS = int(os.getenv('ANALYTICS_LOOKBACK_DAYS', 90))
+    ANALYTICS_MA_DAYS = os.getenv('ANALYTICS_MA_DAYS', '7,30')
+
+    # Concurrent scrapes of a batch crawl; each one runs a headless browser
+    CRAWL_MAX_WORKERS = int(os.getenv('CRAWL_MAX_WORKERS', 3))
+
+    # Adaptive crawl scheduling: each crawl is re-crawled after an interval
+    # derived from how often and how much its price moved recently
+    CRAWL_ADAPTIVE_SCHEDULING = os.getenv('CRAWL_ADAPTIVE_SCHEDULING', 'False').lower() == 'true'
+    CRAWL_SCHEDULER_TICK_MINUTES = int(os.getenv('CRAWL_SCHEDULER_TICK_MINUTES', 10))
+    # Crawls started per hour at most, committed every CRAWL_COMMIT_BATCH_SIZE
+    CRAWL_CAPACITY_PER_HOUR = int(os.getenv('CRAWL_CAPACITY_PER_HOUR', 120))
+    CRAWL_COMMIT_BATCH_SIZE = int(os.getenv('CRAWL_COMMIT_BATCH_SIZE', 10))
+    # Random spread of every next crawl time, as a fraction of its interval
+    CRAWL_JITTER_FRACTION = float(os.getenv('CRAWL_JITTER_FRACTION', 0.1))
+    CRAWL_MIN_INTERVAL_MINUTES = int(os.getenv('CRAWL_MIN_INTERVAL_MINUTES', 60))
+    CRAWL_MAX_INTERVAL_MINUTES = int(os.getenv('CRAWL_MAX_INTERVAL_MINUTES', 10080))
+    CRAWL_ADAPTIVE_LOOKBACK_DAYS = int(os.getenv('CRAWL_ADAPTIVE_LOOKBACK_DAYS', 30))
+    CRAWL_MAGNITUDE_REFERENCE = float(os.getenv('CRAWL_MAGNITUDE_REFERENCE', 0.05))
+    CRAWL_REMINDER_BOOST = float(os.getenv('CRAWL_REMINDER_BOOST', 2))
+
+    # Per-competitor circuit breaker: after this many failed or empty fetches
+    # in a row its crawls are skipped for a cool-down that doubles with every
+    # failed probe, up to the maximum; a probe holds the breaker for PROBE minutes
+    CRAWL_BREAKER_FAILURE_THRESHOLD = int(os.getenv('CRAWL_BREAKER_FAILURE_THRESHOLD', 3))
+    CRAWL_BREAKER_COOLDOWN_MINUTES = float(os.getenv('CRAWL_BREAKER_COOLDOWN_MINUTES', 15))
+    CRAWL_BREAKER_MAX_COOLDOWN_MINUTES = float(os.getenv('CRAWL_BREAKER_MAX_COOLDOWN_MINUTES', 1440))
+    CRAWL_BREAKER_PROBE_MINUTES = float(os.getenv('CRAWL_BREAKER_PROBE_MINUTES', 10))
+
+    # Archive the preprocessed screenshot and page text of every fetch in a
+    # content-addressed store under SNAPSHOT_DIR, so `flask reextract` can run
+    # the extraction again without crawling; parallel extractions of a re-run
+    CRAWL_SNAPSHOTS = os.getenv('CRAWL_SNAPSHOTS', 'False').lower() == 'true'
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', 'snapshots')
+    REEXTRACT_MAX_WORKERS = int(os.getenv('REEXTRACT_MAX_WORKERS', 4))
+
+    # Crawl log rollup and retention
+    LOG_ROLLUP_AFTER_HOURS = int(os.getenv('LOG_ROLLUP_AFTER_HOURS', 48))
+    LOG_RAW_RETENTION_DAYS = int(os.getenv('LOG_RAW_RETENTION_DAYS', 30))
+    LOG_HOURLY_RETENTION_DAYS = int(os.getenv('LOG_HOURLY_RETENTION_DAYS', 180))
+    LOG_ROLLUP_INTERVAL_MINUTES = int(os.getenv('LOG_ROLLUP_INTERVAL_MINUTES', 60))
+
+    # Extend the previous log instead of inserting a new one when nothing changed
+    CRAWL_LOG_RUN_LENGTH = os.getenv('CRAWL_LOG_RUN_LENGTH', 'False').lower() == 'true'
\ No newline at end of file
@@ -0,0 +1,212 @@
+import datetime
+from flask import current_app
+from sqlalchemy import delete, func, insert
+from NewApp import db
+from NewApp.models import CrawlPayload, ProductCrawlLog, ProductCrawlVariantPrice
+from OCR.price_parser import clean_price_string
+
+# Fields of the extraction payload that must match for an observation to
+# extend the previous log in run-length mode
+RUN_LENGTH_KEY_FIELDS = ('promotional_price', 'out_of_stock', 'skus', 'colors')
+
+# Snapshot columns of a log whose page was not archived
+NO_SNAPSHOT = {'snapshot_image_hash': None, 'snapshot_text_hash': None}
+
+
+def record_crawl_result(crawl, crawl_result, timestamp=None, snapshot=None):
+    """Store a scrape result for crawl and return the affected log.
+
+    In run-length mode (CRAWL_LOG_RUN_LENGTH) an observation whose name, price
+    and key payload fields match the newest log of the same day only bumps
+    that log's last_seen_at and observation_count. Otherwise a new log is
+    added, linked to the archived page snapshot (the columns returned by
+    snapshots.store) if given. The caller commits.
+    """
+    timestamp = timestamp or datetime.datetime.utcnow()
+    name = crawl_result.get('product_name', 'Unknown')
+    price = crawl_result.get('current_price')
+
+    if current_app.config.get('CRAWL_LOG_RUN_LENGTH'):
+        previous = ProductCrawlLog.query.filter_by(product_crawl_id=crawl.id).order_by(
+            ProductCrawlLog.timestamp.desc(), ProductCrawlLog.id.desc()
+        ).first()
+        if previous and _extends_run(previous, name, price, crawl_result, timestamp):
+            previous.last_seen_at = timestamp
+            previous.observation_count = (previous.observation_count or 1) + 1
+            return previous
+
+    log = ProductCrawlLog(
+        product_crawl_id=crawl.id,
+        name=name,
+        price=price,
+        other_data=crawl_result,
+        timestamp=timestamp,
+        last_seen_at=timestamp,
+        observation_count=1,
+        **(snapshot or {}),
+    )
+    log.variant_prices = variant_prices_for(crawl.id, crawl_result, timestamp)
+    db.session.add(log)
+    return log
+
+
+def record_crawl_results(results, timestamp=None, snapshots=None):
+    """Store many (crawl, crawl_result) pairs with one multi-row INSERT of
+    crawl logs and one of variant prices. Returns the affected log ids in
+    input order.
+
+    Same storage rules as record_crawl_result; snapshots, if given, holds
+    the snapshot of each pair in input order. Each crawl must appear at most
+    once. The caller commits.
+    """
+    timestamp = timestamp or datetime.datetime.utcnow()
+    ids = [None] * len(results)
+    if not results:
+        return ids
+
+    pending = list(enumerate(results))
+    if current_app.config.get('CRAWL_LOG_RUN_LENGTH'):
+        previous = latest_logs([crawl.id for crawl, _ in results])
+        extending = []
+        for index, (crawl, crawl_result) in pending:
+            log = (previous[crawl.id] or [None])[-1]
+            name = crawl_result.get('product_name', 'Unknown')
+            if log and _extends_run(log, name, crawl_result.get('current_price'), crawl_result, timestamp):
+                log.last_seen_at = timestamp
+                log.observation_count = (log.observation_count or 1) + 1
+                ids[index] = log.id
+            else:
+                extending.append((index, (crawl, crawl_result)))
+        pending = extending
+    if not pending:
+        return ids
+
+    snapshots = snapshots or [None] * len(results)
+    payloads = [CrawlPayload.for_data(crawl_result) for _, (_, crawl_result) in pending]
+    db.session.flush()
+    rows = [
+        {
+            'product_crawl_id': crawl.id,
+            'name': crawl_result.get('product_name', 'Unknown'),
+            'price': crawl_result.get('current_price'),
+            'payload_id': payload.id,
+            'timestamp': timestamp,
+            'last_seen_at': timestamp,
+            'observation_count': 1,
+            # Every row has the same keys, so they stay one multi-row INSERT
+            **(snapshots[index] or NO_SNAPSHOT),
+        }
+        for (index, (crawl, crawl_result)), payload in zip(pending, payloads)
+    ]
+    if db.engine.dialect.insert_executemany_returning:
+        # Rows are matched back by crawl id, which is unique in the batch, so
+        # RETURNING needs no ordering and stays one multi-row statement
+        statement = insert(ProductCrawlLog).returning(ProductCrawlLog.product_crawl_id, ProductCrawlLog.id)
+        log_ids = dict(db.session.execute(statement, rows).all())
+    else:
+        # MySQL has no RETURNING; the ORM flush reads the generated keys
+        logs = [ProductCrawlLog(**row) for row in rows]
+        db.session.add_all(logs)
+        db.session.flush()
+        log_ids = {log.product_crawl_id: log.id for log in logs}
+
+    variant_prices = []
+    for index, (crawl, crawl_result) in pending:
+        log_id = ids[index] = log_ids[crawl.id]
+        for values in variant_price_values(crawl.id, crawl_result, timestamp):
+            values['log_id'] = log_id
+            variant_prices.append(values)
+    if variant_prices:
+        db.session.execute(insert(ProductCrawlVariantPrice), variant_prices)
+    return ids
+
+
+def latest_logs(product_crawl_ids, limit=1):
+    """Return {product_crawl_id: [log, ...]} with the newest `limit` logs of
+    each crawl in chronological order, fetched with one windowed query."""
+    logs = {crawl_id: [] for crawl_id in product_crawl_ids}
+    if not logs:
+        return logs
+    ranked = db.session.query(
+        ProductCrawlLog.id.label('id'),
+        func.row_number().over(
+            partition_by=ProductCrawlLog.product_crawl_id,
+            order_by=(ProductCrawlLog.timestamp.desc(), ProductCrawlLog.id.desc()),
+        ).label('rank'),
+    ).filter(ProductCrawlLog.product_crawl_id.in_(list(logs))).subquery()
+    rows = ProductCrawlLog.query.join(ranked, ranked.c.id == ProductCrawlLog.id).filter(
+        ranked.c.rank <= limit
+    ).order_by(ProductCrawlLog.product_crawl_id, ProductCrawlLog.timestamp.asc(), ProductCrawlLog.id.asc())
+    for log in rows:
+        logs[log.product_crawl_id].append(log)
+    return logs
+
+
+def normalize_variant_key(label):
+    """Lowercase variant label without whitespace, so '256 GB' matches '256GB'."""
+    return ''.join(str(label).lower().split())[:255]
+
+
+def replace_variant_prices(log):
+    """Delete the variant prices of a saved log and insert them again from
+    its current payload. The caller commits."""
+    db.session.execute(delete(ProductCrawlVariantPrice).where(ProductCrawlVariantPrice.log_id == log.id))
+    crawl_result = log.other_data if isinstance(log.other_data, dict) else {}
+    values = variant_price_values(log.product_crawl_id, crawl_result, log.timestamp)
+    for row in values:
+        row['log_id'] = log.id
+    if values:
+        db.session.execute(insert(ProductCrawlVariantPrice), values)
+
+
+def variant_prices_for(product_crawl_id, crawl_result, timestamp):
+    """Build ProductCrawlVariantPrice rows from the skus/colors of a payload."""
+    return [ProductCrawlVariantPrice(**values) for values in variant_price_values(product_crawl_id, crawl_result, timestamp)]
+
+
+def variant_price_values(product_crawl_id, crawl_result, timestamp):
+    """Column values of the variant prices of a payload, for bulk inserts."""
+    rows = []
+    for variant_type, items, label_field in (
+        ('sku', crawl_result.get('skus'), 'version'),
+        ('color', crawl_result.get('colors'), 'color'),
+    ):
+        for item in items or []:
+            if not isinstance(item, dict):
+                continue
+            label = item.get(label_field)
+            price = _variant_price(item.get('price'))
+            # Colors without their own price follow the SKU price
+            if not label or not price:
+                continue
+            rows.append({
+                'product_crawl_id': product_crawl_id,
+                'variant_type': variant_type,
+                'variant_key': normalize_variant_key(label),
+                'variant_label': str(label)[:255],
+                'price': price,
+                'timestamp': timestamp,
+            })
+    return rows
+
+
+def _variant_price(value):
+    if isinstance(value, bool):
+        return 0.0
+    if isinstance(value, (int, float)):
+        return float(value)
+    return clean_price_string(value)
+
+
+def _extends_run(previous, name, price, crawl_result, timestamp):
+    # Runs never cross a day boundary so rollups can treat past days as closed
+    if previous.timestamp is None or previous.timestamp.date() != timestamp.date():
+        return False
+    if previous.name != name:
+        return False
+    if (previous.price is None) != (price is None):
+        return False
+    if price is not None and float(previous.price) != round(float(price), 2):
+        return False
+    previous_data = previous.other_data or {}
+    return all(previous_data.get(field) == crawl_result.get(field) for field in RUN_LENGTH_KEY_FIELDS)
@@ -0,0 +1,151 @@
+import datetime
+import math
+import random
+import numpy as np
+from flask import current_app
+from sqlalchemy import or_
+from NewApp import db
+from NewApp.models import EnemyHealth, Product, ProductCrawl
+from NewApp.log_rollup import load_price_series
+from NewApp.analytics import EPOCH
+
+# Relative price moves below this are rounding noise, not changes
+PRICE_CHANGE_EPSILON = 1e-4
+
+
+def crawl_intervals(crawl_ids, now=None):
+    """Return {crawl_id: minutes until the next crawl} from recent price history.
+
+    Over CRAWL_ADAPTIVE_LOOKBACK_DAYS the mean time between price changes is
+    estimated as span / (changes + 1), so a flat history pushes the interval
+    out as it grows longer. Crawls are sampled twice per expected change,
+    sooner when the average move is large (halved at
+    CRAWL_MAGNITUDE_REFERENCE), divided by CRAWL_REMINDER_BOOST for products
+    with a reminder, and clamped to [CRAWL_MIN_INTERVAL_MINUTES,
+    CRAWL_MAX_INTERVAL_MINUTES]. Crawls without history get the minimum.
+    """
+    config = current_app.config
+    now = now or datetime.datetime.utcnow()
+    crawl_ids = list(crawl_ids)
+    if not crawl_ids:
+        return {}
+    min_minutes = config['CRAWL_MIN_INTERVAL_MINUTES']
+    max_minutes = max(config['CRAWL_MAX_INTERVAL_MINUTES'], min_minutes)
+
+    series = load_price_series(crawl_ids, start=now - datetime.timedelta(days=config['CRAWL_ADAPTIVE_LOOKBACK_DAYS']))
+    count = len(crawl_ids)
+    lengths = np.array([len(series[crawl_id]) for crawl_id in crawl_ids], dtype=int)
+    total = int(lengths.sum())
+    segment = np.repeat(np.arange(count), lengths)
+    prices = np.fromiter((point['price'] for crawl_id in crawl_ids for point in series[crawl_id]), dtype=float, count=total)
+    minutes = np.fromiter(
+        ((point['timestamp'] - EPOCH).total_seconds() / 60 for crawl_id in crawl_ids for point in series[crawl_id]),
+        dtype=float, count=total,
+    )
+
+    # Change count and mean absolute relative change per crawl
+    same_crawl = segment[1:] == segment[:-1]
+    previous = prices[:-1][same_crawl]
+    moves = np.abs(np.divide(prices[1:][same_crawl] - previous, previous, out=np.zeros(len(previous)), where=previous != 0))
+    changed = moves > PRICE_CHANGE_EPSILON
+    change_segment = segment[1:][same_crawl][changed]
+    changes = np.bincount(change_segment, minlength=count)
+    magnitude = np.divide(
+        np.bincount(change_segment, moves[changed], minlength=count), changes,
+        out=np.zeros(count), where=changes > 0,
+    )
+
+    first = np.full(count, np.nan)
+    has_data = lengths > 0
+    first[has_data] = minutes[(np.cumsum(lengths) - lengths)[has_data]]
+    span = (now - EPOCH).total_seconds() / 60 - first
+
+    intervals = span / (changes + 1) / 2 / (1 + magnitude / config['CRAWL_MAGNITUDE_REFERENCE'])
+    boosted = _reminder_crawl_ids(crawl_ids)
+    boost = np.array([config['CRAWL_REMINDER_BOOST'] if crawl_id in boosted else 1 for crawl_id in crawl_ids], dtype=float)
+    intervals = np.where(lengths >= 2, intervals / np.maximum(boost, 1), min_minutes)
+    intervals = np.clip(np.nan_to_num(intervals, nan=min_minutes), min_minutes, max_minutes)
+    return {crawl_id: int(round(interval)) for crawl_id, interval in zip(crawl_ids, intervals)}
+
+
+def schedule_next(succeeded, failed=(), now=None):
+    """Set next_crawl_at of crawled ProductCrawls: successful ones after their
+    adaptive interval, failed ones retried after the minimum interval, both
+    jittered so crawls sharing an interval drift apart. While a fixed-interval
+    schedule is active a successful crawl is not due again before its slot in
+    the next window, which spread_all assigns. The caller commits."""
+    from NewApp.scheduler import spread_window
+    now = now or datetime.datetime.utcnow()
+    intervals = crawl_intervals([crawl.id for crawl in succeeded], now)
+    window = spread_window() if succeeded else None
+    for crawl in succeeded:
+        crawl.crawl_interval_minutes = intervals[crawl.id]
+        crawl.next_crawl_at = now + datetime.timedelta(minutes=jittered(intervals[crawl.id]))
+        if window:
+            # Past the next window: when it starts, spread_all moves the
+            # crawl to its slot in it
+            start, length = window
+            crawl.next_crawl_at = max(crawl.next_crawl_at, start + length)
+    retry = current_app.config['CRAWL_MIN_INTERVAL_MINUTES']
+    for crawl in failed:
+        crawl.next_crawl_at = now + datetime.timedelta(minutes=jittered(retry))
+
+
+def jittered(minutes):
+    """minutes randomly stretched or shrunk by up to CRAWL_JITTER_FRACTION."""
+    fraction = current_app.config['CRAWL_JITTER_FRACTION']
+    return minutes * random.uniform(1 - fraction, 1 + fraction)
+
+
+def spread(crawls, window_minutes, now=None):
+    """Give every crawl one due time in the next window_minutes: the window is
+    cut into equal slots and each crawl lands at a random point of its own
+    slot, so crawls start evenly spread and not in lockstep. The caller
+    commits."""
+    now = now or datetime.datetime.utcnow()
+    crawls = sorted(crawls, key=lambda crawl: crawl.id)
+    if not crawls:
+        return
+    capacity = current_app.config['CRAWL_CAPACITY_PER_HOUR'] * window_minutes / 60
+    if len(crawls) > capacity:
+        print(f"Warning: {len(crawls)} crawls per {window_minutes} minutes exceed CRAWL_CAPACITY_PER_HOUR; "
+              f"due crawls will queue up")
+    slot = window_minutes / len(crawls)
+    for i, crawl in enumerate(crawls):
+        crawl.next_crawl_at = now + datetime.timedelta(minutes=(i + random.random()) * slot)
+
+
+def tick_budget():
+    """Crawls one scheduler tick may start without exceeding
+    CRAWL_CAPACITY_PER_HOUR."""
+    config = current_app.config
+    return max(1, math.ceil(config['CRAWL_CAPACITY_PER_HOUR'] * config['CRAWL_SCHEDULER_TICK_MINUTES'] / 60))
+
+
+def due_crawls(now=None, limit=None):
+    """ProductCrawls whose next crawl is due, never-scheduled ones first, then
+    products with a reminder, then the most overdue; at most limit (default:
+    one tick's capacity). Crawls of competitors whose circuit breaker is
+    open are left out, so the capacity goes to reachable sites."""
+    now = now or datetime.datetime.utcnow()
+    query = ProductCrawl.query.join(Product, Product.id == ProductCrawl.prod_id).outerjoin(
+        EnemyHealth, EnemyHealth.enemy_id == ProductCrawl.enemy_id
+    ).filter(
+        or_(ProductCrawl.next_crawl_at.is_(None), ProductCrawl.next_crawl_at <= now),
+        or_(EnemyHealth.open_until.is_(None), EnemyHealth.open_until <= now),
+    ).order_by(
+        ProductCrawl.next_crawl_at.isnot(None),
+        Product.reminder_email.is_(None),
+        ProductCrawl.next_crawl_at,
+        ProductCrawl.id,
+    )
+    return query.limit(limit or tick_budget()).all()
+
+
+def _reminder_crawl_ids(crawl_ids):
+    rows = db.session.query(ProductCrawl.id).join(Product, Product.id == ProductCrawl.prod_id).filter(
+        ProductCrawl.id.in_(crawl_ids),
+        Product.reminder_email.isnot(None),
+        Product.reminder_email != '',
+    )
+    return {row.id for row in rows}
@@ -0,0 +1,212 @@
+import concurrent.futures
+import threading
+import time
+from flask import current_app
+from NewApp import db
+from NewApp.models import ProductCrawl
+from NewApp.crawl_logs import record_crawl_results
+from NewApp.crawl_schedule import due_crawls, schedule_next, spread
+from NewApp.enemy_health import admit, is_empty, record_outcomes
+from NewApp.snapshots import archive_dir, store
+from NewApp.urls import canonicalize_url
+from OCR.screenshot import scrape
+
+# Held by the scheduled run in progress; a tick that cannot take it is skipped
+_run_lock = threading.Lock()
+
+
+def select_crawls(prod_id=None, enemy_id=None, crawl_ids=None):
+    """Return (crawls, missing_ids) for a product, an enemy and/or explicit
+    crawl ids; the filters combine with AND."""
+    query = ProductCrawl.query
+    if prod_id is not None:
+        query = query.filter(ProductCrawl.prod_id == prod_id)
+    if enemy_id is not None:
+        query = query.filter(ProductCrawl.enemy_id == enemy_id)
+    if crawl_ids is not None:
+        query = query.filter(ProductCrawl.id.in_(crawl_ids))
+    crawls = query.order_by(ProductCrawl.id).all()
+    found = {crawl.id for crawl in crawls}
+    missing = [crawl_id for crawl_id in dict.fromkeys(crawl_ids or []) if crawl_id not in found]
+    return crawls, missing
+
+
+def _timed_scrape(link, snapshot_dir=None):
+    started = time.monotonic()
+    snapshot = {} if snapshot_dir else None
+    result = scrape(link, snapshot=snapshot)
+    if not isinstance(result, dict):
+        raise ValueError('Scraper returned no data')
+    elapsed = time.monotonic() - started
+    try:
+        archived = store(snapshot_dir, snapshot)
+    except OSError as e:
+        # The fetch itself succeeded; its log is saved without a snapshot
+        print(f"Error archiving the snapshot of {link}: {e}")
+        archived = None
+    return result, archived, elapsed
+
+
+def crawl_batch(crawls, max_workers=None, force=False):
+    """Scrape crawls concurrently and yield one result dict per crawl in
+    completion order, then a final summary dict.
+
+    Crawls sharing a canonical link are fetched and extracted once and the
+    result is recorded for each of them. Crawls of competitors whose circuit
+    breaker is open are skipped (unless force) and due again when it may
+    close; a competitor whose cool-down is over gets one link fetched as a
+    probe. With CRAWL_SNAPSHOTS the page of every fetch is archived and
+    linked from its logs. Only the scrapes run in worker threads; once all
+    of them finished, the breakers are updated, the logs of the successful
+    ones are written with one bulk insert, every crawl's next_crawl_at is
+    rescheduled and all of it is committed at once, also when the caller
+    closes the generator early. The summary reports whether that succeeded.
+    """
+    by_link = {}
+    for crawl in crawls:
+        by_link.setdefault(canonicalize_url(crawl.link), []).append(crawl)
+
+    skipped = []
+    if not force:
+        probes, blocked = admit(crawl.enemy_id for crawl in crawls)
+        probing = set()
+        for link, group in list(by_link.items()):
+            enemy_id = group[0].enemy_id
+            if enemy_id in probes and enemy_id not in probing:
+                probing.add(enemy_id)
+                continue
+            until = blocked.get(enemy_id) or probes.get(enemy_id)
+            if until is not None:
+                del by_link[link]
+                skipped.extend((crawl, until) for crawl in group)
+    scraped, snapshots, failed, outcomes = [], [], [], []
+    pending = {}
+    try:
+        for crawl, until in skipped:
+            yield {
+                'crawl_id': crawl.id,
+                'prod_id': crawl.prod_id,
+                'enemy_id': crawl.enemy_id,
+                'link': crawl.link,
+                'status': 'skipped',
+                'error': f'Circuit breaker of enemy {crawl.enemy_id} is open until {until:%Y-%m-%d %H:%M:%S} UTC',
+            }
+
+        max_workers = max(1, min(max_workers or current_app.config['CRAWL_MAX_WORKERS'], len(by_link) or 1))
+        snapshot_dir = archive_dir()
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+            pending = {executor.submit(_timed_scrape, link, snapshot_dir): group for link, group in by_link.items()}
+            for future in concurrent.futures.as_completed(list(pending)):
+                for result in _collect(future, pending.pop(future), scraped, snapshots, failed, outcomes):
+                    yield result
+    finally:
+        # A client leaving a streamed response closes the generator at a
+        # yield. Leaving the executor waited for the scrapes still running,
+        # so their results are saved together with the ones already sent.
+        for future, group in pending.items():
+            _collect(future, group, scraped, snapshots, failed, outcomes)
+        summary = _save(crawls, by_link, scraped, snapshots, failed, skipped, outcomes)
+    yield summary
+
+
+def _collect(future, group, scraped, snapshots, failed, outcomes):
+    """Sort the finished fetch of a group of crawls into scraped or failed
+    and return the result dict of each crawl."""
+    try:
+        crawl_result, snapshot, elapsed = future.result()
+        error = None
+        outcomes.append((group[0].enemy_id, 'Empty extraction' if is_empty(crawl_result) else None))
+    except Exception as e:
+        print(f"Error crawling {group[0].link}: {e}")
+        error = str(e)
+        outcomes.append((group[0].enemy_id, error))
+    results = []
+    for crawl in group:
+        result = {
+            'crawl_id': crawl.id,
+            'prod_id': crawl.prod_id,
+            'enemy_id': crawl.enemy_id,
+            'link': crawl.link,
+        }
+        if error is None:
+            scraped.append((crawl, crawl_result))
+            snapshots.append(snapshot)
+            result.update(status='ok', name=crawl_result.get('product_name', 'Unknown'),
+                          price=crawl_result.get('current_price'), seconds=round(elapsed, 2))
+        else:
+            result.update(status='error', error=error)
+            failed.append(crawl)
+        results.append(result)
+    return results
+
+
+def _save(crawls, by_link, scraped, snapshots, failed, skipped, outcomes):
+    """Update the breakers, save the logs and due times of a batch and
+    commit; returns the summary dict."""
+    summary = {
+        'done': True,
+        'requested': len(crawls),
+        'fetched': len(by_link),
+        'succeeded': len(scraped),
+        'failed': len(failed),
+        'skipped': len(skipped),
+        'saved': False,
+    }
+    try:
+        # Before the session writes anything, so its transaction does not block these
+        record_outcomes(outcomes)
+    except Exception as e:
+        print(f"Error updating circuit breakers: {e}")
+    try:
+        if scraped:
+            record_crawl_results(scraped, snapshots=snapshots)
+        schedule_next([crawl for crawl, _ in scraped], failed)
+        for crawl, until in skipped:
+            crawl.next_crawl_at = until
+        db.session.commit()
+        summary['saved'] = bool(scraped)
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error saving crawl logs: {e}")
+        summary['error'] = f'Error saving crawl logs: {e}'
+    return summary
+
+
+def spread_all(app, window_minutes):
+    """Scheduled fixed-interval crawling: give every product crawl one due
+    time spread evenly over the next window_minutes. crawl_due then crawls
+    them as they come due."""
+    with app.app_context():
+        spread(ProductCrawl.query.all(), window_minutes)
+        db.session.commit()
+
+
+def crawl_due(app):
+    """Scheduled crawl of the product crawls whose next_crawl_at has passed.
+
+    A tick starts at most CRAWL_CAPACITY_PER_HOUR worth of crawls, commits
+    every CRAWL_COMMIT_BATCH_SIZE of them and is skipped while the previous
+    run is still going.
+    """
+    if not _run_lock.acquire(blocking=False):
+        print("Scheduled crawl skipped: the previous run is still in progress")
+        return
+    try:
+        with app.app_context():
+            crawl_ids = [crawl.id for crawl in due_crawls()]
+            chunk_size = max(1, app.config['CRAWL_COMMIT_BATCH_SIZE'])
+            for start in range(0, len(crawl_ids), chunk_size):
+                crawls = ProductCrawl.query.filter(
+                    ProductCrawl.id.in_(crawl_ids[start:start + chunk_size])
+                ).order_by(ProductCrawl.id).all()
+                _run_scheduled(crawls)
+    finally:
+        _run_lock.release()
+
+
+def _run_scheduled(crawls):
+    # crawl_batch commits its logs and new due times before returning
+    for result in crawl_batch(crawls):
+        if result.get('done'):
+            print(f"Scheduled crawl: {result['fetched']} pages fetched for {result['requested']} crawls, "
+                  f"{result['succeeded']} succeeded, {result['failed']} failed, {result['skipped']} skipped")
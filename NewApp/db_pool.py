@@ -0,0 +1,74 @@
+import threading
+import time
+from sqlalchemy import event
+
+# Connection pool counters of this process, updated by pool events
+_lock = threading.Lock()
+_stats = {
+    'connects': 0,
+    'checkouts': 0,
+    'invalidations': 0,
+    'max_checked_out': 0,
+    'hold_seconds': 0.0,
+    'max_hold_seconds': 0.0,
+    'checkins': 0,
+}
+_checked_out = 0
+
+
+def install_pool_metrics(engine):
+    """Count connections opened, checked out and invalidated (e.g. found dead
+    by pre-ping) by the pool of engine, and how long they are held."""
+
+    @event.listens_for(engine, 'connect')
+    def on_connect(dbapi_connection, connection_record):
+        with _lock:
+            _stats['connects'] += 1
+
+    @event.listens_for(engine, 'checkout')
+    def on_checkout(dbapi_connection, connection_record, connection_proxy):
+        global _checked_out
+        connection_record.info['checked_out_at'] = time.monotonic()
+        with _lock:
+            _stats['checkouts'] += 1
+            _checked_out += 1
+            _stats['max_checked_out'] = max(_stats['max_checked_out'], _checked_out)
+
+    @event.listens_for(engine, 'checkin')
+    def on_checkin(dbapi_connection, connection_record):
+        global _checked_out
+        started = connection_record.info.pop('checked_out_at', None)
+        if started is None:
+            return
+        held = time.monotonic() - started
+        with _lock:
+            _checked_out -= 1
+            _stats['checkins'] += 1
+            _stats['hold_seconds'] += held
+            _stats['max_hold_seconds'] = max(_stats['max_hold_seconds'], held)
+
+    @event.listens_for(engine, 'invalidate')
+    def on_invalidate(dbapi_connection, connection_record, exception):
+        with _lock:
+            _stats['invalidations'] += 1
+
+
+def pool_metrics(engine):
+    """Current pool state of engine and the counters since the process started."""
+    pool = engine.pool
+    with _lock:
+        stats = dict(_stats)
+    return {
+        'pool': type(pool).__name__,
+        # Only queue pools (MySQL, SQLite files) have a size and overflow
+        'size': pool.size() if hasattr(pool, 'size') else None,
+        'checked_in': pool.checkedin() if hasattr(pool, 'checkedin') else None,
+        'checked_out': pool.checkedout() if hasattr(pool, 'checkedout') else None,
+        'overflow': pool.overflow() if hasattr(pool, 'overflow') else None,
+        'max_checked_out': stats['max_checked_out'],
+        'connects': stats['connects'],
+        'checkouts': stats['checkouts'],
+        'invalidations': stats['invalidations'],
+        'mean_hold_ms': round(stats['hold_seconds'] / stats['checkins'] * 1000, 3) if stats['checkins'] else 0.0,
+        'max_hold_ms': round(stats['max_hold_seconds'] * 1000, 3),
+    }
@@ -0,0 +1,150 @@
+import datetime
+from flask import current_app
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from NewApp import db
+from NewApp.models import EnemyHealth
+
+CLOSED = 'closed'
+OPEN = 'open'
+HALF_OPEN = 'half_open'
+
+# Breaker changes run in their own short transactions on the engine, not in
+# the session of the crawl: a probe claim must be visible to other processes
+# at once, and must not hold row locks while the batch scrapes for minutes.
+
+
+def is_empty(result):
+    """An extraction without a price: the page showed no product, e.g. a
+    block page or a changed layout."""
+    return not result.get('current_price')
+
+
+def cooldown(trips):
+    """Cool-down after the breaker opened trips times in a row."""
+    config = current_app.config
+    minutes = config['CRAWL_BREAKER_COOLDOWN_MINUTES'] * 2 ** max(trips - 1, 0)
+    return datetime.timedelta(minutes=min(minutes, config['CRAWL_BREAKER_MAX_COOLDOWN_MINUTES']))
+
+
+def admit(enemy_ids, now=None):
+    """Decide which competitors may be crawled now.
+
+    Returns (probes, blocked): {enemy_id: probe_until} of open breakers
+    whose cool-down is over, which may fetch one link as a probe, and
+    {enemy_id: open_until} of those to skip. Other enemies are closed and
+    crawled normally. Claiming a probe moves the breaker to half open until
+    probe_until, so concurrent batches and processes skip the site while
+    the probe runs.
+    """
+    now = now or datetime.datetime.utcnow()
+    enemy_ids = {enemy_id for enemy_id in enemy_ids if enemy_id is not None}
+    probes, blocked = {}, {}
+    if not enemy_ids:
+        return probes, blocked
+    with db.engine.begin() as connection:
+        rows = connection.execute(select(EnemyHealth.enemy_id, EnemyHealth.open_until).where(
+            EnemyHealth.enemy_id.in_(enemy_ids), EnemyHealth.open_until.isnot(None),
+        )).all()
+    probe_until = now + datetime.timedelta(minutes=current_app.config['CRAWL_BREAKER_PROBE_MINUTES'])
+    for enemy_id, open_until in rows:
+        if now < open_until:
+            blocked[enemy_id] = open_until
+            continue
+        with db.engine.begin() as connection:
+            claimed = connection.execute(update(EnemyHealth).where(
+                EnemyHealth.enemy_id == enemy_id, EnemyHealth.open_until == open_until,
+            ).values(state=HALF_OPEN, open_until=probe_until)).rowcount
+        if claimed:
+            probes[enemy_id] = probe_until
+        else:
+            # Another batch claimed the probe first
+            blocked[enemy_id] = probe_until
+    return probes, blocked
+
+
+def record_outcomes(outcomes, now=None):
+    """Update the breakers from fetch outcomes, (enemy_id, error) pairs in
+    completion order with error None for a successful fetch.
+
+    A success closes the breaker. A failure opens a closed breaker once
+    CRAWL_BREAKER_FAILURE_THRESHOLD failures are in a row, and reopens a
+    half open one (a failed probe) with a doubled cool-down.
+    """
+    now = now or datetime.datetime.utcnow()
+    by_enemy = {}
+    for enemy_id, error in outcomes:
+        if enemy_id is not None:
+            by_enemy.setdefault(enemy_id, []).append(error)
+    if not by_enemy:
+        return
+    for attempt in range(2):
+        try:
+            with db.engine.begin() as connection:
+                _record(connection, by_enemy, now)
+            return
+        except IntegrityError:
+            # Another process created a missing row first; it exists now
+            if attempt:
+                raise
+
+
+def _record(connection, by_enemy, now):
+    threshold = current_app.config['CRAWL_BREAKER_FAILURE_THRESHOLD']
+    table = EnemyHealth.__table__
+    rows = connection.execute(
+        select(table).where(table.c.enemy_id.in_(by_enemy)).with_for_update()
+    ).mappings().all()
+    existing = {row['enemy_id']: dict(row) for row in rows}
+    for enemy_id, errors in by_enemy.items():
+        health = existing.get(enemy_id) or {
+            'enemy_id': enemy_id, 'state': CLOSED, 'consecutive_failures': 0, 'trips': 0, 'open_until': None,
+            'last_error': None, 'last_failure_at': None, 'last_success_at': None,
+        }
+        for error in errors:
+            if error is None:
+                health.update(state=CLOSED, consecutive_failures=0, trips=0, open_until=None, last_success_at=now)
+                continue
+            health.update(consecutive_failures=health['consecutive_failures'] + 1,
+                          last_error=error[:255], last_failure_at=now)
+            if health['state'] == HALF_OPEN or (health['state'] == CLOSED and health['consecutive_failures'] >= threshold):
+                trips = health['trips'] + 1
+                health.update(state=OPEN, trips=trips, open_until=now + cooldown(trips))
+                print(f"Circuit breaker opened for enemy {enemy_id} until {health['open_until']:%Y-%m-%d %H:%M} "
+                      f"after {health['consecutive_failures']} failures: {error}")
+        if enemy_id in existing:
+            connection.execute(update(EnemyHealth).where(EnemyHealth.enemy_id == enemy_id).values(health))
+        else:
+            connection.execute(insert(EnemyHealth).values(health))
+
+
+def reset(enemy_id):
+    """Close the breaker of an enemy, e.g. after the site was fixed."""
+    db.session.execute(update(EnemyHealth).where(EnemyHealth.enemy_id == enemy_id).values(
+        state=CLOSED, consecutive_failures=0, trips=0, open_until=None,
+    ))
+    db.session.commit()
+
+
+def health_report(enemies, now=None):
+    """Breaker state of each enemy as dicts, enemies without a row closed."""
+    now = now or datetime.datetime.utcnow()
+    rows = {row.enemy_id: row for row in EnemyHealth.query.filter(EnemyHealth.enemy_id.in_([e.id for e in enemies]))}
+    report = []
+    for enemy in enemies:
+        row = rows.get(enemy.id)
+        report.append({
+            'enemy_id': enemy.id,
+            'name': enemy.name,
+            'domain': enemy.domain,
+            'state': row.state if row else CLOSED,
+            # An open breaker whose cool-down is over lets the next crawl probe
+            'crawlable': row is None or row.open_until is None or row.open_until <= now,
+            'consecutive_failures': row.consecutive_failures if row else 0,
+            'trips': row.trips if row else 0,
+            'open_until': row.open_until.isoformat() if row and row.open_until else None,
+            'last_error': row.last_error if row else None,
+            'last_failure_at': row.last_failure_at.isoformat() if row and row.last_failure_at else None,
+            'last_success_at': row.last_success_at.isoformat() if row and row.last_success_at else None,
+        })
+    return report
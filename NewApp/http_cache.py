@@ -0,0 +1,205 @@
+import datetime
+import functools
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from flask import Response, current_app, request
+from flask_restx.utils import unpack
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from NewApp import api as root_api, db
+from NewApp.models import CacheGeneration
+
+# Cache tag of every table; a commit touching a table drops the cached
+# responses carrying its tag. Every commit also bumps the tag's row in
+# cache_generations, and entries are only served while those rows are
+# unchanged, so commits of other worker processes, the scheduler leader
+# and CLI commands invalidate this process's entries as well.
+TABLE_TAGS = {
+    'products': 'product',
+    'enemies': 'enemy',
+    'product_crawls': 'product_crawl',
+    'product_crawl_logs': 'product_crawl_log',
+    'product_crawl_log_rollups': 'product_crawl_log',
+    'product_crawl_variant_prices': 'product_crawl_log',
+    'crawl_payloads': 'product_crawl_log',
+}
+
+_lock = threading.Lock()
+_entries = OrderedDict()
+# tag: (generation and last change or None if never changed, time read)
+_generations = {}
+_started_at = datetime.datetime.now(datetime.timezone.utc).replace(microsecond=0)
+
+
+class CacheEntry:
+    def __init__(self, tags, generations, body, headers, etag, last_modified):
+        self.tags = tags
+        self.generations = generations
+        self.body = body
+        self.headers = headers
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.monotonic()
+
+
+def cached(*tags):
+    """Cache the marshalled 200 responses of a GET handler in-process.
+
+    Responses carry an ETag (hash of the body) and a Last-Modified (last
+    change of any of tags) and are answered with 304 when the client already
+    has them. Entries live for HTTP_CACHE_TTL_SECONDS or until a commit in
+    any process touches a table with one of tags; commits of other processes
+    are seen within HTTP_CACHE_GENERATION_TTL_SECONDS. Place it above
+    @api.marshal_with.
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            # Field masks (X-Fields) change the body for the same URL
+            key = (request.full_path, request.headers.get(current_app.config.get('RESTX_MASK_HEADER', 'X-Fields')))
+            ttl = current_app.config['HTTP_CACHE_TTL_SECONDS']
+            # Read before the handler runs: a commit while it builds the
+            # response bumps the generation, so the entry is never served
+            shared = _shared_generations(tags)
+            generations = [shared[tag][0] if tag in shared else 0 for tag in tags]
+            last_modified = max(shared[tag][1] if tag in shared else _started_at for tag in tags)
+            with _lock:
+                entry = _entries.get(key)
+                if (entry is not None and entry.generations == generations
+                        and time.monotonic() - entry.stored_at < ttl):
+                    _entries.move_to_end(key)
+                    status = 'HIT'
+                else:
+                    entry = None
+                    status = 'MISS'
+
+            if entry is None:
+                result = func(*args, **kwargs)
+                if isinstance(result, Response):
+                    return result
+                data, code, headers = unpack(result)
+                response = root_api.make_response(data, code, headers=headers)
+                if response.status_code != 200:
+                    return response
+                body = response.get_data()
+                entry = CacheEntry(
+                    tags, generations, body, response.headers.copy(), hashlib.sha1(body).hexdigest(), last_modified
+                )
+                if ttl > 0:
+                    _store(key, entry)
+
+            response = Response(entry.body, status=200, headers=entry.headers)
+            response.set_etag(entry.etag)
+            response.last_modified = entry.last_modified
+            response.headers['Cache-Control'] = 'no-cache'
+            response.headers['X-Cache'] = status
+            return response.make_conditional(request)
+        return wrapper
+    return decorator
+
+
+def invalidate(*tags):
+    """Drop the cached responses of this process carrying any of tags."""
+    with _lock:
+        for key in [key for key, entry in _entries.items() if set(entry.tags) & set(tags)]:
+            del _entries[key]
+        for tag in tags:
+            _generations.pop(tag, None)
+
+
+def _shared_generations(tags):
+    """{tag: (generation, last change as aware UTC)} of the tags changed so far.
+
+    Generations read less than HTTP_CACHE_GENERATION_TTL_SECONDS ago are
+    reused, so a burst of cached requests costs one query per window instead
+    of one per request; 0 reads them on every request.
+    """
+    now = time.monotonic()
+    window = current_app.config['HTTP_CACHE_GENERATION_TTL_SECONDS']
+    with _lock:
+        known = {tag: _generations[tag] for tag in tags if tag in _generations}
+    if len(known) == len(tags) and all(now - read_at < window for _, read_at in known.values()):
+        return {tag: value for tag, (value, _) in known.items() if value is not None}
+
+    rows = db.session.execute(
+        select(CacheGeneration.tag, CacheGeneration.generation, CacheGeneration.changed_at)
+        .where(CacheGeneration.tag.in_(tags))
+    )
+    shared = {
+        tag: (generation, changed_at.replace(tzinfo=datetime.timezone.utc))
+        for tag, generation, changed_at in rows
+    }
+    if window > 0:
+        with _lock:
+            for tag in tags:
+                _generations[tag] = (shared.get(tag), now)
+    return shared
+
+
+def _publish(bind, tags):
+    """Bump the shared generation of tags in a short transaction of its own."""
+    now = datetime.datetime.utcnow().replace(microsecond=0)
+    for attempt in range(2):
+        try:
+            with bind.begin() as connection:
+                # Sorted, so concurrent commits lock the rows in the same order
+                for tag in sorted(tags):
+                    bumped = connection.execute(update(CacheGeneration).where(CacheGeneration.tag == tag).values(
+                        generation=CacheGeneration.generation + 1, changed_at=now,
+                    )).rowcount
+                    if not bumped:
+                        connection.execute(insert(CacheGeneration).values(tag=tag, generation=1, changed_at=now))
+            return
+        except IntegrityError:
+            # Another process created a missing row first; it exists now
+            if attempt:
+                raise
+
+
+def _store(key, entry):
+    with _lock:
+        _entries[key] = entry
+        _entries.move_to_end(key)
+        while len(_entries) > current_app.config['HTTP_CACHE_MAX_ENTRIES']:
+            _entries.popitem(last=False)
+
+
+def _tags_of(objects):
+    return {TABLE_TAGS.get(obj.__table__.name, obj.__table__.name) for obj in objects if hasattr(obj, '__table__')}
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_changes(session, flush_context):
+    changed = session.info.setdefault('http_cache_tags', set())
+    changed.update(_tags_of(session.new))
+    changed.update(_tags_of(session.dirty))
+    changed.update(_tags_of(session.deleted))
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_changes(orm_execute_state):
+    # Bulk insert()/update()/delete() statements bypass the flush
+    if orm_execute_state.is_select or orm_execute_state.bind_mapper is None:
+        return
+    if orm_execute_state.is_insert or orm_execute_state.is_update or orm_execute_state.is_delete:
+        changed = orm_execute_state.session.info.setdefault('http_cache_tags', set())
+        changed.update(_tags_of([orm_execute_state.bind_mapper.class_]))
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_changes(session):
+    changed = session.info.pop('http_cache_tags', None)
+    if changed:
+        invalidate(*changed)
+        try:
+            _publish(session.get_bind(), changed)
+        except Exception as e:
+            print(f"Error publishing cache invalidation of {sorted(changed)}: {e}")
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_changes(session):
+    session.info.pop('http_cache_tags', None)
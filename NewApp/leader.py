@@ -0,0 +1,106 @@
+import atexit
+import datetime
+import os
+import socket
+import threading
+import uuid
+from sqlalchemy import insert, or_, update
+from sqlalchemy.exc import IntegrityError
+from NewApp import db
+from NewApp.models import SchedulerLease
+from NewApp.scheduler import scheduler, start_scheduler
+
+SCHEDULER_LEASE = 'scheduler'
+
+
+class LeaderElection:
+    """Keeps at most one process of a deployment running scheduled jobs.
+
+    Every process tries to take or renew a lease row every
+    LEADER_RENEW_SECONDS. The holder runs the scheduler; when it stops
+    renewing (crash, network loss) the lease expires after
+    LEADER_LEASE_SECONDS and another process takes over.
+    """
+
+    def __init__(self, app, name=SCHEDULER_LEASE):
+        self.app = app
+        self.name = name
+        self.holder = f'{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}'
+        self.lease = datetime.timedelta(seconds=app.config['LEADER_LEASE_SECONDS'])
+        self.renew_seconds = app.config['LEADER_RENEW_SECONDS']
+        self.is_leader = False
+        self._held_until = None
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'leader-election-{name}', daemon=True)
+
+    def start(self):
+        self._thread.start()
+        atexit.register(self.stop)
+        return self
+
+    def stop(self):
+        """Stop campaigning and hand the lease over at once."""
+        self._stopped.set()
+        if self.is_leader:
+            self._demote()
+            try:
+                with self.app.app_context():
+                    db.session.execute(update(SchedulerLease).where(
+                        SchedulerLease.name == self.name, SchedulerLease.holder == self.holder,
+                    ).values(expires_at=datetime.datetime.utcnow()))
+                    db.session.commit()
+            except Exception as e:
+                print(f"Could not release the {self.name} lease: {e}")
+
+    def _run(self):
+        while not self._stopped.is_set():
+            try:
+                with self.app.app_context():
+                    acquired = self.try_acquire()
+            except Exception as e:
+                print(f"Leader election for {self.name} failed: {e}")
+                # Keep running jobs only while the last renewal is still valid
+                acquired = self._held_until is not None and datetime.datetime.utcnow() < self._held_until
+            if acquired and not self.is_leader:
+                self._promote()
+            elif not acquired and self.is_leader:
+                self._demote()
+            elif acquired:
+                # Pick up jobs other processes added to the shared job store
+                scheduler.wakeup()
+            self._stopped.wait(self.renew_seconds)
+
+    def try_acquire(self):
+        """Take the lease if it is free or expired, or renew it if it is ours.
+        Returns whether this process holds it."""
+        now = datetime.datetime.utcnow()
+        expires_at = now + self.lease
+        renewed = db.session.execute(update(SchedulerLease).where(
+            SchedulerLease.name == self.name,
+            or_(SchedulerLease.holder == self.holder, SchedulerLease.expires_at < now),
+        ).values(holder=self.holder, expires_at=expires_at))
+        if renewed.rowcount == 0:
+            try:
+                db.session.execute(insert(SchedulerLease).values(name=self.name, holder=self.holder, expires_at=expires_at))
+            except IntegrityError:
+                # Another process holds a valid lease
+                db.session.rollback()
+                return False
+        db.session.commit()
+        self._held_until = expires_at
+        return True
+
+    def _promote(self):
+        print(f"{self.holder} elected to run scheduled jobs")
+        self.is_leader = True
+        start_scheduler(self.app)
+
+    def _demote(self):
+        print(f"{self.holder} no longer holds the {self.name} lease, pausing scheduled jobs")
+        self.is_leader = False
+        scheduler.pause()
+
+
+def start_leader_election(app):
+    """Run the scheduler in whichever process of the deployment wins the lease."""
+    return LeaderElection(app).start()
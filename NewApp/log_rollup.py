@@ -0,0 +1,271 @@
+import datetime
+from flask import current_app
+from sqlalchemy import func
+from NewApp import db
+from NewApp.models import ProductCrawl, ProductCrawlLog, ProductCrawlLogRollup, delete_orphan_payloads
+from NewApp.snapshots import prune
+
+GRANULARITIES = {
+    'hour': datetime.timedelta(hours=1),
+    'day': datetime.timedelta(days=1),
+}
+
+
+def bucket_start(timestamp, granularity):
+    """Truncate a timestamp to the start of its hourly or daily bucket."""
+    if granularity == 'hour':
+        return timestamp.replace(minute=0, second=0, microsecond=0)
+    return timestamp.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def rollup_logs(now=None):
+    """Compact raw logs older than LOG_ROLLUP_AFTER_HOURS into hourly and daily
+    aggregates, then prune raw rows and hourly rollups past their retention,
+    and the payloads and page snapshots only the pruned rows used.
+
+    Only whole days that end before the cutoff are rolled up, so run-length
+    logs (which never cross a day boundary) are closed by then. Each crawl
+    resumes after its newest existing bucket, so the job is safe to re-run.
+    Raw rows are never deleted before the daily bucket covering them exists.
+    """
+    config = current_app.config
+    now = now or datetime.datetime.utcnow()
+    cutoff = now - datetime.timedelta(hours=config['LOG_ROLLUP_AFTER_HOURS'])
+    raw_cutoff = now - datetime.timedelta(days=config['LOG_RAW_RETENTION_DAYS'])
+    hourly_cutoff = now - datetime.timedelta(days=config['LOG_HOURLY_RETENTION_DAYS'])
+
+    stats = {'hour': 0, 'day': 0, 'raw_deleted': 0, 'hourly_deleted': 0}
+    crawl_ids = [row.id for row in db.session.query(ProductCrawl.id).all()]
+    for crawl_id in crawl_ids:
+        for granularity in GRANULARITIES:
+            stats[granularity] += _rollup_crawl(crawl_id, granularity, cutoff)
+
+        # Anything before the end of the newest daily bucket is safely aggregated
+        day_watermark = _watermark(crawl_id, 'day')
+        if day_watermark is None:
+            continue
+        covered_until = day_watermark + GRANULARITIES['day']
+
+        stats['raw_deleted'] += ProductCrawlLog.query.filter(
+            ProductCrawlLog.product_crawl_id == crawl_id,
+            ProductCrawlLog.timestamp < min(raw_cutoff, covered_until),
+        ).delete(synchronize_session=False)
+        stats['hourly_deleted'] += ProductCrawlLogRollup.query.filter(
+            ProductCrawlLogRollup.product_crawl_id == crawl_id,
+            ProductCrawlLogRollup.granularity == 'hour',
+            ProductCrawlLogRollup.bucket_start < min(hourly_cutoff, covered_until),
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+    if stats['raw_deleted']:
+        stats['payloads_deleted'] = delete_orphan_payloads()
+    db.session.commit()
+    if stats['raw_deleted']:
+        # After the commit, so files of the deleted logs are unreferenced
+        stats['snapshots_deleted'] = prune()
+    return stats
+
+
+def rollup_job(app):
+    """Scheduler entry point for rollup_logs."""
+    with app.app_context():
+        stats = rollup_logs()
+        print(f"Crawl log rollup finished: {stats}")
+
+
+def _watermark(crawl_id, granularity):
+    return db.session.query(func.max(ProductCrawlLogRollup.bucket_start)).filter(
+        ProductCrawlLogRollup.product_crawl_id == crawl_id,
+        ProductCrawlLogRollup.granularity == granularity,
+    ).scalar()
+
+
+def _observations(timestamp, last_seen_at, observation_count):
+    """Expand a (possibly run-length) log row into (timestamp, count) points."""
+    count = observation_count or 1
+    if count > 1 and last_seen_at is not None and last_seen_at > timestamp:
+        return [(timestamp, 1), (last_seen_at, count - 1)]
+    return [(timestamp, count)]
+
+
+def _rollup_crawl(crawl_id, granularity, cutoff):
+    step = GRANULARITIES[granularity]
+    end = bucket_start(cutoff, 'day')
+    query = db.session.query(
+        ProductCrawlLog.timestamp,
+        ProductCrawlLog.last_seen_at,
+        ProductCrawlLog.observation_count,
+        ProductCrawlLog.price,
+        ProductCrawlLog.name,
+    ).filter(
+        ProductCrawlLog.product_crawl_id == crawl_id,
+        ProductCrawlLog.price.isnot(None),
+        ProductCrawlLog.timestamp < end,
+    )
+    watermark = _watermark(crawl_id, granularity)
+    if watermark is not None:
+        query = query.filter(ProductCrawlLog.timestamp >= watermark + step)
+
+    buckets = _aggregate(crawl_id, granularity, query.order_by(ProductCrawlLog.timestamp.asc(), ProductCrawlLog.id.asc()))
+    db.session.add_all(buckets.values())
+    db.session.flush()
+    return len(buckets)
+
+
+def rebuild_day(crawl_id, day):
+    """Recompute the existing hourly and daily rollups of a crawl for the day
+    starting at day from its raw logs, e.g. after their prices were
+    corrected. The raw logs of that day must all still exist."""
+    end = day + GRANULARITIES['day']
+    rows = db.session.query(
+        ProductCrawlLog.timestamp,
+        ProductCrawlLog.last_seen_at,
+        ProductCrawlLog.observation_count,
+        ProductCrawlLog.price,
+        ProductCrawlLog.name,
+    ).filter(
+        ProductCrawlLog.product_crawl_id == crawl_id,
+        ProductCrawlLog.price.isnot(None),
+        # Runs never cross a day boundary, so every observation is inside
+        ProductCrawlLog.timestamp >= day,
+        ProductCrawlLog.timestamp < end,
+    ).order_by(ProductCrawlLog.timestamp.asc(), ProductCrawlLog.id.asc()).all()
+    for granularity in GRANULARITIES:
+        deleted = ProductCrawlLogRollup.query.filter(
+            ProductCrawlLogRollup.product_crawl_id == crawl_id,
+            ProductCrawlLogRollup.granularity == granularity,
+            ProductCrawlLogRollup.bucket_start >= day,
+            ProductCrawlLogRollup.bucket_start < end,
+        ).delete(synchronize_session=False)
+        # Hourly rollups past their retention stay deleted
+        if deleted:
+            db.session.add_all(_aggregate(crawl_id, granularity, rows).values())
+    db.session.flush()
+
+
+def has_rollups(crawl_id, day):
+    """Whether the day starting at day has a rollup of crawl_id of any granularity."""
+    return db.session.query(ProductCrawlLogRollup.query.filter(
+        ProductCrawlLogRollup.product_crawl_id == crawl_id,
+        ProductCrawlLogRollup.bucket_start >= day,
+        ProductCrawlLogRollup.bucket_start < day + GRANULARITIES['day'],
+    ).exists()).scalar()
+
+
+def _aggregate(crawl_id, granularity, rows):
+    """{bucket start: ProductCrawlLogRollup} of (timestamp, last_seen_at,
+    observation_count, price, name) rows in chronological order."""
+    buckets = {}
+    for timestamp, last_seen_at, observation_count, price, name in rows:
+        for observed_at, count in _observations(timestamp, last_seen_at, observation_count):
+            start = bucket_start(observed_at, granularity)
+            bucket = buckets.get(start)
+            if bucket is None:
+                buckets[start] = ProductCrawlLogRollup(
+                    product_crawl_id=crawl_id,
+                    granularity=granularity,
+                    bucket_start=start,
+                    first_at=observed_at,
+                    last_at=observed_at,
+                    first_price=price,
+                    last_price=price,
+                    min_price=price,
+                    max_price=price,
+                    count=count,
+                    last_name=name,
+                )
+                continue
+            bucket.last_at = observed_at
+            bucket.last_price = price
+            bucket.last_name = name
+            bucket.min_price = min(bucket.min_price, price)
+            bucket.max_price = max(bucket.max_price, price)
+            bucket.count += count
+    return buckets
+
+
+def load_price_series(product_crawl_ids, start=None, end=None):
+    """Return {product_crawl_id: [point, ...]} merging raw logs with rollups.
+
+    Raw logs are used where they still exist, with run-length logs expanded to
+    their first and last observation; hourly rollups cover the time
+    before the oldest raw log and daily rollups the time before that. Each
+    point is a dict with id, timestamp, price, name and tier, plus min/max and
+    count for rolled-up points. start/end optionally limit the series to
+    [start, end). Two queries regardless of how many crawls.
+    """
+    product_crawl_ids = list(product_crawl_ids)
+    series = {crawl_id: [] for crawl_id in product_crawl_ids}
+    if not product_crawl_ids:
+        return series
+
+    raw_rows = db.session.query(
+        ProductCrawlLog.product_crawl_id,
+        ProductCrawlLog.id,
+        ProductCrawlLog.timestamp,
+        ProductCrawlLog.last_seen_at,
+        ProductCrawlLog.observation_count,
+        ProductCrawlLog.price,
+        ProductCrawlLog.name,
+    ).filter(
+        ProductCrawlLog.product_crawl_id.in_(product_crawl_ids),
+        ProductCrawlLog.price.isnot(None),
+    )
+    if start is not None:
+        # A run that began earlier may still have observations inside the range
+        raw_rows = raw_rows.filter(func.coalesce(ProductCrawlLog.last_seen_at, ProductCrawlLog.timestamp) >= start)
+    if end is not None:
+        raw_rows = raw_rows.filter(ProductCrawlLog.timestamp < end)
+    raw_rows = raw_rows.order_by(ProductCrawlLog.product_crawl_id, ProductCrawlLog.timestamp.asc(), ProductCrawlLog.id.asc())
+
+    raw = {crawl_id: [] for crawl_id in product_crawl_ids}
+    for crawl_id, log_id, timestamp, last_seen_at, observation_count, price, name in raw_rows:
+        # A run-length log contributes its first and last observation
+        for observed_at, _ in _observations(timestamp, last_seen_at, observation_count):
+            if (start is not None and observed_at < start) or (end is not None and observed_at >= end):
+                continue
+            raw[crawl_id].append({
+                'id': log_id,
+                'timestamp': observed_at,
+                'price': float(price),
+                'name': name,
+                'tier': 'raw',
+            })
+
+    rollups = {crawl_id: {'hour': [], 'day': []} for crawl_id in product_crawl_ids}
+    rollup_rows = ProductCrawlLogRollup.query.filter(
+        ProductCrawlLogRollup.product_crawl_id.in_(product_crawl_ids)
+    )
+    if start is not None:
+        rollup_rows = rollup_rows.filter(ProductCrawlLogRollup.last_at >= start)
+    if end is not None:
+        rollup_rows = rollup_rows.filter(ProductCrawlLogRollup.last_at < end)
+    rollup_rows = rollup_rows.order_by(ProductCrawlLogRollup.bucket_start.asc())
+    for rollup in rollup_rows:
+        rollups[rollup.product_crawl_id][rollup.granularity].append(rollup)
+
+    for crawl_id in product_crawl_ids:
+        # Walk tiers from finest to coarsest, each one only filling the time
+        # before the tier after it begins
+        boundary = raw[crawl_id][0]['timestamp'] if raw[crawl_id] else None
+        older = []
+        for granularity in ('hour', 'day'):
+            tier = [r for r in rollups[crawl_id][granularity] if boundary is None or r.last_at < boundary]
+            if tier:
+                older = [_rollup_point(r) for r in tier] + older
+                boundary = tier[0].first_at
+        series[crawl_id] = older + raw[crawl_id]
+    return series
+
+
+def _rollup_point(rollup):
+    return {
+        'id': None,
+        'timestamp': rollup.last_at,
+        'price': float(rollup.last_price),
+        'name': rollup.last_name,
+        'tier': rollup.granularity,
+        'min_price': float(rollup.min_price),
+        'max_price': float(rollup.max_price),
+        'count': rollup.count,
+    }
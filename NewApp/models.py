@@ -1,7 +1,25 @@
 from NewApp import db
 import datetime
-from sqlalchemy.orm import relationship
+import hashlib
+import json
+import zlib
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import relationship, validates
 from sqlalchemy.ext.declarative import DeclarativeMeta
+from NewApp.serializers import row_serializer
+from NewApp.urls import canonicalize_url
+
+
+# Unreferenced payloads younger than this may belong to a crawl not committed yet
+ORPHAN_PAYLOAD_MIN_AGE = datetime.timedelta(hours=1)
+
+
+def hash_link(link):
+    """Fixed-width SHA-256 hex digest used for indexed link lookups."""
+    if link is None:
+        return None
+    return hashlib.sha256(link.encode('utf-8')).hexdigest()
+
 
 class Product(db.Model):
     __tablename__ = 'products'
@@ -23,17 +41,8 @@ class Product(db.Model):
         return f"<Product {self.name}>"
         
     def to_dict(self, include_relationships=True):
-        result = {c.name: getattr(self, c.name) for c in self.__table__.columns}
-        # Convert Decimal to float for JSON serialization
-        if 'org_price' in result and result['org_price'] is not None:
-            result['org_price'] = float(result['org_price'])
-        if 'cur_price' in result and result['cur_price'] is not None:
-            result['cur_price'] = float(result['cur_price'])
-        # Convert datetime objects to ISO format
-        if 'created_at' in result and result['created_at'] is not None:
-            result['created_at'] = result['created_at'].isoformat()
-        if 'updated_at' in result and result['updated_at'] is not None:
-            result['updated_at'] = result['updated_at'].isoformat()
+        # Columns with Decimal as float and datetimes in ISO format
+        result = row_serializer(Product)(self)
         
         if include_relationships:
             result['product_crawls'] = [pc.to_dict(include_relationships=False) for pc in self.product_crawls]
@@ -41,8 +50,28 @@ class Product(db.Model):
         return result
 
 
+class ProductSearchTerm(db.Model):
+    """Word or word prefix of a product's name or SKU, maintained by
+    NewApp.search, so searches are index lookups instead of table scans."""
+    __tablename__ = 'product_search_terms'
+    __table_args__ = (
+        db.Index('ix_product_search_terms_product_id', 'product_id'),
+    )
+
+    term = db.Column(db.String(32), primary_key=True)
+    product_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), primary_key=True)
+    # Relevance of the term for the product; see NewApp.search
+    weight = db.Column(db.SmallInteger, nullable=False)
+
+    def __repr__(self):
+        return f"<ProductSearchTerm {self.term} {self.product_id}>"
+
+
 class Enemy(db.Model):
     __tablename__ = 'enemies'
+    __table_args__ = (
+        db.Index('ix_enemies_domain', 'domain'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     name = db.Column(db.String(255), nullable=False)
@@ -57,12 +86,8 @@ class Enemy(db.Model):
         return f"<Enemy {self.name}>"
     
     def to_dict(self, include_relationships=True):
-        result = {c.name: getattr(self, c.name) for c in self.__table__.columns}
-        # Convert datetime objects to ISO format
-        if 'created_at' in result and result['created_at'] is not None:
-            result['created_at'] = result['created_at'].isoformat()
-        if 'updated_at' in result and result['updated_at'] is not None:
-            result['updated_at'] = result['updated_at'].isoformat()
+        # Columns with datetimes in ISO format
+        result = row_serializer(Enemy)(self)
         
         if include_relationships:
             result['product_crawls'] = [pc.to_dict(include_relationships=False) for pc in self.product_crawls]
@@ -70,13 +95,42 @@ class Enemy(db.Model):
         return result
 
 
+class EnemyHealth(db.Model):
+    """Crawl circuit breaker of a competitor site, maintained by
+    NewApp.enemy_health. A missing row means the breaker is closed."""
+    __tablename__ = 'enemy_health'
+
+    enemy_id = db.Column(db.Integer, db.ForeignKey('enemies.id', ondelete='CASCADE'), primary_key=True)
+    state = db.Column(db.String(10), nullable=False, default='closed')  # 'closed', 'open' or 'half_open'
+    # Failed or empty fetches in a row; reset by any successful one
+    consecutive_failures = db.Column(db.Integer, nullable=False, default=0)
+    # Openings in a row without a successful probe; each doubles the cool-down
+    trips = db.Column(db.Integer, nullable=False, default=0)
+    # Crawls of the site are skipped until then (set while open or half open)
+    open_until = db.Column(db.DateTime)
+    last_error = db.Column(db.String(255))
+    last_failure_at = db.Column(db.DateTime)
+    last_success_at = db.Column(db.DateTime)
+
+    def __repr__(self):
+        return f"<EnemyHealth {self.enemy_id} {self.state}>"
+
+
 class ProductCrawl(db.Model):
     __tablename__ = 'product_crawls'
+    __table_args__ = (
+        db.Index('ix_product_crawls_link_hash', 'link_hash'),
+        db.Index('ix_product_crawls_next_crawl_at', 'next_crawl_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     prod_id = db.Column(db.Integer, db.ForeignKey('products.id', ondelete='CASCADE'), nullable=False)
     enemy_id = db.Column(db.Integer, db.ForeignKey('enemies.id', ondelete='CASCADE'), nullable=False)
     link = db.Column(db.Text, nullable=False)
+    link_hash = db.Column(db.CHAR(64), nullable=False)
+    # Adaptive scheduling: interval derived from the price history and next due time
+    crawl_interval_minutes = db.Column(db.Integer)
+    next_crawl_at = db.Column(db.DateTime)
     created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
     updated_at = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     
@@ -84,17 +138,29 @@ class ProductCrawl(db.Model):
     product = relationship("Product", back_populates="product_crawls")
     enemy = relationship("Enemy", back_populates="product_crawls")
     logs = relationship("ProductCrawlLog", back_populates="product_crawl", cascade="all, delete-orphan")
+    rollups = relationship("ProductCrawlLogRollup", back_populates="product_crawl", cascade="all, delete-orphan")
+    variant_prices = relationship("ProductCrawlVariantPrice", back_populates="product_crawl", cascade="all, delete-orphan")
     
     def __repr__(self):
         return f"<ProductCrawl {self.id}>"
+
+    @validates('link')
+    def _set_link_hash(self, key, link):
+        # Links are stored canonical and the lookup hash is kept in sync
+        link = canonicalize_url(link)
+        self.link_hash = hash_link(link)
+        return link
+
+    @classmethod
+    def find_by_link(cls, link):
+        """Indexed point lookup on link_hash of the canonical link; the link
+        itself guards against collisions."""
+        link = canonicalize_url(link)
+        return cls.query.filter_by(link_hash=hash_link(link), link=link).first()
     
     def to_dict(self, include_relationships=True):
-        result = {c.name: getattr(self, c.name) for c in self.__table__.columns}
-        # Convert datetime objects to ISO format
-        if 'created_at' in result and result['created_at'] is not None:
-            result['created_at'] = result['created_at'].isoformat()
-        if 'updated_at' in result and result['updated_at'] is not None:
-            result['updated_at'] = result['updated_at'].isoformat()
+        # Columns with datetimes in ISO format
+        result = row_serializer(ProductCrawl)(self)
         
         if include_relationships:
             # Include basic product and enemy info without their relationships
@@ -117,28 +183,48 @@ class ProductCrawl(db.Model):
 
 class ProductCrawlLog(db.Model):
     __tablename__ = 'product_crawl_logs'
+    __table_args__ = (
+        db.Index('ix_product_crawl_logs_crawl_timestamp', 'product_crawl_id', 'timestamp'),
+        db.Index('ix_product_crawl_logs_snapshot_image_hash', 'snapshot_image_hash'),
+    )
     
     id = db.Column(db.Integer, primary_key=True, autoincrement=True)
     product_crawl_id = db.Column(db.Integer, db.ForeignKey('product_crawls.id', ondelete='CASCADE'), nullable=False)
     name = db.Column(db.String(255), nullable=False)
     price = db.Column(db.Numeric(12, 2))
     timestamp = db.Column(db.DateTime, default=datetime.datetime.utcnow)
-    other_data = db.Column(db.JSON)
+    payload_id = db.Column(db.Integer, db.ForeignKey('crawl_payloads.id'))
+    # Run-length storage: an unchanged observation extends the existing row
+    last_seen_at = db.Column(db.DateTime)
+    observation_count = db.Column(db.Integer, nullable=False, default=1)
+    # Archived screenshot and page text of the fetch in the snapshot store
+    # (CRAWL_SNAPSHOTS), for re-extraction without crawling again
+    snapshot_image_hash = db.Column(db.CHAR(64))
+    snapshot_text_hash = db.Column(db.CHAR(64))
     
     # Relationships
     product_crawl = relationship("ProductCrawl", back_populates="logs")
+    payload = relationship("CrawlPayload", lazy='joined')
+    variant_prices = relationship("ProductCrawlVariantPrice", back_populates="log", passive_deletes=True)
     
     def __repr__(self):
         return f"<ProductCrawlLog {self.id}>"
+
+    @property
+    def other_data(self):
+        """Extraction payload, stored once per distinct content in crawl_payloads."""
+        if self.payload is None:
+            return None
+        return self.payload.data
+
+    @other_data.setter
+    def other_data(self, value):
+        self.payload = CrawlPayload.for_data(value) if value is not None else None
     
     def to_dict(self, include_relationships=True):
-        result = {c.name: getattr(self, c.name) for c in self.__table__.columns}
-        # Convert Decimal to float for JSON serialization
-        if 'price' in result and result['price'] is not None:
-            result['price'] = float(result['price'])
-        # Convert datetime objects to ISO format
-        if 'timestamp' in result and result['timestamp'] is not None:
-            result['timestamp'] = result['timestamp'].isoformat()
+        # Columns with Decimal as float and datetimes in ISO format
+        result = row_serializer(ProductCrawlLog, exclude=('payload_id',))(self)
+        result['other_data'] = self.other_data
         
         if include_relationships and self.product_crawl:
             result['product_crawl'] = {
@@ -148,4 +234,160 @@ class ProductCrawlLog(db.Model):
                 'link': self.product_crawl.link
             }
         
-        return result
\ No newline at end of file
+        return result
+
+
+class ProductCrawlLogRollup(db.Model):
+    """Hourly or daily price aggregate compacted from raw product_crawl_logs."""
+    __tablename__ = 'product_crawl_log_rollups'
+    __table_args__ = (
+        db.UniqueConstraint('product_crawl_id', 'granularity', 'bucket_start', name='uq_product_crawl_log_rollups_bucket'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    product_crawl_id = db.Column(db.Integer, db.ForeignKey('product_crawls.id', ondelete='CASCADE'), nullable=False)
+    granularity = db.Column(db.String(10), nullable=False)  # 'hour' or 'day'
+    bucket_start = db.Column(db.DateTime, nullable=False)
+    first_at = db.Column(db.DateTime, nullable=False)
+    last_at = db.Column(db.DateTime, nullable=False)
+    first_price = db.Column(db.Numeric(12, 2))
+    last_price = db.Column(db.Numeric(12, 2))
+    min_price = db.Column(db.Numeric(12, 2))
+    max_price = db.Column(db.Numeric(12, 2))
+    count = db.Column(db.Integer, nullable=False, default=0)
+    last_name = db.Column(db.String(255))
+
+    # Relationships
+    product_crawl = relationship("ProductCrawl", back_populates="rollups")
+
+    def __repr__(self):
+        return f"<ProductCrawlLogRollup {self.product_crawl_id} {self.granularity} {self.bucket_start}>"
+
+
+class ProductCrawlVariantPrice(db.Model):
+    """SKU or color variant price extracted from a crawl log's payload."""
+    __tablename__ = 'product_crawl_variant_prices'
+    __table_args__ = (
+        db.Index('ix_variant_prices_key_price', 'variant_key', 'price'),
+        db.Index('ix_variant_prices_crawl_key_timestamp', 'product_crawl_id', 'variant_key', 'timestamp'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    product_crawl_id = db.Column(db.Integer, db.ForeignKey('product_crawls.id', ondelete='CASCADE'), nullable=False)
+    # Kept when raw logs are pruned so variant history outlives log retention
+    log_id = db.Column(db.Integer, db.ForeignKey('product_crawl_logs.id', ondelete='SET NULL'))
+    variant_type = db.Column(db.String(10), nullable=False)  # 'sku' or 'color'
+    variant_key = db.Column(db.String(255), nullable=False)
+    variant_label = db.Column(db.String(255))
+    price = db.Column(db.Numeric(12, 2), nullable=False)
+    timestamp = db.Column(db.DateTime, nullable=False)
+
+    # Relationships
+    product_crawl = relationship("ProductCrawl", back_populates="variant_prices")
+    log = relationship("ProductCrawlLog", back_populates="variant_prices")
+
+    def __repr__(self):
+        return f"<ProductCrawlVariantPrice {self.variant_key} {self.price}>"
+
+
+class CrawlPayload(db.Model):
+    """Content-addressed, zlib-compressed extraction payload shared by crawl logs."""
+    __tablename__ = 'crawl_payloads'
+
+    id = db.Column(db.Integer, primary_key=True, autoincrement=True)
+    hash = db.Column(db.CHAR(64), nullable=False, unique=True)
+    data_compressed = db.Column(db.LargeBinary(length=16777215), nullable=False)
+    size = db.Column(db.Integer, nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    def __repr__(self):
+        return f"<CrawlPayload {self.hash[:12]}>"
+
+    @staticmethod
+    def encode(data):
+        """Return (hash, compressed bytes, size) for a JSON-serializable payload.
+
+        The hash is taken over a key-sorted dump so equal content always maps
+        to the same row; the stored bytes keep the original key order.
+        """
+        canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+        raw = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+        digest = hashlib.sha256(canonical.encode('utf-8')).hexdigest()
+        return digest, zlib.compress(raw), len(raw)
+
+    @classmethod
+    def for_data(cls, data):
+        """Return the stored payload for data, creating it if it is new.
+
+        A new payload is inserted at once in a savepoint, so a concurrent
+        transaction inserting the same content first only costs a re-select
+        instead of failing the caller's whole transaction at commit.
+        """
+        digest, compressed, size = cls.encode(data)
+        now = datetime.datetime.utcnow()
+        with db.session.no_autoflush:
+            payload = cls.query.filter_by(hash=digest).first()
+        if payload is None:
+            payload = cls(hash=digest, data_compressed=compressed, size=size, created_at=now)
+            try:
+                with db.session.begin_nested():
+                    db.session.add(payload)
+            except IntegrityError:
+                # A locking read sees the other transaction's committed row,
+                # which a repeatable-read snapshot would not
+                with db.session.no_autoflush:
+                    payload = cls.query.filter_by(hash=digest).with_for_update().one()
+        elif payload.created_at is None or payload.created_at < now - ORPHAN_PAYLOAD_MIN_AGE / 2:
+            # Reused rows are kept out of delete_orphan_payloads() until the
+            # log referencing them is committed
+            payload.created_at = now
+        return payload
+
+    @staticmethod
+    def decode(data_compressed):
+        return json.loads(zlib.decompress(data_compressed).decode('utf-8'))
+
+    @property
+    def data(self):
+        cached = self.__dict__.get('_data')
+        if cached is None:
+            cached = self.decode(self.data_compressed)
+            self.__dict__['_data'] = cached
+        return cached
+
+
+class CacheGeneration(db.Model):
+    """Change counter of a response cache tag, shared by all processes so a
+    commit in one of them invalidates the cached responses of the others."""
+    __tablename__ = 'cache_generations'
+
+    tag = db.Column(db.String(64), primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    changed_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<CacheGeneration {self.tag} {self.generation}>"
+
+
+class SchedulerLease(db.Model):
+    """Lock row held by the one process allowed to run scheduled jobs."""
+    __tablename__ = 'scheduler_leases'
+
+    name = db.Column(db.String(64), primary_key=True)
+    holder = db.Column(db.String(255), nullable=False)
+    expires_at = db.Column(db.DateTime, nullable=False)
+
+    def __repr__(self):
+        return f"<SchedulerLease {self.name} {self.holder}>"
+
+
+def delete_orphan_payloads():
+    """Delete payloads no longer referenced by any crawl log. Payloads
+    created or reused within ORPHAN_PAYLOAD_MIN_AGE are kept, as a crawl
+    still in progress may link to them; a later run deletes them."""
+    cutoff = datetime.datetime.utcnow() - ORPHAN_PAYLOAD_MIN_AGE
+    referenced = db.session.query(ProductCrawlLog.payload_id).filter(ProductCrawlLog.payload_id.isnot(None))
+    return CrawlPayload.query.filter(
+        ~CrawlPayload.id.in_(referenced),
+        db.or_(CrawlPayload.created_at.is_(None), CrawlPayload.created_at < cutoff),
+    ).delete(synchronize_session=False)
@@ -0,0 +1,109 @@
+import base64
+import datetime
+import json
+from urllib.parse import urlencode
+from flask import current_app, request
+from sqlalchemy import and_, or_, text
+from sqlalchemy.types import DateTime
+from NewApp import db
+
+
+class CursorError(ValueError):
+    pass
+
+
+def page_size():
+    """Page size from the 'limit' query parameter, capped by API_MAX_PAGE_SIZE."""
+    default = current_app.config['API_PAGE_SIZE']
+    maximum = current_app.config['API_MAX_PAGE_SIZE']
+    try:
+        limit = int(request.args.get('limit', default))
+    except ValueError:
+        limit = default
+    return max(1, min(limit, maximum))
+
+
+def encode_cursor(values):
+    """Opaque cursor for the keyset values of the last row of a page."""
+    values = [v.isoformat() if isinstance(v, datetime.datetime) else v for v in values]
+    return base64.urlsafe_b64encode(json.dumps(values).encode('utf-8')).decode('ascii')
+
+
+def decode_cursor(cursor, columns):
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != len(columns):
+        raise CursorError('Invalid cursor')
+    decoded = []
+    for column, value in zip(columns, values):
+        if isinstance(column.type, DateTime) and value is not None:
+            try:
+                value = datetime.datetime.fromisoformat(value)
+            except (ValueError, TypeError):
+                raise CursorError('Invalid cursor')
+        decoded.append(value)
+    return decoded
+
+
+def keyset_page(query, columns, cursor=None, limit=None, descending=False):
+    """Return (items, next_cursor) for one page of query ordered by columns.
+
+    columns must end in a unique column (normally the primary key). The page
+    starts strictly after the row the cursor was taken from, so every page
+    costs one indexed range scan no matter how deep it is.
+    """
+    limit = limit or page_size()
+    if cursor:
+        values = decode_cursor(cursor, columns)
+        query = query.filter(_after(columns, values, descending))
+    order = [c.desc() if descending else c.asc() for c in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        next_cursor = encode_cursor([getattr(last, c.key) for c in columns])
+    return rows, next_cursor
+
+
+def _after(columns, values, descending):
+    # (a, b) > (x, y)  ==  a > x OR (a = x AND b > y), spelled out so MySQL
+    # can use the composite index
+    column, value = columns[0], values[0]
+    beyond = column < value if descending else column > value
+    if len(columns) == 1:
+        return beyond
+    return or_(beyond, and_(column == value, _after(columns[1:], values[1:], descending)))
+
+
+def total_count(query, mode, table_name=None):
+    """Row count for mode 'exact' or 'estimate'; None when not requested.
+
+    'estimate' reads the table statistics on MySQL for unfiltered listings and
+    falls back to an exact count everywhere else.
+    """
+    if mode not in ('exact', 'estimate'):
+        return None
+    if mode == 'estimate' and table_name and db.engine.dialect.name == 'mysql':
+        estimate = db.session.execute(text(
+            'SELECT TABLE_ROWS FROM information_schema.TABLES '
+            'WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = :table_name'
+        ), {'table_name': table_name}).scalar()
+        if estimate is not None:
+            return int(estimate)
+    return query.order_by(None).count()
+
+
+def pagination_headers(next_cursor, total=None):
+    headers = {}
+    if next_cursor:
+        headers['X-Next-Cursor'] = next_cursor
+        args = request.args.to_dict()
+        args['cursor'] = next_cursor
+        headers['Link'] = f'<{request.base_url}?{urlencode(args)}>; rel="next"'
+    if total is not None:
+        headers['X-Total-Count'] = str(total)
+    return headers
@@ -0,0 +1,134 @@
+import concurrent.futures
+import io
+from flask import current_app
+from sqlalchemy import func
+from NewApp import db
+from NewApp.models import ProductCrawlLog, delete_orphan_payloads
+from NewApp.crawl_logs import replace_variant_prices
+from NewApp.enemy_health import is_empty
+from NewApp.log_rollup import bucket_start, has_rollups, rebuild_day
+from NewApp.snapshots import load
+from OCR.price_parser import clean_prices
+
+
+def _extract(root, image_hash, text_hash, with_text):
+    # Runs in a worker thread: files and the extraction API only, no database
+    import OCR.ExtractTxt as ExtractTxt
+    image, text = load(root, image_hash, text_hash)
+    result = ExtractTxt.Extract(io.BytesIO(image), page_text=text if with_text else None)
+    if isinstance(result, Exception):
+        raise result
+    if not isinstance(result, dict):
+        raise ValueError('Extraction returned no data')
+    return clean_prices(result)
+
+
+def reextract_logs(crawl_ids=None, since=None, until=None, limit=None, max_workers=None,
+                   with_text=False, dry_run=False, batch_size=100):
+    """Run the extraction again on the archived snapshots of crawl logs and
+    update their name, price, payload and variant prices; no page is fetched.
+
+    Logs are read in id order, filtered by product crawl ids and a
+    [since, until) timestamp range, and every distinct snapshot of a batch is
+    extracted once, up to max_workers (default REEXTRACT_MAX_WORKERS) at a
+    time. with_text sends the archived page text along with the screenshot.
+    A failed or empty extraction, or a pruned snapshot, leaves its logs
+    unchanged.
+
+    A run-length log is updated as a whole: only the page of its first
+    observation is archived, and the later ones extracted to the same data.
+    Hourly and daily rollups of the days of updated logs are recomputed.
+    Logs of the oldest raw day of a crawl are skipped once that day is rolled
+    up, as retention may already have pruned part of it. Each batch is
+    committed, unless dry_run. Returns counts.
+    """
+    config = current_app.config
+    root = config['SNAPSHOT_DIR']
+    max_workers = max(1, max_workers or config['REEXTRACT_MAX_WORKERS'])
+    stats = {'logs': 0, 'snapshots': 0, 'updated': 0, 'price_changed': 0, 'failed': 0, 'missing': 0, 'rolled_up': 0}
+
+    query = ProductCrawlLog.query.filter(ProductCrawlLog.snapshot_image_hash.isnot(None))
+    if crawl_ids:
+        query = query.filter(ProductCrawlLog.product_crawl_id.in_(crawl_ids))
+    if since is not None:
+        query = query.filter(ProductCrawlLog.timestamp >= since)
+    if until is not None:
+        query = query.filter(ProductCrawlLog.timestamp < until)
+
+    last_id = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        while limit is None or stats['logs'] < limit:
+            size = batch_size if limit is None else min(batch_size, limit - stats['logs'])
+            logs = query.filter(ProductCrawlLog.id > last_id).order_by(ProductCrawlLog.id).limit(size).all()
+            if not logs:
+                break
+            last_id = logs[-1].id
+            stats['logs'] += len(logs)
+
+            rolled = _rolled_up_days(logs)
+            oldest = dict(db.session.query(ProductCrawlLog.product_crawl_id, func.min(ProductCrawlLog.timestamp)).filter(
+                ProductCrawlLog.product_crawl_id.in_({log.product_crawl_id for log in logs})
+            ).group_by(ProductCrawlLog.product_crawl_id).all())
+            by_snapshot, updated_days = {}, set()
+            for log in logs:
+                day = bucket_start(log.timestamp, 'day')
+                if (log.product_crawl_id, day) in rolled and day == bucket_start(oldest[log.product_crawl_id], 'day'):
+                    stats['rolled_up'] += 1
+                    continue
+                by_snapshot.setdefault((log.snapshot_image_hash, log.snapshot_text_hash), []).append(log)
+            stats['snapshots'] += len(by_snapshot)
+            futures = {
+                executor.submit(_extract, root, image_hash, text_hash, with_text): (image_hash, text_hash)
+                for image_hash, text_hash in by_snapshot
+            }
+            for future in concurrent.futures.as_completed(futures):
+                key = futures[future]
+                try:
+                    result = future.result()
+                except FileNotFoundError:
+                    stats['missing'] += len(by_snapshot[key])
+                    continue
+                except Exception as e:
+                    print(f"Error extracting snapshot {key[0][:12]}: {e}")
+                    stats['failed'] += len(by_snapshot[key])
+                    continue
+                if is_empty(result):
+                    # Keep the stored data rather than replace a price with nothing
+                    stats['failed'] += len(by_snapshot[key])
+                    continue
+                for log in by_snapshot[key]:
+                    if _apply(log, result):
+                        stats['price_changed'] += 1
+                    updated_days.add((log.product_crawl_id, bucket_start(log.timestamp, 'day')))
+                    stats['updated'] += 1
+
+            db.session.flush()
+            # Rollups also carry the name, so any update rebuilds them
+            for crawl_id, day in updated_days & rolled:
+                rebuild_day(crawl_id, day)
+            if dry_run:
+                db.session.rollback()
+            else:
+                db.session.commit()
+    if stats['updated'] and not dry_run:
+        # Payloads replaced by the new extractions
+        stats['payloads_deleted'] = delete_orphan_payloads()
+        db.session.commit()
+    return stats
+
+
+def _rolled_up_days(logs):
+    """(product_crawl_id, day start) pairs of logs whose day has rollups."""
+    days = {(log.product_crawl_id, bucket_start(log.timestamp, 'day')) for log in logs}
+    return {pair for pair in days if has_rollups(*pair)}
+
+
+def _apply(log, result):
+    """Replace the extracted data of log; True if its price changed."""
+    price = result.get('current_price')
+    changed = log.price is None or float(log.price) != round(float(price), 2)
+    log.name = result.get('product_name', 'Unknown')
+    log.price = price
+    log.other_data = result
+    replace_variant_prices(log)
+    return changed
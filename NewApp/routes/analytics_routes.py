@@ -0,0 +1,70 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from NewApp.serializers import serialize_with
+from NewApp.models import Product
+from NewApp.analytics import product_analytics
+
+api = Namespace('analytics', description='Competitor price analytics')
+
+competitor_analytics_model = api.model('CompetitorAnalytics', {
+    'product_crawl_id': fields.Integer(description='ProductCrawl ID'),
+    'enemy_id': fields.Integer(description='Enemy ID'),
+    'enemy_name': fields.String(description='Enemy name'),
+    'observations': fields.Integer(description='Price points within the lookback window'),
+    'latest_price': fields.Float(description='Newest observed price'),
+    'latest_at': fields.String(description='Time of the newest observation'),
+    'volatility': fields.Float(description='Standard deviation of relative price changes'),
+    'moving_averages': fields.Raw(description='Average price per window, e.g. {"7d": 100.0, "30d": 98.5}'),
+    'undercutting': fields.Boolean(description='Newest price is below our current price'),
+    'last_undercut_at': fields.String(description='Newest observation below our current price'),
+    'hours_since_undercut': fields.Float(description='Hours since last_undercut_at'),
+})
+
+product_analytics_model = api.model('ProductAnalytics', {
+    'product_id': fields.Integer(description='Product ID'),
+    'name': fields.String(description='Product name'),
+    'cur_price': fields.Float(description='Our current price'),
+    'competitors_tracked': fields.Integer(description='Number of product crawls'),
+    'competitors_priced': fields.Integer(description='Product crawls with a price in the lookback window'),
+    'min_price': fields.Float(description='Lowest current competitor price'),
+    'median_price': fields.Float(description='Median current competitor price'),
+    'max_price': fields.Float(description='Highest current competitor price'),
+    'price_gap': fields.Float(description='cur_price minus min_price; positive when we are more expensive'),
+    'price_gap_pct': fields.Float(description='price_gap as a percentage of min_price'),
+    'cheapest_product_crawl_id': fields.Integer(description='ProductCrawl with the lowest current price'),
+    'volatility': fields.Float(description='Median competitor volatility'),
+    'moving_averages': fields.Raw(description='Average competitor price per window'),
+    'undercut_by': fields.Integer(description='Competitors currently below our price'),
+    'last_undercut_at': fields.String(description='Newest competitor observation below our price'),
+    'hours_since_undercut': fields.Float(description='Hours since last_undercut_at'),
+    'lookback_start': fields.String(description='Start of the analysed window'),
+    'computed_at': fields.String(description='Time the analytics were computed'),
+    'competitors': fields.List(fields.Nested(competitor_analytics_model)),
+})
+
+
+# Not cached: hours_since_undercut, computed_at and the lookback and moving
+# average windows are relative to the time of the request
+
+@api.route('/products')
+class ProductAnalyticsList(Resource):
+    @api.doc('list_product_analytics', description='Competitor price analytics for the whole catalog, '
+             'computed in one batch')
+    @api.param('undercut', 'true to only return products a competitor currently undercuts', _in='query')
+    @serialize_with(api, product_analytics_model, as_list=True)
+    def get(self):
+        results = list(product_analytics().values())
+        if request.args.get('undercut', '').lower() == 'true':
+            results = [result for result in results if result['undercut_by']]
+        return results, 200
+
+
+@api.route('/products/<int:product_id>')
+@api.param('product_id', 'Product unique identifier')
+@api.response(404, 'Product not found')
+class ProductAnalytics(Resource):
+    @api.doc('get_product_analytics', description='Competitor price analytics for one product')
+    @serialize_with(api, product_analytics_model)
+    def get(self, product_id):
+        Product.query.get_or_404(product_id)
+        return product_analytics([product_id])[product_id], 200
@@ -1,7 +1,10 @@
 from flask import request, jsonify
 from flask_restx import Namespace,Resource,fields
 from NewApp import db
+from NewApp.http_cache import cached
+from NewApp.serializers import serialize_with
 from NewApp.models import Enemy
+from NewApp.enemy_health import health_report, reset
 
 api = Namespace('enemy',description='Enemy related operations')
 
@@ -16,10 +19,25 @@ enemy_output_model = api.model('EnemyOutput', {
     'domain': fields.String(required=True, description='Enemy domain'),
 })
 
+enemy_health_model = api.model('EnemyHealth', {
+    'enemy_id': fields.Integer(description='Enemy unique identifier'),
+    'name': fields.String(description='Enemy name'),
+    'domain': fields.String(description='Enemy domain'),
+    'state': fields.String(description='Circuit breaker state: closed, open or half_open (a probe is running)'),
+    'crawlable': fields.Boolean(description='Crawls run now (closed), or the next one probes the site'),
+    'consecutive_failures': fields.Integer(description='Failed or empty fetches in a row'),
+    'trips': fields.Integer(description='Times opened in a row; each doubles the cool-down'),
+    'open_until': fields.String(description='Crawls are skipped until then (UTC)'),
+    'last_error': fields.String(description='Error of the last failed fetch'),
+    'last_failure_at': fields.String(description='Time of the last failed fetch (UTC)'),
+    'last_success_at': fields.String(description='Time of the last successful fetch (UTC)'),
+})
+
 @api.route('/')
 class EnemyList(Resource):
     @api.doc('list_enemies', description='Get a list of all enemies')
-    @api.marshal_list_with(enemy_output_model)
+    @cached('enemy')
+    @serialize_with(api, enemy_output_model, as_list=True)
     def get(self):
         return Enemy.query.all(), 200
     
@@ -41,7 +59,8 @@ class EnemyList(Resource):
 @api.response(404, 'Enemy not found')
 class EnemyResource(Resource):
     @api.doc('get_enemy', description='Get an enemy by its ID')
-    @api.marshal_with(enemy_output_model)
+    @cached('enemy')
+    @serialize_with(api, enemy_output_model)
     def get(self, enemy_id):
         enemy = Enemy.query.get_or_404(enemy_id)
         return enemy, 200
@@ -64,12 +83,41 @@ class EnemyResource(Resource):
         db.session.commit()
         return '', 204
 
+@api.route('/health')
+class EnemyHealthList(Resource):
+    @api.doc('list_enemy_health', description='Crawl circuit breaker state of every enemy')
+    @api.param('state', 'Only enemies in this state: closed, open or half_open', _in='query')
+    @serialize_with(api, enemy_health_model, as_list=True)
+    def get(self):
+        report = health_report(Enemy.query.order_by(Enemy.id).all())
+        state = request.args.get('state')
+        if state:
+            report = [item for item in report if item['state'] == state]
+        return report, 200
+
+@api.route('/<int:enemy_id>/health')
+@api.param('enemy_id', 'Enemy unique identifier')
+@api.response(404, 'Enemy not found')
+class EnemyHealthResource(Resource):
+    @api.doc('get_enemy_health', description='Crawl circuit breaker state of an enemy')
+    @serialize_with(api, enemy_health_model)
+    def get(self, enemy_id):
+        return health_report([Enemy.query.get_or_404(enemy_id)])[0], 200
+
+    @api.doc('reset_enemy_health', description='Close the circuit breaker of an enemy so its crawls run again')
+    @serialize_with(api, enemy_health_model)
+    def delete(self, enemy_id):
+        enemy = Enemy.query.get_or_404(enemy_id)
+        reset(enemy_id)
+        return health_report([enemy])[0], 200
+
 @api.route('/by-domain')
 class EnemyByDomainResource(Resource):
     @api.doc('find_enemy_by_domain', description='Find enemy by domain')
     @api.param('domain', 'Domain to search for')
     @api.param('auto_create', 'Automatically create a new enemy if not found', _in='query', type='boolean')
-    @api.marshal_with(enemy_output_model)
+    @cached('enemy')
+    @serialize_with(api, enemy_output_model)
     def get(self):
         try:
             domain = request.args.get('domain')
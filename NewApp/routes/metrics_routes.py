@@ -0,0 +1,27 @@
+from flask_restx import Namespace, Resource, fields
+from NewApp import db
+from NewApp.db_pool import pool_metrics
+
+api = Namespace('metrics', description='Process metrics')
+
+db_pool_output_model = api.model('DbPoolOutput', {
+    'pool': fields.String(description='Pool class of the engine'),
+    'size': fields.Integer(description='Connections kept open (pool_size)'),
+    'checked_in': fields.Integer(description='Idle connections in the pool'),
+    'checked_out': fields.Integer(description='Connections in use'),
+    'overflow': fields.Integer(description='Connections open beyond pool_size (negative while the pool is not full)'),
+    'max_checked_out': fields.Integer(description='Most connections in use at once since startup'),
+    'connects': fields.Integer(description='Connections opened since startup'),
+    'checkouts': fields.Integer(description='Connection checkouts since startup'),
+    'invalidations': fields.Integer(description='Connections discarded as dead or broken since startup'),
+    'mean_hold_ms': fields.Float(description='Mean time a connection was held per checkout'),
+    'max_hold_ms': fields.Float(description='Longest time a connection was held'),
+})
+
+
+@api.route('/db-pool')
+class DbPool(Resource):
+    @api.doc('db_pool_metrics', description='Database connection pool usage of this worker process')
+    @api.marshal_with(db_pool_output_model)
+    def get(self):
+        return pool_metrics(db.engine), 200
@@ -1,7 +1,17 @@
-from flask import request
+import csv
+import datetime
+import io
+import json
+from flask import Response, current_app, request, stream_with_context
 from flask_restx import Namespace, Resource, fields
 from NewApp import db
-from NewApp.models import ProductCrawlLog
+from NewApp.http_cache import cached
+from NewApp.serializers import serialize_with
+from NewApp.models import CrawlPayload, ProductCrawl, ProductCrawlLog
+from NewApp.crawl_logs import replace_variant_prices, variant_prices_for
+from NewApp.log_rollup import load_price_series
+from NewApp.timeseries import DOWNSAMPLING_METHODS, downsample
+from NewApp.pagination import CursorError, keyset_page, pagination_headers, total_count
 
 api = Namespace('product_crawl_log', description='ProductCrawlLog related operations')
 
@@ -19,30 +29,50 @@ product_crawl_log_output_model = api.model('ProductCrawlLogOutput', {
     'price': fields.Float(description='Price'),
     'timestamp': fields.String(description='Timestamp'),
     'other_data': fields.Raw(description='Other data'),
+    'last_seen_at': fields.String(description='Last time this observation was seen'),
+    'observation_count': fields.Integer(description='Number of identical observations in this run'),
+    'snapshot_image_hash': fields.String(description='Hash of the archived screenshot, if the page was archived'),
 })
 
 @api.route('/')
 class ProductCrawlLogList(Resource):
-    @api.doc('list_product_crawl_logs', description='Get a list of all product crawl logs')
+    @api.doc('list_product_crawl_logs', description='Get a page of product crawl logs, newest first. '
+             'The next page cursor is returned in the X-Next-Cursor and Link headers.')
     @api.param('product_crawl_id', 'Filter logs by product crawl ID', _in='query')
-    @api.marshal_list_with(product_crawl_log_output_model)
+    @api.param('limit', 'Page size (capped by the server)', _in='query')
+    @api.param('cursor', 'Cursor from the previous page', _in='query')
+    @api.param('count', 'Add X-Total-Count: exact or estimate', _in='query')
+    @cached('product_crawl_log')
+    @serialize_with(api, product_crawl_log_output_model, as_list=True)
     def get(self):
+        query = ProductCrawlLog.query
         product_crawl_id = request.args.get('product_crawl_id')
         if product_crawl_id:
-            return ProductCrawlLog.query.filter_by(product_crawl_id=product_crawl_id).all(), 200
-        return ProductCrawlLog.query.all(), 200
+            query = query.filter_by(product_crawl_id=product_crawl_id)
+        try:
+            logs, next_cursor = keyset_page(
+                query, [ProductCrawlLog.timestamp, ProductCrawlLog.id], request.args.get('cursor'), descending=True
+            )
+        except CursorError as e:
+            api.abort(400, str(e))
+        total = total_count(query, request.args.get('count'), None if product_crawl_id else ProductCrawlLog.__tablename__)
+        return logs, 200, pagination_headers(next_cursor, total)
 
     @api.expect(product_crawl_log_input_model)
     @api.marshal_with(product_crawl_log_output_model, code=201)
     @api.doc('create_product_crawl_log', description='Create a new product crawl log')
     def post(self):
         data = request.json
+        other_data = data.get('other_data')
         new_log = ProductCrawlLog(
             product_crawl_id=data['product_crawl_id'],
             name=data['name'],
             price=data.get('price'),
-            other_data=data.get('other_data')
+            other_data=other_data,
+            timestamp=datetime.datetime.utcnow()
         )
+        if isinstance(other_data, dict):
+            new_log.variant_prices = variant_prices_for(new_log.product_crawl_id, other_data, new_log.timestamp)
         db.session.add(new_log)
         db.session.commit()
         return new_log, 201
@@ -52,7 +82,8 @@ class ProductCrawlLogList(Resource):
 @api.response(404, 'Log not found')
 class ProductCrawlLogResource(Resource):
     @api.doc('get_product_crawl_log', description='Get a product crawl log by its ID')
-    @api.marshal_with(product_crawl_log_output_model)
+    @cached('product_crawl_log')
+    @serialize_with(api, product_crawl_log_output_model)
     def get(self, log_id):
         log = ProductCrawlLog.query.get_or_404(log_id)
         return log, 200
@@ -67,6 +98,8 @@ class ProductCrawlLogResource(Resource):
         log.name = data['name']
         log.price = data.get('price')
         log.other_data = data.get('other_data')
+        db.session.flush()
+        replace_variant_prices(log)
         db.session.commit()
         return log, 200
 
@@ -81,16 +114,28 @@ class ProductCrawlLogResource(Resource):
 @api.param('product_crawl_id', 'Product crawl unique identifier')
 @api.response(404, 'Product crawl not found')
 class ProductCrawlPriceHistory(Resource):
-    @api.doc('get_price_history', description='Get price history for a product crawl with chart data')
+    @api.doc('get_price_history', description='Get price history for a product crawl with chart data. '
+             'Both price_history and chart_data are downsampled to at most max_points points.')
+    @api.param('from', 'Only prices at or after this ISO 8601 time', _in='query')
+    @api.param('to', 'Only prices before this ISO 8601 time', _in='query')
+    @api.param('max_points', 'Maximum points returned (default: PRICE_HISTORY_MAX_POINTS)', _in='query')
+    @api.param('method', 'Downsampling method: lttb (default) or minmax', _in='query')
+    @cached('product', 'product_crawl', 'product_crawl_log', 'enemy')
     def get(self, product_crawl_id):
         # First verify the product crawl exists
-        from NewApp.models import ProductCrawl
         product_crawl = ProductCrawl.query.get_or_404(product_crawl_id)
+        start = _parse_time_arg('from')
+        end = _parse_time_arg('to')
+        max_points = request.args.get('max_points', current_app.config['PRICE_HISTORY_MAX_POINTS'], type=int)
+        max_points = max(3, min(max_points, current_app.config['PRICE_HISTORY_MAX_POINTS_LIMIT']))
+        method = request.args.get('method', 'lttb')
+        if method not in DOWNSAMPLING_METHODS:
+            api.abort(400, f"method must be one of: {', '.join(DOWNSAMPLING_METHODS)}")
         
-        # Get all logs for this product crawl, ordered by timestamp
-        logs = ProductCrawlLog.query.filter_by(product_crawl_id=product_crawl_id).order_by(ProductCrawlLog.timestamp.asc()).all()
+        # Raw logs merged with hourly/daily rollups for older periods
+        points = load_price_series([product_crawl_id], start, end)[product_crawl_id]
         
-        if not logs:
+        if not points:
             return {
                 'product_crawl': {
                     'id': product_crawl.id,
@@ -108,30 +153,25 @@ class ProductCrawlPriceHistory(Resource):
                 }
             }, 200
         
-        # Prepare chart data
+        # Prepare chart data; only the sampled points are formatted
+        sampled = downsample(points, max_points, method)
         labels = []
         prices = []
         valid_logs = []
         
-        for log in logs:
-            if log.price is not None:
-                labels.append(log.timestamp.strftime('%Y-%m-%d %H:%M'))
-                prices.append(float(log.price))
-                valid_logs.append({
-                    'id': log.id,
-                    'timestamp': log.timestamp.isoformat(),
-                    'price': float(log.price),
-                    'name': log.name
-                })
+        for point in sampled:
+            labels.append(point['timestamp'].strftime('%Y-%m-%d %H:%M'))
+            prices.append(point['price'])
+            valid_logs.append(dict(point, timestamp=point['timestamp'].isoformat()))
         
-        # Calculate price trend and change
-        latest_price = prices[-1] if prices else None
+        # Calculate price trend and change over the whole range
+        latest_price = points[-1]['price']
         price_trend = 'stable'
         price_change = 0
         
-        if len(prices) >= 2:
-            first_price = prices[0]
-            last_price = prices[-1]
+        if len(points) >= 2:
+            first_price = points[0]['price']
+            last_price = points[-1]['price']
             price_change = last_price - first_price
             
             if price_change > 0:
@@ -153,6 +193,125 @@ class ProductCrawlPriceHistory(Resource):
                 'latest_price': float(latest_price) if latest_price is not None else None,
                 'price_trend': price_trend,
                 'price_change': float(price_change) if price_change != 0 else 0,
-                'total_records': len(valid_logs)
+                'total_records': len(points),
+                'returned_points': len(sampled)
             }
         }, 200
+
+
+EXPORT_COLUMNS = (
+    'id', 'product_crawl_id', 'prod_id', 'enemy_id', 'name', 'price',
+    'timestamp', 'last_seen_at', 'observation_count',
+)
+
+
+def _parse_time_arg(name):
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return datetime.datetime.fromisoformat(value)
+    except ValueError:
+        api.abort(400, f'Invalid {name}: expected an ISO 8601 date or datetime')
+
+
+def _export_value(value):
+    if isinstance(value, datetime.datetime):
+        return value.isoformat()
+    if value is not None and not isinstance(value, (int, str)):
+        return float(value)
+    return value
+
+
+@api.route('/export')
+class ProductCrawlLogExport(Resource):
+    @api.doc('export_product_crawl_logs', description='Stream crawl logs as NDJSON or CSV. '
+             'Rows are read with a server-side cursor, so memory stays flat for any result size.')
+    @api.param('format', 'ndjson (default) or csv', _in='query')
+    @api.param('product_crawl_id', 'Only logs of this product crawl', _in='query')
+    @api.param('enemy_id', 'Only logs of this competitor', _in='query')
+    @api.param('prod_id', 'Only logs of this product', _in='query')
+    @api.param('from', 'Only logs at or after this ISO 8601 time', _in='query')
+    @api.param('to', 'Only logs before this ISO 8601 time', _in='query')
+    @api.param('include_other_data', 'Include the extraction payload (default: false)', _in='query', type='boolean')
+    def get(self):
+        export_format = request.args.get('format', 'ndjson')
+        if export_format not in ('ndjson', 'csv'):
+            api.abort(400, 'format must be ndjson or csv')
+        include_other_data = request.args.get('include_other_data', 'false').lower() == 'true'
+        start = _parse_time_arg('from')
+        end = _parse_time_arg('to')
+
+        query = db.session.query(
+            ProductCrawlLog.id,
+            ProductCrawlLog.product_crawl_id,
+            ProductCrawl.prod_id,
+            ProductCrawl.enemy_id,
+            ProductCrawlLog.name,
+            ProductCrawlLog.price,
+            ProductCrawlLog.timestamp,
+            ProductCrawlLog.last_seen_at,
+            ProductCrawlLog.observation_count,
+        ).join(ProductCrawl, ProductCrawl.id == ProductCrawlLog.product_crawl_id)
+        if include_other_data:
+            query = query.add_columns(CrawlPayload.data_compressed).outerjoin(
+                CrawlPayload, CrawlPayload.id == ProductCrawlLog.payload_id
+            )
+        for arg, column in (
+            ('product_crawl_id', ProductCrawlLog.product_crawl_id),
+            ('enemy_id', ProductCrawl.enemy_id),
+            ('prod_id', ProductCrawl.prod_id),
+        ):
+            value = request.args.get(arg, type=int)
+            if value is not None:
+                query = query.filter(column == value)
+        if start:
+            query = query.filter(ProductCrawlLog.timestamp >= start)
+        if end:
+            query = query.filter(ProductCrawlLog.timestamp < end)
+        batch_size = current_app.config['EXPORT_BATCH_SIZE']
+        query = query.order_by(ProductCrawlLog.id).yield_per(batch_size)
+
+        columns = EXPORT_COLUMNS + (('other_data',) if include_other_data else ())
+
+        def records():
+            for row in query:
+                record = [_export_value(value) for value in row[:len(EXPORT_COLUMNS)]]
+                if include_other_data:
+                    compressed = row[len(EXPORT_COLUMNS)]
+                    record.append(CrawlPayload.decode(compressed) if compressed is not None else None)
+                yield record
+
+        def generate_ndjson():
+            chunk = []
+            for record in records():
+                chunk.append(json.dumps(dict(zip(columns, record)), ensure_ascii=False))
+                if len(chunk) >= batch_size:
+                    yield '\n'.join(chunk) + '\n'
+                    chunk = []
+            if chunk:
+                yield '\n'.join(chunk) + '\n'
+
+        def generate_csv():
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerow(columns)
+            for count, record in enumerate(records(), 1):
+                if include_other_data:
+                    record[-1] = json.dumps(record[-1], ensure_ascii=False) if record[-1] is not None else ''
+                writer.writerow(record)
+                if count % batch_size == 0:
+                    yield buffer.getvalue()
+                    buffer.seek(0)
+                    buffer.truncate()
+            yield buffer.getvalue()
+
+        if export_format == 'csv':
+            body, mimetype = generate_csv(), 'text/csv'
+        else:
+            body, mimetype = generate_ndjson(), 'application/x-ndjson'
+        return Response(
+            stream_with_context(body),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename=product_crawl_logs.{export_format}'},
+        )
@@ -1,9 +1,17 @@
-from flask import request
+import json
+from flask import Response, current_app, request, stream_with_context
 from flask_restx import Namespace, Resource, fields
+from sqlalchemy.orm import selectinload
 from NewApp import db
+from NewApp.http_cache import cached
+from NewApp.serializers import serialize_with
 from NewApp.models import ProductCrawl
 from OCR.screenshot import scrape
-from NewApp.models import ProductCrawlLog
+from NewApp.crawl_logs import latest_logs, record_crawl_result
+from NewApp.crawler import crawl_batch, select_crawls
+from NewApp.crawl_schedule import schedule_next
+from NewApp.snapshots import archive_dir, store
+from NewApp.pagination import CursorError, keyset_page, pagination_headers, total_count
 
 api = Namespace('product_crawl', description='ProductCrawl related operations')
 
@@ -23,6 +31,8 @@ product_crawl_output_model = api.model('ProductCrawlOutput', {
     'link': fields.String(description='Crawl link'),
     'created_at': fields.String(description='Created at'),
     'updated_at': fields.String(description='Updated at'),
+    'crawl_interval_minutes': fields.Integer(description='Adaptive crawl interval'),
+    'next_crawl_at': fields.String(description='Next scheduled crawl'),
     'logs': fields.List(fields.Nested(api.model('ProductCrawlLog', {
         'id': fields.Integer(readonly=True, description='Log unique identifier'),
         'product_crawl_id': fields.Integer(description='ProductCrawl ID'),
@@ -30,22 +40,79 @@ product_crawl_output_model = api.model('ProductCrawlOutput', {
         'price': fields.Float(description='Price'),
         'timestamp': fields.String(description='Timestamp'),
         'other_data': fields.Raw(description='Other data'),
+        'last_seen_at': fields.String(description='Last time this observation was seen'),
+        'observation_count': fields.Integer(description='Number of identical observations in this run'),
     })))
 })
 
+CRAWL_COLUMNS = ('id', 'prod_id', 'enemy_id', 'link', 'created_at', 'updated_at', 'crawl_interval_minutes', 'next_crawl_at')
+
+
+def _logs_options():
+    """Parse the logs=all|latest|none and logs_limit=N query parameters.
+
+    Returns (mode, limit) where limit is None for the full history.
+    """
+    mode = request.args.get('logs', 'all')
+    if mode not in ('all', 'latest', 'none'):
+        api.abort(400, 'logs must be one of: all, latest, none')
+    limit = request.args.get('logs_limit', type=int)
+    if limit is not None and limit < 1:
+        api.abort(400, 'logs_limit must be a positive integer')
+    if mode == 'latest':
+        limit = 1
+    return mode, limit
+
+
+def _with_logs(query, mode, limit):
+    # The full history is loaded for all crawls of the page in one extra query
+    if mode == 'all' and limit is None:
+        return query.options(selectinload(ProductCrawl.logs))
+    return query
+
+
+def _crawl_outputs(crawls, mode, limit):
+    """Crawl dicts for marshalling, with their logs selected by mode/limit."""
+    if mode == 'none':
+        logs = {crawl.id: [] for crawl in crawls}
+    elif limit is not None:
+        logs = latest_logs([crawl.id for crawl in crawls], limit)
+    else:
+        logs = {crawl.id: crawl.logs for crawl in crawls}
+    return [
+        dict({column: getattr(crawl, column) for column in CRAWL_COLUMNS}, logs=logs[crawl.id])
+        for crawl in crawls
+    ]
+
+
 @api.route('/')
 class ProductCrawlList(Resource):
-    @api.doc('list_product_crawls', description='Get a list of all product crawls')
+    @api.doc('list_product_crawls', description='Get a page of product crawls. '
+             'The next page cursor is returned in the X-Next-Cursor and Link headers.')
     @api.param('prod_id', 'Filter by product ID')
-    @api.marshal_list_with(product_crawl_output_model)
+    @api.param('limit', 'Page size (capped by the server)', _in='query')
+    @api.param('cursor', 'Cursor from the previous page', _in='query')
+    @api.param('count', 'Add X-Total-Count: exact or estimate', _in='query')
+    @api.param('logs', 'Nested logs: all (default), latest or none', _in='query')
+    @api.param('logs_limit', 'Only the newest N logs of each crawl', _in='query')
+    @cached('product_crawl', 'product_crawl_log')
+    @serialize_with(api, product_crawl_output_model, as_list=True)
     def get(self):
+        logs_mode, logs_limit = _logs_options()
+        query = ProductCrawl.query
         prod_id = request.args.get('prod_id')
         if prod_id:
-            crawls = ProductCrawl.query.filter_by(prod_id=prod_id).all()
-            if not crawls and prod_id:
-                api.abort(404, f"No enemy products found for product ID: {prod_id}")
-            return crawls, 200
-        return ProductCrawl.query.all(), 200
+            query = query.filter_by(prod_id=prod_id)
+        try:
+            crawls, next_cursor = keyset_page(
+                _with_logs(query, logs_mode, logs_limit), [ProductCrawl.id], request.args.get('cursor')
+            )
+        except CursorError as e:
+            api.abort(400, str(e))
+        if not crawls and prod_id and not request.args.get('cursor'):
+            api.abort(404, f"No enemy products found for product ID: {prod_id}")
+        total = total_count(query, request.args.get('count'), None if prod_id else ProductCrawl.__tablename__)
+        return _crawl_outputs(crawls, logs_mode, logs_limit), 200, pagination_headers(next_cursor, total)
 
     @api.expect(product_crawl_input_model)
     @api.marshal_with(product_crawl_output_model, code=201)
@@ -66,10 +133,14 @@ class ProductCrawlList(Resource):
 @api.response(404, 'ProductCrawl not found')
 class ProductCrawlResource(Resource):
     @api.doc('get_product_crawl', description='Get a product crawl by its ID')
-    @api.marshal_with(product_crawl_output_model)
+    @api.param('logs', 'Nested logs: all (default), latest or none', _in='query')
+    @api.param('logs_limit', 'Only the newest N logs', _in='query')
+    @cached('product_crawl', 'product_crawl_log')
+    @serialize_with(api, product_crawl_output_model)
     def get(self, crawl_id):
+        logs_mode, logs_limit = _logs_options()
         crawl = ProductCrawl.query.get_or_404(crawl_id)
-        return crawl, 200
+        return _crawl_outputs([crawl], logs_mode, logs_limit)[0], 200
 
     @api.expect(product_crawl_input_model)
     @api.marshal_with(product_crawl_output_model)
@@ -96,13 +167,14 @@ class ProductCrawlByLink(Resource):
 
     @api.doc('get_product_crawl_by_link', description='Get enemy product crawl info by link')
     @api.param('link', 'Crawl link', required=True)
-    @api.marshal_with(product_crawl_output_model)
+    @cached('product_crawl', 'product_crawl_log')
+    @serialize_with(api, product_crawl_output_model)
     def get(self):
         # Get link from query string, not request.json
         link = request.args.get('link')
         if not link:
             api.abort(400, 'Missing required parameter: link')
-        crawl = ProductCrawl.query.filter_by(link=link).first()
+        crawl = ProductCrawl.find_by_link(link)
         if not crawl:
             api.abort(404, 'ProductCrawl (enemy product) not found')
         return crawl, 200
@@ -131,26 +203,115 @@ class CrawlByLink(Resource):
             crawl = ProductCrawl.query.get_or_404(crawl_id)
             link = crawl.link
         elif link:
-            crawl = ProductCrawl.query.filter_by(link=link).first()
+            crawl = ProductCrawl.find_by_link(link)
             if not crawl:
                 api.abort(404, 'ProductCrawl (enemy product) not found for this link')
                 
         # Call the scrape function
         try:
-            crawl_result = scrape(link)
+            snapshot_dir = archive_dir()
+            snapshot = {} if snapshot_dir else None
+            crawl_result = scrape(link, snapshot=snapshot)
             
             # Save log
-            log = ProductCrawlLog(
-                product_crawl_id=crawl.id,
-                name=crawl_result.get('product_name', 'Unknown'),
-                price=crawl_result.get('current_price'),
-                other_data=crawl_result,
-            )
-            db.session.add(log)
+            record_crawl_result(crawl, crawl_result, snapshot=store(snapshot_dir, snapshot))
+            db.session.flush()
+            schedule_next([crawl])
             db.session.commit()
             return crawl, 200
         except Exception as e:
+            # Leave no failed transaction behind for the next request of this thread
+            db.session.rollback()
             api.abort(500, f'Error crawling the product: {str(e)}')
             
         return crawl, 200
 
+
+crawl_batch_result_model = api.model('CrawlBatchResult', {
+    'crawl_id': fields.Integer(description='ProductCrawl ID'),
+    'prod_id': fields.Integer(description='Product ID'),
+    'enemy_id': fields.Integer(description='Enemy ID'),
+    'link': fields.String(description='Crawl link'),
+    'status': fields.String(description='ok, error, skipped (circuit breaker open) or not_found'),
+    'name': fields.String(description='Scraped product name'),
+    'price': fields.Float(description='Scraped current price'),
+    'seconds': fields.Float(description='Scrape duration'),
+    'error': fields.String(description='Error message when status is not ok'),
+})
+
+crawl_batch_output_model = api.model('CrawlBatchOutput', {
+    'requested': fields.Integer(description='Number of crawls selected'),
+    'fetched': fields.Integer(description='Distinct canonical links scraped'),
+    'succeeded': fields.Integer(description='Scrapes that returned data'),
+    'failed': fields.Integer(description='Scrapes that raised an error'),
+    'skipped': fields.Integer(description='Crawls skipped because the circuit breaker of their enemy is open'),
+    'saved': fields.Boolean(description='Logs of the successful scrapes were committed'),
+    'error': fields.String(description='Error while saving the logs'),
+    'results': fields.List(fields.Nested(crawl_batch_result_model)),
+})
+
+
+def _int_list(value, name):
+    if value is None:
+        return None
+    if not isinstance(value, list):
+        api.abort(400, f'{name} must be a list of integers')
+    try:
+        return [int(item) for item in value]
+    except (TypeError, ValueError):
+        api.abort(400, f'{name} must be a list of integers')
+
+
+@api.route('/crawl-batch')
+class CrawlBatch(Resource):
+
+    @api.doc('crawl_batch', description='Crawl every product crawl of a product, an enemy and/or a list of '
+             'crawl ids concurrently and save all logs in one transaction. With stream=true the per-crawl '
+             'results are streamed as NDJSON as soon as each scrape finishes, followed by a summary line.')
+    @api.expect(api.model('CrawlBatchRequest', {
+        'prod_id': fields.Integer(required=False, description='Crawl all competitors of this product'),
+        'enemy_id': fields.Integer(required=False, description='Crawl all products of this enemy'),
+        'crawl_ids': fields.List(fields.Integer, required=False, description='Product Crawl IDs'),
+        'max_workers': fields.Integer(required=False, description='Concurrent scrapes (capped at CRAWL_MAX_WORKERS)'),
+        'stream': fields.Boolean(required=False, description='Stream NDJSON results'),
+        'force': fields.Boolean(required=False, description='Also crawl enemies whose circuit breaker is open'),
+    }))
+    @api.response(400, 'No crawl selector given')
+    @api.response(404, 'No product crawl matched')
+    @serialize_with(api, crawl_batch_output_model)
+    def post(self):
+        data = request.get_json(silent=True) or {}
+        try:
+            prod_id = int(data['prod_id']) if data.get('prod_id') is not None else None
+            enemy_id = int(data['enemy_id']) if data.get('enemy_id') is not None else None
+            max_workers = int(data['max_workers']) if data.get('max_workers') is not None else None
+        except (TypeError, ValueError):
+            api.abort(400, 'prod_id, enemy_id and max_workers must be integers')
+        crawl_ids = _int_list(data.get('crawl_ids'), 'crawl_ids')
+        if prod_id is None and enemy_id is None and not crawl_ids:
+            api.abort(400, 'Missing required parameter: prod_id, enemy_id or crawl_ids must be provided')
+        if max_workers is not None and max_workers < 1:
+            api.abort(400, 'max_workers must be a positive integer')
+
+        crawls, missing = select_crawls(prod_id, enemy_id, crawl_ids)
+        if not crawls:
+            api.abort(404, 'No ProductCrawl (enemy product) found for this selection')
+        if max_workers is not None:
+            max_workers = min(max_workers, current_app.config['CRAWL_MAX_WORKERS'])
+        not_found = [{'crawl_id': crawl_id, 'status': 'not_found', 'error': 'ProductCrawl not found'}
+                     for crawl_id in missing]
+
+        stream = data.get('stream') is True or request.args.get('stream', '').lower() == 'true'
+        force = data.get('force') is True
+        if stream:
+            def generate():
+                for result in not_found:
+                    yield json.dumps(result, ensure_ascii=False) + '\n'
+                for result in crawl_batch(crawls, max_workers, force):
+                    yield json.dumps(result, ensure_ascii=False) + '\n'
+            return Response(stream_with_context(generate()), mimetype='application/x-ndjson')
+
+        results = list(crawl_batch(crawls, max_workers, force))
+        summary = results.pop()
+        summary['results'] = not_found + results
+        return summary, 200
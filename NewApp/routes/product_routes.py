@@ -1,7 +1,15 @@
-from flask import request
+from flask import current_app, request
 from flask_restx import Namespace, Resource, fields
+from sqlalchemy.exc import SQLAlchemyError
 from NewApp import db
-from NewApp.models import Product
+from NewApp.bulk_import import ImportFormatError, import_products, parse_rows
+from NewApp.http_cache import cached
+from NewApp.serializers import serialize_with
+from NewApp.models import Enemy, Product, ProductCrawl as ProductCrawlModel
+from NewApp.pagination import CursorError, keyset_page, total_count
+from NewApp.log_rollup import load_price_series
+from NewApp.search import search_filter, search_products
+from NewApp.timeseries import downsample
 import sys
 import os
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../OCR')))
@@ -28,6 +36,37 @@ product_output_model = api.model('ProductOutput', {
     'updated_at': fields.String(description='Updated at'),
 })
 
+overview_enemy_model = api.model('OverviewEnemy', {
+    'id': fields.Integer(description='Enemy ID'),
+    'name': fields.String(description='Enemy name'),
+    'domain': fields.String(description='Enemy domain'),
+})
+
+overview_history_model = api.model('OverviewHistory', {
+    'timestamps': fields.List(fields.String, description='ISO timestamps'),
+    'prices': fields.List(fields.Float, description='Prices'),
+})
+
+overview_competitor_model = api.model('OverviewCompetitor', {
+    'id': fields.Integer(description='ProductCrawl ID'),
+    'link': fields.String(description='Crawl link'),
+    'enemy': fields.Nested(overview_enemy_model, allow_null=True),
+    'latest_price': fields.Float(description='Newest observed price'),
+    'latest_name': fields.String(description='Newest observed product name'),
+    'latest_at': fields.String(description='Time of the newest observation'),
+    'min_price': fields.Float(description='Lowest observed price'),
+    'max_price': fields.Float(description='Highest observed price'),
+    'price_trend': fields.String(description='increasing, decreasing or stable'),
+    'price_change': fields.Float(description='Last price minus first price'),
+    'observations': fields.Integer(description='Number of points in the full series'),
+    'history': fields.Nested(overview_history_model, description='Downsampled price history'),
+})
+
+product_overview_model = api.model('ProductOverview', {
+    'product': fields.Nested(product_output_model),
+    'competitors': fields.List(fields.Nested(overview_competitor_model)),
+})
+
 product_info_input_model = api.model('ProductInfoInput', {
     'link': fields.String(required=True, description='Product link'),
 })
@@ -45,6 +84,7 @@ pagination_model = api.model('Pagination', {
     'pages': fields.Integer(description='Total number of pages'),
     'has_prev': fields.Boolean(description='Has previous page'),
     'has_next': fields.Boolean(description='Has next page'),
+    'next_cursor': fields.String(description='Cursor for the next page (cursor mode)'),
 })
 
 product_list_output_model = api.model('ProductListOutput', {
@@ -52,29 +92,74 @@ product_list_output_model = api.model('ProductListOutput', {
     'pagination': fields.Nested(pagination_model, description='Pagination information'),
 })
 
+product_search_result_model = api.model('ProductSearchResult', {
+    'score': fields.Integer(description='Relevance: summed weights of the matched words and prefixes'),
+    'product': fields.Nested(product_output_model),
+})
+
+product_suggestion_model = api.model('ProductSuggestion', {
+    'id': fields.Integer(description='Product unique identifier'),
+    'name': fields.String(description='Product name'),
+    'sku': fields.String(description='SKU'),
+})
+
+import_result_model = api.model('ProductImportResult', {
+    'created_products': fields.Integer(description='Products created'),
+    'created_crawls': fields.Integer(description='Product crawls (competitor links) created'),
+    'created_enemies': fields.Integer(description='Enemies created for new domains'),
+    'products': fields.List(fields.Nested(api.model('ProductImportRow', {
+        'row': fields.Integer(description='Index of the input row'),
+        'id': fields.Integer(description='ID of the created product'),
+    }))),
+    'errors': fields.List(fields.Nested(api.model('ProductImportError', {
+        'row': fields.Integer(description='Index of the input row'),
+        'error': fields.String(description='Why the row was skipped'),
+    }))),
+})
+
 @api.route('/')
 class ProductList(Resource):
     @api.doc('list_products', description='Get a list of all products with search and pagination')
     @api.param('search', 'Search products by name or SKU', _in='query')
-    @api.param('page', 'Page number (default: 1)', _in='query')
+    @api.param('page', 'Page number; switches to offset pagination with a total count', _in='query')
     @api.param('per_page', 'Items per page (default: 10, max: 100)', _in='query')
-    @api.marshal_with(product_list_output_model)
+    @api.param('limit', 'Page size in cursor mode (default: per_page, max: 100)', _in='query')
+    @api.param('cursor', 'Cursor from the previous page (pagination.next_cursor)', _in='query')
+    @api.param('count', 'Total count in cursor mode: exact or estimate (default: none)', _in='query')
+    @cached('product')
+    @serialize_with(api, product_list_output_model)
     def get(self):
         search = request.args.get('search', '').strip()
-        page = int(request.args.get('page', 1))
         per_page = min(int(request.args.get('per_page', 10)), 100)  # Max 100 items per page
         
-        # Build query with search filter
+        # Build query with search filter; products having every word of the
+        # search (or a word starting with it) in the search index
         query = Product.query
         if search:
-            search_filter = f'%{search}%'
-            query = query.filter(
-                (Product.name.ilike(search_filter)) | 
-                (Product.sku.ilike(search_filter))
-            )
+            query = query.filter(search_filter(search))
         
-        # Apply pagination
-        paginated = query.paginate(
+        if 'page' not in request.args:
+            # Keyset pagination on id, like the crawl and log lists: every page
+            # is an indexed range read and no count runs unless asked for
+            per_page = min(int(request.args.get('limit', per_page)), 100)
+            try:
+                products, next_cursor = keyset_page(query, [Product.id], request.args.get('cursor'), per_page)
+            except CursorError as e:
+                api.abort(400, str(e))
+            return {
+                'products': products,
+                'pagination': {
+                    'per_page': per_page,
+                    'total': total_count(query, request.args.get('count'), None if search else Product.__tablename__),
+                    'has_prev': bool(request.args.get('cursor')),
+                    'has_next': next_cursor is not None,
+                    'next_cursor': next_cursor,
+                }
+            }, 200
+        
+        # Numbered pages: OFFSET scan plus a COUNT(*) of the matching products
+        page = int(request.args.get('page', 1))
+        paginated = query.order_by(Product.id).paginate(
             page=page, 
             per_page=per_page, 
             error_out=False
@@ -138,12 +223,45 @@ class ProductList(Resource):
             db.session.rollback()
             api.abort(400, f"Error creating product: {str(e)}")
 
+def _search_args():
+    query = request.args.get('q', '').strip()
+    limit = request.args.get('limit', 10, type=int)
+    return query, max(1, min(limit, current_app.config['SEARCH_MAX_RESULTS']))
+
+
+@api.route('/search')
+class ProductSearch(Resource):
+    @api.doc('search_products', description='Products matching every word of q by name or SKU, accents and '
+             'case ignored, each word also matching as a prefix; most relevant first')
+    @api.param('q', 'Search words', _in='query')
+    @api.param('limit', 'Maximum results (default: 10, max: SEARCH_MAX_RESULTS)', _in='query')
+    @cached('product')
+    @serialize_with(api, product_search_result_model, as_list=True)
+    def get(self):
+        query, limit = _search_args()
+        return [{'score': score, 'product': product} for product, score in search_products(query, limit)], 200
+
+
+@api.route('/autocomplete')
+class ProductAutocomplete(Resource):
+    @api.doc('autocomplete_products', description='Name and SKU suggestions for a partly typed search, '
+             'most relevant first')
+    @api.param('q', 'Typed text', _in='query')
+    @api.param('limit', 'Maximum suggestions (default: 10, max: SEARCH_MAX_RESULTS)', _in='query')
+    @cached('product')
+    @serialize_with(api, product_suggestion_model, as_list=True)
+    def get(self):
+        query, limit = _search_args()
+        return [product for product, _ in search_products(query, limit)], 200
+
+
 @api.route('/<int:product_id>')
 @api.param('product_id', 'Product unique identifier')
 @api.response(404, 'Product not found')
 class ProductResource(Resource):
     @api.doc('get_product', description='Get a product by its ID')
-    @api.marshal_with(product_output_model)
+    @cached('product')
+    @serialize_with(api, product_output_model)
     def get(self, product_id):
         product = Product.query.get_or_404(product_id)
         return product, 200
@@ -190,6 +308,97 @@ class ProductResource(Resource):
         db.session.commit()
         return '', 204
 
+@api.route('/<int:product_id>/overview')
+@api.param('product_id', 'Product unique identifier')
+@api.response(404, 'Product not found')
+class ProductOverview(Resource):
+    @api.doc('get_product_overview', description='Product with its competitors, their latest price, '
+             'min/max/trend and a downsampled price history, built from a fixed number of queries')
+    @api.param('max_points', 'Maximum history points per competitor (default: 100)', _in='query')
+    @cached('product', 'product_crawl', 'product_crawl_log', 'enemy')
+    @serialize_with(api, product_overview_model)
+    def get(self, product_id):
+        product = Product.query.get_or_404(product_id)
+        max_points = max(2, min(request.args.get('max_points', 100, type=int), 1000))
+
+        crawls = db.session.query(
+            ProductCrawlModel.id, ProductCrawlModel.link, Enemy.id.label('enemy_id'), Enemy.name, Enemy.domain
+        ).outerjoin(Enemy, Enemy.id == ProductCrawlModel.enemy_id).filter(
+            ProductCrawlModel.prod_id == product_id
+        ).order_by(ProductCrawlModel.id).all()
+        series = load_price_series([crawl.id for crawl in crawls])
+
+        competitors = []
+        for crawl in crawls:
+            points = series[crawl.id]
+            competitor = {
+                'id': crawl.id,
+                'link': crawl.link,
+                'enemy': {'id': crawl.enemy_id, 'name': crawl.name, 'domain': crawl.domain} if crawl.enemy_id else None,
+                'observations': len(points),
+                'price_trend': 'stable',
+                'price_change': 0,
+                'history': {'timestamps': [], 'prices': []},
+            }
+            if points:
+                prices = [point['price'] for point in points]
+                price_change = prices[-1] - prices[0]
+                sampled = downsample(points, max_points, 'minmax')
+                competitor.update({
+                    'latest_price': prices[-1],
+                    'latest_name': points[-1]['name'],
+                    'latest_at': points[-1]['timestamp'].isoformat(),
+                    'min_price': min(point.get('min_price', point['price']) for point in points),
+                    'max_price': max(point.get('max_price', point['price']) for point in points),
+                    'price_trend': 'increasing' if price_change > 0 else 'decreasing' if price_change < 0 else 'stable',
+                    'price_change': price_change,
+                    'history': {
+                        'timestamps': [point['timestamp'].isoformat() for point in sampled],
+                        'prices': [point['price'] for point in sampled],
+                    },
+                })
+            competitors.append(competitor)
+
+        return {'product': product, 'competitors': competitors}, 200
+
+@api.route('/import')
+class ProductImport(Resource):
+    @api.doc('import_products', description='Bulk import products with their competitor links from a JSON '
+             'array or CSV (text/csv body or a multipart "file"). Enemies are resolved or created by link domain '
+             'and everything is inserted in one transaction with batched statements.')
+    @api.param('atomic', 'true to import nothing when any row has an error', _in='query')
+    @api.response(400, 'Unreadable body, or no row could be imported')
+    @api.response(413, 'Too many rows')
+    @serialize_with(api, import_result_model, code=201)
+    def post(self):
+        upload = request.files.get('file')
+        if upload is not None:
+            body = upload.read()
+            content_type = 'text/csv' if upload.filename.lower().endswith('.csv') else upload.mimetype
+        elif request.is_json:
+            body = request.get_json(silent=True)
+            content_type = 'application/json'
+        else:
+            body = request.get_data()
+            content_type = request.mimetype
+        try:
+            rows = parse_rows(body, content_type)
+        except ImportFormatError as e:
+            api.abort(400, str(e))
+        max_rows = current_app.config['IMPORT_MAX_ROWS']
+        if len(rows) > max_rows:
+            api.abort(413, f'At most {max_rows} rows can be imported at once')
+
+        try:
+            result = import_products(rows, atomic=request.args.get('atomic', 'false').lower() == 'true')
+            db.session.commit()
+        except SQLAlchemyError as e:
+            db.session.rollback()
+            api.abort(400, f"Error importing products: {str(e)}")
+        if result['created_products']:
+            return result, 201
+        return result, 400 if result['errors'] else 200
+
 @api.route('/extract-info')
 class ProductInfo(Resource):
     @api.expect(product_info_input_model)
@@ -1,21 +1,14 @@
-from flask import request, jsonify, Blueprint
+from flask import current_app, request, jsonify, Blueprint
 from flask_restx import Namespace, Resource
 from NewApp.models import Product, ProductCrawl, ProductCrawlLog
 from NewApp import db
-from apscheduler.schedulers.background import BackgroundScheduler
 from SendMail import send_mail_with_product_info
-from OCR.screenshot import scrape
+from NewApp.scheduler import CRAWL_SPREAD_JOB_ID, remove_job_if_exists, schedule_crawl_due, schedule_crawl_spread
 
 
 api = Namespace('reminder', description='Reminder related operations')
 reminder_routes = Blueprint('reminder_routes', __name__)
 
-scheduler = BackgroundScheduler()
-scheduler.start()
-
-# Store reminders in memory for simplicity
-reminders = []
-
 @api.route('/products/<int:product_id>/set-reminder')
 class SetReminder(Resource):
     def post(self, product_id):
@@ -24,9 +17,7 @@ class SetReminder(Resource):
         if not email:
             return jsonify({'error': 'Email is required'}), 400
 
-        # Add reminder to the list
-        reminders.append({'product_id': product_id, 'email': email})
-
+        # Stored on the product, so reminders survive restarts
         product = Product.query.get_or_404(product_id)
         product.reminder_email = email
         db.session.commit()
@@ -37,37 +28,32 @@ class SetReminder(Resource):
 class ScheduleCrawl(Resource):
     def post(self):
         data = request.json
+        if data.get('adaptive'):
+            # Per-crawl due times; the job only crawls what is due at each tick
+            remove_job_if_exists(CRAWL_SPREAD_JOB_ID)
+            schedule_crawl_due()
+            minutes = current_app.config['CRAWL_SCHEDULER_TICK_MINUTES']
+            return {'message': f'Adaptive crawl scheduling started, checking due crawls every {minutes} minutes'}, 200
+
         hours = data.get('hours')
         if not hours or not isinstance(hours, (int, float)):
-            return jsonify({'error': 'Valid number of hours is required'}), 400
+            return {'error': 'Valid number of hours is required'}, 400
 
-        def crawl_job():
-            crawls = ProductCrawl.query.all()
-            for crawl in crawls:
-                crawl_result = scrape(crawl.link)
-                log = ProductCrawlLog(
-                    product_crawl_id=crawl.id,
-                    name=crawl_result.get('product_name', 'Unknown'),
-                    price=crawl_result.get('current_price'),
-                    other_data=crawl_result,
-                )
-                db.session.add(log)
-            db.session.commit()
-
-        scheduler.add_job(crawl_job, 'interval', hours=hours)
+        # Every crawl gets one due time in each window, spread evenly with jitter,
+        # and the tick job crawls them within CRAWL_CAPACITY_PER_HOUR. Both jobs
+        # have fixed ids, so scheduling again replaces them
+        schedule_crawl_spread(hours)
+        schedule_crawl_due()
 
-        return jsonify({'message': f'Crawl scheduled in {hours} hours'}), 200
+        return {'message': f'Crawl scheduled in {hours} hours'}, 200
 
 # Example function to check reminders and send emails
 def check_reminders(app):
     with app.app_context():
-        for reminder in reminders:
-            product_id = reminder['product_id']
-            email = reminder['email']
-
-            product = Product.query.get(product_id)
-            if not product:
-                continue
+        products = Product.query.filter(Product.reminder_email.isnot(None), Product.reminder_email != '').all()
+        for product in products:
+            product_id = product.id
+            email = product.reminder_email
 
             # Get all enemy products (crawls) for this product
             crawls = ProductCrawl.query.filter_by(prod_id=product_id).all()
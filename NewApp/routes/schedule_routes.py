@@ -0,0 +1,78 @@
+from flask_restx import Namespace, Resource, fields
+from NewApp.scheduler import running_scheduler
+
+api = Namespace('schedules', description='Scheduled job operations')
+
+schedule_output_model = api.model('ScheduleOutput', {
+    'id': fields.String(description='Stable job id'),
+    'name': fields.String(description='Job name'),
+    'func': fields.String(description='Job function'),
+    'trigger': fields.String(description='When the job runs'),
+    'next_run_time': fields.String(description='Next run; empty while paused'),
+    'paused': fields.Boolean(description='Job is paused'),
+})
+
+
+def _job_output(job):
+    return {
+        'id': job.id,
+        'name': job.name,
+        'func': job.func_ref,
+        'trigger': str(job.trigger),
+        'next_run_time': job.next_run_time.isoformat() if job.next_run_time else None,
+        'paused': job.next_run_time is None,
+    }
+
+
+def _get_job_or_404(job_id):
+    job = running_scheduler().get_job(job_id)
+    if job is None:
+        api.abort(404, f'Schedule {job_id} not found')
+    return job
+
+
+@api.route('/')
+class ScheduleList(Resource):
+    @api.doc('list_schedules', description='List all scheduled jobs')
+    @api.marshal_list_with(schedule_output_model)
+    def get(self):
+        return [_job_output(job) for job in running_scheduler().get_jobs()], 200
+
+
+@api.route('/<string:job_id>')
+@api.param('job_id', 'Job id')
+@api.response(404, 'Schedule not found')
+class ScheduleResource(Resource):
+    @api.doc('get_schedule', description='Get a scheduled job by id')
+    @api.marshal_with(schedule_output_model)
+    def get(self, job_id):
+        return _job_output(_get_job_or_404(job_id)), 200
+
+    @api.doc('delete_schedule', description='Remove a scheduled job')
+    @api.response(204, 'Schedule deleted')
+    def delete(self, job_id):
+        _get_job_or_404(job_id)
+        running_scheduler().remove_job(job_id)
+        return '', 204
+
+
+@api.route('/<string:job_id>/pause')
+@api.param('job_id', 'Job id')
+@api.response(404, 'Schedule not found')
+class SchedulePause(Resource):
+    @api.doc('pause_schedule', description='Pause a scheduled job until it is resumed')
+    @api.marshal_with(schedule_output_model)
+    def post(self, job_id):
+        _get_job_or_404(job_id)
+        return _job_output(running_scheduler().pause_job(job_id)), 200
+
+
+@api.route('/<string:job_id>/resume')
+@api.param('job_id', 'Job id')
+@api.response(404, 'Schedule not found')
+class ScheduleResume(Resource):
+    @api.doc('resume_schedule', description='Resume a paused job')
+    @api.marshal_with(schedule_output_model)
+    def post(self, job_id):
+        _get_job_or_404(job_id)
+        return _job_output(running_scheduler().resume_job(job_id)), 200
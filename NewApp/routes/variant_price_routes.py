@@ -0,0 +1,103 @@
+from flask import request
+from flask_restx import Namespace, Resource, fields
+from sqlalchemy import func
+from NewApp import db
+from NewApp.models import Enemy, ProductCrawl, ProductCrawlVariantPrice
+from NewApp.crawl_logs import normalize_variant_key
+
+api = Namespace('variant_price', description='SKU and color variant price operations')
+
+variant_comparison_model = api.model('VariantPriceComparison', {
+    'product_crawl_id': fields.Integer(description='ProductCrawl ID'),
+    'prod_id': fields.Integer(description='Product ID'),
+    'enemy_id': fields.Integer(description='Enemy ID'),
+    'enemy_name': fields.String(description='Enemy name'),
+    'link': fields.String(description='Crawl link'),
+    'variant_type': fields.String(description='sku or color'),
+    'variant_key': fields.String(description='Normalized variant key'),
+    'variant_label': fields.String(description='Variant label as extracted'),
+    'price': fields.Float(description='Latest variant price'),
+    'timestamp': fields.String(description='Time the price was observed'),
+})
+
+variant_history_model = api.model('VariantPriceHistory', {
+    'log_id': fields.Integer(description='ProductCrawlLog ID'),
+    'variant_type': fields.String(description='sku or color'),
+    'variant_key': fields.String(description='Normalized variant key'),
+    'variant_label': fields.String(description='Variant label as extracted'),
+    'price': fields.Float(description='Variant price'),
+    'timestamp': fields.String(description='Time the price was observed'),
+})
+
+
+@api.route('/compare')
+class VariantPriceComparison(Resource):
+    @api.doc('compare_variant_prices', description='Latest price of a variant across competitors, cheapest first')
+    @api.param('variant', 'Variant label, e.g. 256GB', required=True, _in='query')
+    @api.param('variant_type', 'Restrict to sku or color', _in='query')
+    @api.param('prod_id', 'Restrict to competitors of one product', _in='query')
+    @api.marshal_list_with(variant_comparison_model)
+    def get(self):
+        variant = request.args.get('variant', '').strip()
+        if not variant:
+            api.abort(400, 'Missing required parameter: variant')
+        variant_type = request.args.get('variant_type')
+        prod_id = request.args.get('prod_id', type=int)
+
+        V = ProductCrawlVariantPrice
+        ranked = db.session.query(
+            V.product_crawl_id,
+            V.variant_type,
+            V.variant_key,
+            V.variant_label,
+            V.price,
+            V.timestamp,
+            func.row_number().over(
+                partition_by=(V.product_crawl_id, V.variant_type),
+                order_by=(V.timestamp.desc(), V.id.desc()),
+            ).label('rank'),
+        ).filter(V.variant_key == normalize_variant_key(variant))
+        if variant_type:
+            ranked = ranked.filter(V.variant_type == variant_type)
+        if prod_id:
+            ranked = ranked.join(ProductCrawl, ProductCrawl.id == V.product_crawl_id).filter(ProductCrawl.prod_id == prod_id)
+        ranked = ranked.subquery()
+
+        rows = db.session.query(
+            ranked.c.product_crawl_id,
+            ProductCrawl.prod_id,
+            ProductCrawl.enemy_id,
+            Enemy.name.label('enemy_name'),
+            ProductCrawl.link,
+            ranked.c.variant_type,
+            ranked.c.variant_key,
+            ranked.c.variant_label,
+            ranked.c.price,
+            ranked.c.timestamp,
+        ).join(ProductCrawl, ProductCrawl.id == ranked.c.product_crawl_id).join(
+            Enemy, Enemy.id == ProductCrawl.enemy_id
+        ).filter(ranked.c.rank == 1).order_by(ranked.c.price.asc()).all()
+
+        return [dict(row._mapping, timestamp=row.timestamp.isoformat()) for row in rows], 200
+
+
+@api.route('/history/<int:product_crawl_id>')
+@api.param('product_crawl_id', 'Product crawl unique identifier')
+class VariantPriceHistory(Resource):
+    @api.doc('variant_price_history', description='Price history of the variants of one product crawl')
+    @api.param('variant', 'Only this variant label', _in='query')
+    @api.param('variant_type', 'Restrict to sku or color', _in='query')
+    @api.marshal_list_with(variant_history_model)
+    def get(self, product_crawl_id):
+        V = ProductCrawlVariantPrice
+        query = db.session.query(
+            V.log_id, V.variant_type, V.variant_key, V.variant_label, V.price, V.timestamp
+        ).filter(V.product_crawl_id == product_crawl_id)
+        variant = request.args.get('variant', '').strip()
+        if variant:
+            query = query.filter(V.variant_key == normalize_variant_key(variant))
+        variant_type = request.args.get('variant_type')
+        if variant_type:
+            query = query.filter(V.variant_type == variant_type)
+        rows = query.order_by(V.variant_key, V.timestamp.asc(), V.id.asc()).all()
+        return [dict(row._mapping, timestamp=row.timestamp.isoformat()) for row in rows], 200
@@ -0,0 +1,118 @@
+import datetime
+import threading
+from apscheduler.jobstores.sqlalchemy import SQLAlchemyJobStore
+from apscheduler.schedulers.background import BackgroundScheduler
+
+# The single scheduler of the application. Jobs are persisted in the
+# apscheduler_jobs table, so they have stable ids and survive restarts; job
+# functions are module-level so the store can reference them by name.
+scheduler = BackgroundScheduler()
+
+# Stable ids of the application's jobs; adding a job again replaces it
+REMINDERS_JOB_ID = 'check_reminders'
+ROLLUP_JOB_ID = 'rollup_logs'
+CRAWL_DUE_JOB_ID = 'crawl_due'
+CRAWL_SPREAD_JOB_ID = 'crawl_spread'
+
+_app = None
+_start_lock = threading.Lock()
+
+
+def init_scheduler(app):
+    """Configure the job store and job defaults. Nothing connects to the job
+    store until the scheduler is first used (running_scheduler), so startup
+    stays fast for processes that never touch schedules."""
+    global _app
+    _app = app
+    if scheduler.running:
+        return
+    config = app.config
+    if config['SCHEDULER_JOBSTORE_URL']:
+        jobstore = SQLAlchemyJobStore(url=config['SCHEDULER_JOBSTORE_URL'], tablename=config['SCHEDULER_JOBSTORE_TABLE'])
+    else:
+        # Share the application's engine and connection pool
+        from NewApp import db
+        with app.app_context():
+            jobstore = SQLAlchemyJobStore(engine=db.engine, tablename=config['SCHEDULER_JOBSTORE_TABLE'])
+    scheduler.configure(
+        jobstores={'default': jobstore},
+        job_defaults={
+            # A run missed while the app was down fires once, not once per missed interval
+            'coalesce': True,
+            'max_instances': 1,
+            'misfire_grace_time': config['SCHEDULER_MISFIRE_GRACE_SECONDS'],
+        },
+    )
+
+
+def running_scheduler():
+    """The scheduler, started paused on first use: schedules can be listed and
+    changed through the API in any process, but only the one calling
+    start_scheduler runs jobs."""
+    with _start_lock:
+        if not scheduler.running:
+            scheduler.start(paused=True)
+    return scheduler
+
+
+def start_scheduler(app):
+    """Register the built-in jobs and start running scheduled jobs."""
+    init_scheduler(app)
+    running_scheduler()
+    config = app.config
+    scheduler.add_job(check_reminders_job, 'interval', minutes=config['MAIL_INTERVAL_MINUTES'],
+                      id=REMINDERS_JOB_ID, name='Check price reminders', replace_existing=True)
+    scheduler.add_job(rollup_job, 'interval', minutes=config['LOG_ROLLUP_INTERVAL_MINUTES'],
+                      id=ROLLUP_JOB_ID, name='Crawl log rollup', replace_existing=True)
+    if config['CRAWL_ADAPTIVE_SCHEDULING']:
+        schedule_crawl_due()
+    scheduler.resume()
+
+
+def schedule_crawl_due():
+    """Add (or replace) the tick job crawling due product crawls."""
+    return running_scheduler().add_job(crawl_due_job, 'interval', minutes=_app.config['CRAWL_SCHEDULER_TICK_MINUTES'],
+                             id=CRAWL_DUE_JOB_ID, name='Crawl due product crawls', replace_existing=True)
+
+
+def schedule_crawl_spread(hours):
+    """Add (or replace) the fixed-interval job spreading all crawls over each
+    window of hours; its first window starts now."""
+    return running_scheduler().add_job(crawl_spread_job, 'interval', hours=hours, args=[hours * 60],
+                             id=CRAWL_SPREAD_JOB_ID, name=f'Spread crawls every {hours} hours',
+                             replace_existing=True, next_run_time=datetime.datetime.now(datetime.timezone.utc))
+
+
+def spread_window():
+    """(next window start as naive UTC, window length) of the fixed-interval
+    crawl schedule, or None if it is not active."""
+    job = running_scheduler().get_job(CRAWL_SPREAD_JOB_ID)
+    if job is None or job.next_run_time is None:
+        return None
+    start = job.next_run_time.astimezone(datetime.timezone.utc).replace(tzinfo=None)
+    return start, job.trigger.interval
+
+
+def remove_job_if_exists(job_id):
+    if running_scheduler().get_job(job_id):
+        scheduler.remove_job(job_id)
+
+
+def check_reminders_job():
+    from NewApp.routes.reminder_routes import check_reminders
+    check_reminders(_app)
+
+
+def rollup_job():
+    from NewApp.log_rollup import rollup_job as run_rollup
+    run_rollup(_app)
+
+
+def crawl_due_job():
+    from NewApp.crawler import crawl_due
+    crawl_due(_app)
+
+
+def crawl_spread_job(window_minutes):
+    from NewApp.crawler import spread_all
+    spread_all(_app, window_minutes)
@@ -0,0 +1,147 @@
+import re
+import unicodedata
+from flask import current_app
+from sqlalchemy import delete, event, false, insert, inspect, select
+from sqlalchemy.orm import Session, aliased
+from NewApp import db
+from NewApp.models import Product, ProductSearchTerm
+
+# Longest stored term (the column length); longer words and queries are cut
+TERM_MAX_LENGTH = 32
+
+# Weight of a term per product: an SKU outranks a name, a whole word a prefix
+NAME_PREFIX = 1
+NAME_WORD = 3
+SKU_PREFIX = 2
+SKU_WORD = 6
+
+_TOKEN_RE = re.compile(r'[a-z0-9]+')
+
+
+def normalize(text):
+    """Lowercase text without diacritics, đ as d: 'Điện thoại' -> 'dien thoai'."""
+    text = unicodedata.normalize('NFD', (text or '').lower().replace('đ', 'd'))
+    return ''.join(char for char in text if not unicodedata.combining(char))
+
+
+def tokens(text):
+    return _TOKEN_RE.findall(normalize(text))
+
+
+def product_terms(name, sku, min_prefix=None):
+    """{term: weight} of a product: every word of the name and SKU and every
+    prefix of at least min_prefix (default SEARCH_MIN_PREFIX_LENGTH)
+    characters. The SKU also counts as one word without its separators, so
+    'SM-G991B' is found by 'sm', 'g991b' and 'smg991b'."""
+    if min_prefix is None:
+        min_prefix = current_app.config['SEARCH_MIN_PREFIX_LENGTH']
+    terms = {}
+
+    def add(words, word_weight, prefix_weight):
+        for word in words:
+            word = word[:TERM_MAX_LENGTH]
+            for length in range(min_prefix, len(word)):
+                terms[word[:length]] = max(terms.get(word[:length], 0), prefix_weight)
+            terms[word] = max(terms.get(word, 0), word_weight)
+
+    add(tokens(name), NAME_WORD, NAME_PREFIX)
+    sku_words = tokens(sku)
+    if len(sku_words) > 1:
+        sku_words.append(''.join(sku_words))
+    add(sku_words, SKU_WORD, SKU_PREFIX)
+    return terms
+
+
+def query_terms(query):
+    """Distinct terms of a search query; a product matches when it has all of them."""
+    return list(dict.fromkeys(token[:TERM_MAX_LENGTH] for token in tokens(query)))
+
+
+def _matches(terms):
+    """product_id and score of products having every term. One join per term,
+    driven by the longest (usually rarest) term, so the cost follows the
+    postings of that term rather than the size of the catalog."""
+    terms = sorted(terms, key=len, reverse=True)
+    first = aliased(ProductSearchTerm)
+    score = first.weight
+    statement = select(first.product_id).where(first.term == terms[0])
+    for term in terms[1:]:
+        other = aliased(ProductSearchTerm)
+        statement = statement.join(other, (other.product_id == first.product_id) & (other.term == term))
+        score = score + other.weight
+    return statement.add_columns(score.label('score'))
+
+
+def search_filter(query):
+    """Filter of Product queries for products matching every word of query."""
+    terms = query_terms(query)
+    if not terms:
+        return false()
+    return Product.id.in_(select(_matches(terms).subquery().c.product_id))
+
+
+def search_products(query, limit):
+    """[(product, score)] of products matching every word of query, most
+    relevant first: summed term weights, then newest product."""
+    terms = query_terms(query)
+    if not terms:
+        return []
+    matches = _matches(terms).subquery()
+    rows = db.session.execute(
+        select(Product, matches.c.score).join(matches, matches.c.product_id == Product.id)
+        .order_by(matches.c.score.desc(), Product.id.desc()).limit(limit)
+    )
+    return [(product, score) for product, score in rows]
+
+
+def index_products(connection, products):
+    """Replace the search terms of products, given as (id, name, sku) tuples."""
+    products = list(products)
+    if not products:
+        return
+    min_prefix = current_app.config['SEARCH_MIN_PREFIX_LENGTH']
+    batch_size = current_app.config['IMPORT_BATCH_SIZE']
+    connection.execute(delete(ProductSearchTerm).where(ProductSearchTerm.product_id.in_([p[0] for p in products])))
+    rows = [
+        {'term': term, 'product_id': product_id, 'weight': weight}
+        for product_id, name, sku in products
+        for term, weight in product_terms(name, sku, min_prefix).items()
+    ]
+    for start in range(0, len(rows), batch_size):
+        connection.execute(insert(ProductSearchTerm), rows[start:start + batch_size])
+
+
+def reindex_all(batch_size=1000):
+    """Rebuild the search terms of all products. Returns the number indexed."""
+    connection = db.session.connection()
+    connection.execute(delete(ProductSearchTerm))
+    last_id, indexed = 0, 0
+    while True:
+        products = db.session.execute(
+            select(Product.id, Product.name, Product.sku).where(Product.id > last_id).order_by(Product.id).limit(batch_size)
+        ).all()
+        if not products:
+            return indexed
+        index_products(connection, products)
+        last_id = products[-1].id
+        indexed += len(products)
+
+
+@event.listens_for(Session, 'after_flush')
+def _index_flushed_products(session, flush_context):
+    # Bulk insert(Product) statements bypass the flush; their callers index
+    # the rows themselves (see bulk_import)
+    changed = [
+        obj for obj in session.new | session.dirty
+        if isinstance(obj, Product) and (
+            obj in session.new or any(inspect(obj).attrs[key].history.has_changes() for key in ('name', 'sku'))
+        )
+    ]
+    deleted = [obj.id for obj in session.deleted if isinstance(obj, Product)]
+    if not changed and not deleted:
+        return
+    connection = session.connection()
+    if deleted:
+        connection.execute(delete(ProductSearchTerm).where(ProductSearchTerm.product_id.in_(deleted)))
+    if changed:
+        index_products(connection, [(obj.id, obj.name, obj.sku) for obj in changed])
@@ -0,0 +1,239 @@
+import datetime
+import decimal
+import functools
+import json
+import keyword
+import operator
+from flask import current_app, make_response, request
+from flask_restx import fields, marshal
+from flask_restx.utils import unpack
+from werkzeug.wrappers import Response
+from sqlalchemy import Date, DateTime, Numeric
+
+try:
+    import orjson
+except ImportError:  # optional; the stdlib encoder is used without it
+    orjson = None
+
+_row_serializers = {}
+_model_serializers = {}
+
+# Formatting of each flask-restx field type, as done by Field.format
+_FIELD_FORMATS = {
+    fields.String: str,
+    fields.Integer: int,
+    fields.Float: float,
+    fields.Boolean: bool,
+    fields.Raw: None,
+}
+
+
+def _default(value):
+    if isinstance(value, decimal.Decimal):
+        return float(value)
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(data):
+    """Encode data as UTF-8 JSON bytes, handling Decimal and datetime values."""
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(data, default=_default, ensure_ascii=False, separators=(',', ':')).encode('utf-8')
+
+
+def output_json(data, code, headers=None):
+    """flask-restx representation for application/json using dumps."""
+    response = make_response(dumps(data), code)
+    response.headers.extend(headers or {})
+    response.mimetype = 'application/json'
+    return response
+
+
+def row_serializer(model, exclude=()):
+    """Compiled column projection of a SQLAlchemy model: row -> dict with
+    Decimal columns as float and datetime columns as ISO strings.
+
+    The column list, getter and converters are built once per model.
+    """
+    key = (model, tuple(exclude))
+    serializer = _row_serializers.get(key)
+    if serializer is not None:
+        return serializer
+
+    columns = [column for column in model.__table__.columns if column.key not in exclude]
+    names = tuple(column.key for column in columns)
+    getter = operator.attrgetter(*names)
+    converters = []
+    for index, column in enumerate(columns):
+        if isinstance(column.type, Numeric):
+            converters.append((index, float))
+        elif isinstance(column.type, (DateTime, Date)):
+            converters.append((index, _isoformat))
+    converters = tuple(converters)
+
+    def serializer(row):
+        values = getter(row)
+        values = list(values) if len(names) > 1 else [values]
+        for index, convert in converters:
+            if values[index] is not None:
+                values[index] = convert(values[index])
+        return dict(zip(names, values))
+
+    _row_serializers[key] = serializer
+    return serializer
+
+
+def model_serializer(api_model):
+    """Compile a flask-restx model into a function returning the same dict as
+    marshal(obj, api_model).
+
+    The function is generated once per model with every field read and
+    converted inline, so no per-field dispatch happens while serializing.
+    """
+    serializer = _model_serializers.get(id(api_model))
+    if serializer is not None:
+        return serializer
+
+    items = [(key, field.attribute or key, field) for key, field in api_model.items()]
+    if all(_is_identifier(attribute) for _, attribute, _ in items):
+        serializer = _generate_serializer(api_model.name, items)
+    else:
+        # Dotted or callable attributes go through the flask-restx lookup
+        entries = tuple((key, attribute, _field_converter(field)) for key, attribute, field in items)
+
+        def serializer(obj):
+            return {key: convert(fields.get_value(attribute, obj)) for key, attribute, convert in entries}
+
+    _model_serializers[id(api_model)] = serializer
+    return serializer
+
+
+def _generate_serializer(name, items):
+    if not items:
+        return lambda obj: {}
+    namespace = {'getattr': getattr, 'isinstance': isinstance, 'dict': dict, 'attributes': tuple(a for _, a, _ in items)}
+    values = [f'v{i}' for i in range(len(items))]
+    outputs = []
+    for i, (key, _, field) in enumerate(items):
+        format_, default = _field_format(field)
+        namespace[f'c{i}'] = format_
+        namespace[f'd{i}'] = default
+        value = values[i]
+        if default is _SELF_DEFAULT:
+            # Nested/List converters handle None themselves
+            expression = f'c{i}({value})'
+        elif format_ is None:
+            expression = value if default is None else f'(d{i} if {value} is None else {value})'
+        else:
+            expression = f'(d{i} if {value} is None else c{i}({value}))'
+        outputs.append(f'{key!r}: {expression}')
+
+    unpack_to = ', '.join(values) + (',' if len(values) == 1 else '')
+    source = '\n'.join([
+        'def serialize(obj):',
+        '    if isinstance(obj, dict):',
+        f"        {unpack_to} = ({', '.join(f'obj.get({a!r})' for _, a, _ in items)},)",
+        '    else:',
+        '        try:',
+        f"            {unpack_to} = ({', '.join(f'obj.{a}' for _, a, _ in items)},)",
+        '        except AttributeError:',
+        f'            {unpack_to} = tuple(getattr(obj, attribute, None) for attribute in attributes)',
+        f"    return {{{', '.join(outputs)}}}",
+    ])
+    exec(compile(source, f'<serializer {name}>', 'exec'), namespace)
+    return namespace['serialize']
+
+
+def serialize_with(api, api_model, as_list=False, code=200, description='Success'):
+    """Faster drop-in for api.marshal_with / api.marshal_list_with.
+
+    Output and Swagger documentation are the same; requests using the
+    X-Fields mask header fall back to flask-restx marshalling. Response
+    objects returned by the view are passed through unchanged.
+    """
+    serialize = model_serializer(api_model)
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            result = func(*args, **kwargs)
+            if isinstance(result, Response):
+                # Streamed or otherwise prebuilt responses are returned as is
+                return result
+            data, status, headers = unpack(result)
+            mask = request.headers.get(current_app.config.get('RESTX_MASK_HEADER', 'X-Fields'))
+            if mask:
+                return marshal(data, api_model, mask=mask), status, headers
+            if as_list:
+                return [serialize(item) for item in data], status, headers
+            return serialize(data), status, headers
+
+        model = [api_model] if as_list else api_model
+        return api.doc(responses={str(code): (description, model)}, __mask__=True)(wrapper)
+    return decorator
+
+
+# Marker for converters that handle None themselves
+_SELF_DEFAULT = object()
+
+
+def _field_format(field):
+    """Return (format, default) of a field; format is None for raw values."""
+    if isinstance(field, (fields.Nested, fields.List)):
+        return _field_converter(field), _SELF_DEFAULT
+    format_ = _FIELD_FORMATS.get(type(field), field.format)
+    default = field.default
+    if default:
+        default = format_(default) if format_ else default
+    return format_, default
+
+
+def _field_converter(field):
+    if isinstance(field, fields.Nested):
+        nested = model_serializer(field.nested)
+        allow_null, default = field.allow_null, field.default
+
+        def convert(value):
+            if value is None:
+                if allow_null:
+                    return None
+                if default is not None:
+                    return default
+                # marshal() of None yields the model with every field empty
+                return nested({})
+            return nested(value)
+        return convert
+
+    if isinstance(field, fields.List):
+        item = _field_converter(field.container)
+        default = field.default
+
+        def convert(value):
+            if value is None:
+                return default
+            return [item(element) for element in value]
+        return convert
+
+    format_, default = _field_format(field)
+    if format_ is None and default is None:
+        return _identity
+
+    def convert(value):
+        if value is None:
+            return default
+        return format_(value) if format_ else value
+    return convert
+
+
+def _is_identifier(attribute):
+    return isinstance(attribute, str) and attribute.isidentifier() and not keyword.iskeyword(attribute)
+
+
+def _identity(value):
+    return value
+
+
+def _isoformat(value):
+    return value.isoformat()
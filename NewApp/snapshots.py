@@ -0,0 +1,100 @@
+import datetime
+import hashlib
+import os
+import tempfile
+import time
+import zlib
+from flask import current_app
+from sqlalchemy import select
+from NewApp import db
+from NewApp.models import ProductCrawlLog
+
+# Screenshots are stored as the PNG the crawler made (already compressed),
+# page text zlib-compressed. Files live at <SNAPSHOT_DIR>/<2 hex>/<sha256>.<ext>
+# and are named after the SHA-256 of their uncompressed content, so a page
+# that did not change is stored once.
+IMAGE = 'png'
+TEXT = 'txt.z'
+
+# Unreferenced files younger than this may belong to a crawl not committed yet
+PRUNE_MIN_AGE = datetime.timedelta(hours=1)
+
+
+def archive_dir():
+    """Root of the store when fetched pages are archived (CRAWL_SNAPSHOTS), else None."""
+    config = current_app.config
+    return config['SNAPSHOT_DIR'] if config['CRAWL_SNAPSHOTS'] else None
+
+
+def _path(root, digest, extension):
+    return os.path.join(root, digest[:2], f'{digest}.{extension}')
+
+
+def put(root, content, extension):
+    """Store content (bytes) and return its hash; existing content is not rewritten."""
+    digest = hashlib.sha256(content).hexdigest()
+    path = _path(root, digest, extension)
+    if os.path.exists(path):
+        # A fresh mtime keeps prune() from deleting it before the log commits
+        os.utime(path)
+        return digest
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = zlib.compress(content) if extension == TEXT else content
+    # Written under a temporary name, so readers never see a partial file
+    fd, temporary = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as file:
+            file.write(data)
+        os.replace(temporary, path)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+    return digest
+
+
+def get(root, digest, extension):
+    """Content stored under digest; FileNotFoundError if it was pruned."""
+    with open(_path(root, digest, extension), 'rb') as file:
+        data = file.read()
+    return zlib.decompress(data) if extension == TEXT else data
+
+
+def store(root, snapshot):
+    """Archive a snapshot filled by scrape() and return the log columns
+    linking to it, or None if nothing was captured."""
+    if not snapshot or not snapshot.get('image'):
+        return None
+    return {
+        'snapshot_image_hash': put(root, snapshot['image'], IMAGE),
+        'snapshot_text_hash': put(root, (snapshot.get('text') or '').encode('utf-8'), TEXT),
+    }
+
+
+def load(root, image_hash, text_hash):
+    """(PNG bytes, page text) of an archived snapshot."""
+    image = get(root, image_hash, IMAGE)
+    text = get(root, text_hash, TEXT).decode('utf-8') if text_hash else ''
+    return image, text
+
+
+def prune(root=None):
+    """Delete archived files no longer referenced by any crawl log, e.g. after
+    raw logs were removed by retention. Returns the number deleted."""
+    root = root or current_app.config['SNAPSHOT_DIR']
+    if not os.path.isdir(root):
+        return 0
+    referenced = set()
+    for column in (ProductCrawlLog.snapshot_image_hash, ProductCrawlLog.snapshot_text_hash):
+        referenced.update(db.session.scalars(select(column).where(column.isnot(None)).distinct()))
+    cutoff = time.time() - PRUNE_MIN_AGE.total_seconds()
+    deleted = 0
+    for shard in os.scandir(root):
+        if not shard.is_dir():
+            continue
+        for entry in os.scandir(shard.path):
+            digest = entry.name.split('.', 1)[0]
+            if digest in referenced or entry.stat().st_mtime > cutoff:
+                continue
+            os.unlink(entry.path)
+            deleted += 1
+    return deleted
@@ -0,0 +1,83 @@
+import numpy as np
+
+DOWNSAMPLING_METHODS = ('lttb', 'minmax')
+
+
+def minmax_indices(values, max_points):
+    """Indices of a shape-preserving subset of at most max_points values.
+
+    The series is split into equal buckets and the lowest and highest value
+    of each bucket are kept (in time order), along with the first and last
+    point, so spikes and dips survive downsampling.
+    """
+    values = np.asarray(values, dtype=float)
+    count = len(values)
+    if max_points is None or count <= max_points:
+        return np.arange(count)
+    if max_points < 4:
+        return np.array([0, count - 1][:max(max_points, 1)])
+
+    buckets = (max_points - 2) // 2
+    edges = 1 + (np.arange(buckets + 1) * (count - 2)) // buckets
+    indices = [0]
+    for start, end in zip(edges[:-1], edges[1:]):
+        if start >= end:
+            continue
+        window = values[start:end]
+        low = start + int(window.argmin())
+        high = start + int(window.argmax())
+        indices.extend(sorted({low, high}))
+    indices.append(count - 1)
+    return np.array(indices)
+
+
+def lttb_indices(x, y, max_points):
+    """Largest-Triangle-Three-Buckets: indices of at most max_points points.
+
+    Keeps the first and last point and, from each bucket in between, the
+    point forming the largest triangle with the previously kept point and
+    the average of the next bucket.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    count = len(y)
+    if max_points is None or count <= max_points:
+        return np.arange(count)
+    if max_points < 3:
+        return np.array([0, count - 1][:max(max_points, 1)])
+
+    every = (count - 2) / (max_points - 2)
+    edges = (np.floor(np.arange(max_points - 1) * every) + 1).astype(int)
+    edges[-1] = count - 1
+    indices = np.empty(max_points, dtype=int)
+    indices[0] = 0
+    indices[-1] = count - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else count
+        next_x = x[end:next_end].mean()
+        next_y = y[end:next_end].mean()
+        area = np.abs(
+            (x[selected] - next_x) * (y[start:end] - y[selected])
+            - (x[selected] - x[start:end]) * (next_y - y[selected])
+        )
+        selected = start + int(area.argmax())
+        indices[bucket + 1] = selected
+    return indices
+
+
+def downsample(points, max_points, method='lttb', value_key='price'):
+    """Downsample a time-ordered list of point dicts to at most max_points."""
+    if max_points is None or len(points) <= max_points:
+        return points
+    values = np.fromiter((point[value_key] for point in points), dtype=float, count=len(points))
+    if method == 'minmax':
+        indices = minmax_indices(values, max_points)
+    else:
+        origin = points[0]['timestamp']
+        seconds = np.fromiter(
+            ((point['timestamp'] - origin).total_seconds() for point in points), dtype=float, count=len(points)
+        )
+        indices = lttb_indices(seconds, values, max_points)
+    return [points[i] for i in indices]
@@ -0,0 +1,66 @@
+import os
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+# Query parameters added by ads, newsletters and share buttons; they never
+# change the page a competitor serves. Entries ending in '*' are prefixes.
+DEFAULT_TRACKING_PARAMS = (
+    'utm_*', 'gclid', 'gclsrc', 'gbraid', 'wbraid', 'dclid', 'gad_source', 'srsltid', '_gl',
+    'fbclid', 'msclkid', 'yclid', 'ttclid', 'zarsrc', 'mc_cid', 'mc_eid', '_hsenc', '_hsmi',
+)
+
+
+def _tracking_params():
+    value = os.getenv('URL_TRACKING_PARAMS')
+    names = DEFAULT_TRACKING_PARAMS if value is None else [name.strip() for name in value.split(',')]
+    names = [name.lower() for name in names if name]
+    exact = frozenset(name for name in names if not name.endswith('*'))
+    prefixes = tuple(name[:-1] for name in names if name.endswith('*'))
+    return exact, prefixes
+
+
+TRACKING_PARAMS, TRACKING_PREFIXES = _tracking_params()
+
+_DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(link):
+    """Canonical form of a crawl link, so the same page is stored, looked up
+    and fetched once however it was pasted.
+
+    Scheme and host are lowercased, default ports, fragments and tracking
+    parameters are dropped, the remaining parameters are sorted and a
+    trailing slash is removed from the path. Anything that is not an
+    http(s) URL is only stripped of surrounding whitespace.
+    """
+    if link is None:
+        return None
+    link = link.strip()
+    try:
+        parts = urlsplit(link)
+        port = parts.port
+    except ValueError:
+        return link
+    scheme = parts.scheme.lower()
+    if scheme not in _DEFAULT_PORTS or not parts.hostname:
+        return link
+
+    netloc = parts.hostname.rstrip('.')
+    if ':' in netloc:
+        netloc = f'[{netloc}]'
+    if port is not None and port != _DEFAULT_PORTS[scheme]:
+        netloc = f'{netloc}:{port}'
+    if parts.username is not None:
+        userinfo = parts.username + (f':{parts.password}' if parts.password is not None else '')
+        netloc = f'{userinfo}@{netloc}'
+
+    path = parts.path.rstrip('/') or '/'
+    # Parameters are kept as written (no re-encoding), only filtered and sorted
+    query = '&'.join(sorted(
+        param for param in parts.query.split('&') if param and not _is_tracking_param(param)
+    ))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def _is_tracking_param(param):
+    key = unquote_plus(param.split('=', 1)[0]).lower()
+    return key in TRACKING_PARAMS or key.startswith(TRACKING_PREFIXES)
@@ -1,12 +1,14 @@
-import google.generativeai as genai
-from PIL import Image  # For opening image files
 import os
 from dotenv import load_dotenv
 import json
 
 load_dotenv()
 
-def Extract(imgURL):
+def Extract(imgURL, page_text=None):
+    # imgURL is an image path or file object; page_text, if given, is sent
+    # along with the screenshot as the visible text of the page
+    import google.generativeai as genai
+    from PIL import Image  # For opening image files
     try:
         api_key = os.getenv("GOOGLE_API_KEY")
         model_name = os.getenv("GEMINI_MODEL")
@@ -33,6 +35,8 @@ def Extract(imgURL):
         print("Error: PROMPT_TEXT environment variable is not set.")
         return
     contents = [prompt_text, img]
+    if page_text:
+        contents.append("Visible text of the page:\n" + page_text)
     try:
         response = model.generate_content(contents)
 
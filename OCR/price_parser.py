@@ -0,0 +1,32 @@
+# convert the promotional_price and current_price to float (20.2300.123 VND,d $,...)
+def clean_price_string(price_str):
+    if not isinstance(price_str, str):
+        return 0.0
+    
+    try:
+        # Remove currency symbols and formatting characters
+        cleaned = price_str.replace('VND', '').replace('VNĐ', '').replace('₫', '')
+        cleaned = cleaned.replace('vnd', '').replace('vnđ', '').replace('đ', '')
+        cleaned = cleaned.replace('$', '').replace(' ', '')
+        
+        # Replace comma with empty string if used as thousand separator
+        # Keep only digits - this removes any unexpected characters
+        digits_only = ''.join(c for c in cleaned if c.isdigit())
+        
+        if not digits_only:
+            return 0.0
+            
+        return float(digits_only)
+    except Exception as e:
+        print(f"Error converting price: {price_str}, Error: {e}")
+        return 0.0
+
+
+def clean_prices(result):
+    """Convert the price fields of an extraction result in place and return it."""
+    if not isinstance(result, dict):
+        return result
+    for field in ('promotional_price', 'current_price'):
+        if field in result:
+            result[field] = clean_price_string(result[field])
+    return result
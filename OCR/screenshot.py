@@ -1,13 +1,9 @@
-import selenium.webdriver as webdriver
-from selenium.webdriver.common.by import By
-from selenium.webdriver.common.keys import Keys
 from time import sleep
+import io
 import os
-import OCR.ExtractTxt as ExtractTxt
+from OCR.price_parser import clean_prices
 import time
 from dotenv import load_dotenv
-import os
-import cv2 as cv
 import concurrent.futures
 from itertools import islice
 load_dotenv()
@@ -16,7 +12,21 @@ DriverPath = os.getenv("SELENIUM_DRIVER_PATH")
 chromeOrFirefox = os.getenv("CHROME_OR_FIREFOX")
 
 
-def scrape(url):
+def scrape(url, snapshot=None):
+    """Screenshot url in a headless browser and extract the product data.
+
+    If a dict is passed as snapshot, it receives the preprocessed (grayscale)
+    screenshot as PNG bytes under 'image' and the visible page text under
+    'text', so the page can be archived and extracted again later.
+    """
+    # Selenium, OpenCV and the Gemini client load on the first scrape, not when
+    # the API starts
+    import selenium.webdriver as webdriver
+    from selenium.webdriver.common.by import By
+    from selenium.webdriver.common.keys import Keys
+    import cv2 as cv
+    import numpy as np
+    import OCR.ExtractTxt as ExtractTxt
     print("Scraping URL:", url)
     extension_path = "/mnt/01DB783D25219E60/HOMEWORK/ThucTap/CaoGia/OCR/uBlock.signed.xpi"
     webDriverPath = DriverPath
@@ -63,6 +73,7 @@ def scrape(url):
         # options.add_argument("--height=768")
         driver = webdriver.Firefox(service=Service(webDriverPath), options=options)
         print("Using Firefox WebDriver")
+    responseJson = None
     try:
         driver.install_addon(extension_path, temporary=True)
         driver.get(url)
@@ -76,14 +87,19 @@ def scrape(url):
         except Exception:
             pass
         sleep(1)
-        domain = url.split("//")[-1].split("/")[0]
-        timestamp = str(int(time.time()))
-        driver.save_screenshot(domain+"_"+timestamp+".png")
-        image = cv.imread(domain+"_"+timestamp+".png")
+        # Kept in memory: concurrent scrapes of one domain would share a
+        # file name in the working directory and swap their screenshots
+        png = driver.get_screenshot_as_png()
+        image = cv.imdecode(np.frombuffer(png, dtype=np.uint8), cv.IMREAD_COLOR)
         gray = cv.cvtColor(image, cv.COLOR_BGR2GRAY)
-        cv.imwrite(domain+"_"+timestamp+".png", gray)
-        responseJson= ExtractTxt.Extract(domain+"_"+timestamp+".png")
-        os.remove(domain+"_"+timestamp+".png")
+        if snapshot is not None:
+            # Lossless, only compressed harder than the copy that is extracted
+            snapshot['image'] = cv.imencode(".png", gray, [cv.IMWRITE_PNG_COMPRESSION, 9])[1].tobytes()
+            try:
+                snapshot['text'] = driver.find_element(By.TAG_NAME, "body").text
+            except Exception:
+                snapshot['text'] = ""
+        responseJson= ExtractTxt.Extract(io.BytesIO(cv.imencode(".png", gray)[1].tobytes()))
         
         
     except Exception as e:
@@ -92,35 +108,8 @@ def scrape(url):
         driver.quit()
         print("Driver closed.")
         
-    # convert the promotional_price and current_price to float (20.2300.123 VND,d $,...)
-    def clean_price_string(price_str):
-        if not isinstance(price_str, str):
-            return 0.0
-        
-        try:
-            # Remove currency symbols and formatting characters
-            cleaned = price_str.replace('VND', '').replace('VNĐ', '').replace('₫', '')
-            cleaned = cleaned.replace('vnd', '').replace('vnđ', '').replace('đ', '')
-            cleaned = cleaned.replace('$', '').replace(' ', '')
-            
-            # Replace comma with empty string if used as thousand separator
-            # Keep only digits - this removes any unexpected characters
-            digits_only = ''.join(c for c in cleaned if c.isdigit())
-            
-            if not digits_only:
-                return 0.0
-                
-            return float(digits_only)
-        except Exception as e:
-            print(f"Error converting price: {price_str}, Error: {e}")
-            return 0.0
-    
     print("Response JSON:", responseJson)
-    if 'promotional_price' in responseJson:
-        responseJson['promotional_price'] = clean_price_string(responseJson['promotional_price'])
-    if 'current_price' in responseJson:
-        responseJson['current_price'] = clean_price_string(responseJson['current_price'])
-    return responseJson
+    return clean_prices(responseJson)
 
 
 def process_urls_in_batches(urls, batch_size=3):
@@ -1,17 +1,14 @@
 from NewApp import create_app
-from apscheduler.schedulers.background import BackgroundScheduler
-from NewApp.routes.reminder_routes import check_reminders
+from NewApp.scheduler import start_scheduler
 from dotenv import load_dotenv
 import os
 load_dotenv()
 
-intervalMailSend = os.getenv("Interval_Mail_Sent", "1") 
 app = create_app()
-scheduler = BackgroundScheduler()
 
 
 if __name__ == '__main__':
-    with app.app_context():
-        scheduler.add_job(check_reminders, 'interval', minutes=intervalMailSend, args=[app])  # Pass app to the job
-        scheduler.start()
-        app.run(debug=True)
\ No newline at end of file
+    # The debug reloader runs this twice; only the serving child process runs jobs
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_scheduler(app)
+    app.run(debug=True)
@@ -0,0 +1,62 @@
+"""Product search latency as the catalog grows: the search index against the
+previous name/SKU ILIKE '%term%' scan.
+
+Builds catalogs of generated products in an in-memory SQLite database (no
+MySQL needed), imported through the bulk import so they are indexed, and
+times a few searches on each.
+
+    python benchmarks/bench_search.py [sizes] [repeat]
+    python benchmarks/bench_search.py 1000,10000,100000 20
+"""
+import os
+import random
+import sys
+import timeit
+
+os.environ.update(DB_TYPE='sqlite', DB_NAME='', SCHEDULER_ENABLED='False')
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from NewApp import create_app, db
+from NewApp.bulk_import import import_products
+from NewApp.models import Product
+from NewApp.search import search_products
+
+BRANDS = ['Samsung', 'Apple', 'Xiaomi', 'Oppo', 'Vivo', 'Realme', 'Nokia', 'Asus', 'Lenovo', 'Sony']
+KINDS = ['Điện thoại', 'Máy tính bảng', 'Tai nghe', 'Sạc nhanh', 'Ốp lưng', 'Đồng hồ thông minh']
+SERIES = ['Galaxy', 'Note', 'Pro', 'Max', 'Ultra', 'Lite', 'Plus', 'Mini']
+QUERIES = ['galaxy ultra', 'dien thoai samsung', 'tai ng', 'sku-12345']
+
+
+def generate(count, start):
+    rng = random.Random(start)
+    return [{
+        'name': f'{rng.choice(KINDS)} {rng.choice(BRANDS)} {rng.choice(SERIES)} {rng.randint(1, 99)} {rng.choice([64, 128, 256])}GB',
+        'sku': f'SKU-{start + i}',
+    } for i in range(count)]
+
+
+def ilike(query):
+    pattern = f'%{query}%'
+    return Product.query.filter(Product.name.ilike(pattern) | Product.sku.ilike(pattern)).limit(10).all()
+
+
+def main():
+    sizes = [int(size) for size in (sys.argv[1] if len(sys.argv) > 1 else '1000,10000,50000').split(',')]
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        print(f'{"products":>9} {"query":<22} {"ILIKE ms":>9} {"index ms":>9}')
+        loaded = 0
+        for size in sizes:
+            import_products(generate(size - loaded, loaded))
+            db.session.commit()
+            loaded = size
+            for query in QUERIES:
+                scan = min(timeit.repeat(lambda: ilike(query), number=1, repeat=repeat))
+                indexed = min(timeit.repeat(lambda: search_products(query, 10), number=1, repeat=repeat))
+                print(f'{size:9d} {query:<22} {scan * 1000:9.2f} {indexed * 1000:9.2f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,89 @@
+"""Micro-benchmark of the compiled serializers in NewApp/serializers.py.
+
+Compares, for a list of crawl logs:
+  - flask-restx marshal + json.dumps (the previous response path) against
+    model_serializer + serializers.dumps
+  - the previous reflective to_dict against the row_serializer based one
+
+No database is needed; the logs are built in memory.
+
+    python benchmarks/bench_serialization.py [rows] [repeat]
+"""
+import datetime
+import json
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from flask_restx import marshal
+from NewApp.models import CrawlPayload, ProductCrawlLog
+from NewApp.routes.product_crawl_log_routes import product_crawl_log_output_model
+from NewApp.serializers import dumps, model_serializer, orjson
+
+
+def build_logs(rows):
+    digest, compressed, size = CrawlPayload.encode({
+        'product_name': 'Sample Product 256GB',
+        'current_price': 21990000,
+        'skus': [{'version': '256GB', 'price': '21.990.000', 'sku_id': 'A1'}],
+        'out_of_stock': False,
+    })
+    payload = CrawlPayload(hash=digest, data_compressed=compressed, size=size)
+    start = datetime.datetime(2025, 1, 1)
+    return [
+        ProductCrawlLog(
+            id=i,
+            product_crawl_id=i % 50,
+            name='Sample Product 256GB',
+            price=21990000 + i,
+            timestamp=start + datetime.timedelta(minutes=i),
+            last_seen_at=start + datetime.timedelta(minutes=i),
+            observation_count=1,
+            payload=payload,
+        )
+        for i in range(rows)
+    ]
+
+
+def reflective_to_dict(log):
+    # ProductCrawlLog.to_dict before the compiled projections
+    result = {c.name: getattr(log, c.name) for c in log.__table__.columns}
+    del result['payload_id']
+    result['other_data'] = log.other_data
+    if 'price' in result and result['price'] is not None:
+        result['price'] = float(result['price'])
+    for name in ('timestamp', 'last_seen_at'):
+        if result.get(name) is not None:
+            result[name] = result[name].isoformat()
+    return result
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    repeat = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+    logs = build_logs(rows)
+    serialize = model_serializer(product_crawl_log_output_model)
+
+    assert json.loads(json.dumps(marshal(logs, product_crawl_log_output_model))) == json.loads(
+        dumps([serialize(log) for log in logs])
+    )
+
+    cases = [
+        ('marshal + json.dumps', lambda: json.dumps(marshal(logs, product_crawl_log_output_model))),
+        ('model_serializer + dumps', lambda: dumps([serialize(log) for log in logs])),
+        ('reflective to_dict', lambda: [reflective_to_dict(log) for log in logs]),
+        ('row_serializer to_dict', lambda: [log.to_dict(include_relationships=False) for log in logs]),
+    ]
+    print(f"{rows} crawl logs, best of {repeat}, JSON encoder: {'orjson' if orjson else 'json'}")
+    results = {}
+    for name, func in cases:
+        results[name] = min(timeit.repeat(func, number=1, repeat=repeat))
+        print(f"  {name:<26} {results[name] * 1000:9.1f} ms")
+    print(f"  response speedup: {results['marshal + json.dumps'] / results['model_serializer + dumps']:.1f}x")
+    print(f"  to_dict speedup:  {results['reflective to_dict'] / results['row_serializer to_dict']:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
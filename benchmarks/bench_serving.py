@@ -0,0 +1,120 @@
+"""Request throughput of the dev server (python app.py) against gunicorn.
+
+Starts the chosen server on a free local port, sends GET requests to one
+endpoint from concurrent client threads for a fixed time and reports
+requests per second and latency percentiles. Uses the database of .env;
+set HTTP_CACHE_TTL_SECONDS=0 to measure uncached responses.
+
+    python benchmarks/bench_serving.py dev
+    python benchmarks/bench_serving.py gunicorn --workers 4
+    python benchmarks/bench_serving.py both --path /api/product-crawls/?limit=50 --concurrency 32
+
+Run the client on another machine (or pin it to other cores) for numbers
+that are not limited by the client itself.
+"""
+import argparse
+import concurrent.futures
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+# Same server as `python app.py`, without the reloader process
+DEV_SERVER = (
+    'import sys; sys.path.insert(0, {root!r}); from app import app; '
+    'app.run(host="127.0.0.1", port={port}, debug=True, use_reloader=False)'
+)
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def start_server(kind, port, workers, threads):
+    env = dict(os.environ, SCHEDULER_ENABLED='False')
+    if kind == 'dev':
+        command = [sys.executable, '-c', DEV_SERVER.format(root=ROOT, port=port)]
+    else:
+        command = [
+            sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}',
+            '--workers', str(workers), '--threads', str(threads), '--access-logfile', os.devnull, 'wsgi:app',
+        ]
+    return subprocess.Popen(command, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def wait_ready(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=2).read()
+            return
+        except (urllib.error.URLError, ConnectionError, OSError):
+            time.sleep(0.2)
+    raise RuntimeError(f'Server did not answer {url} within {timeout}s')
+
+
+def load(url, concurrency, duration):
+    deadline = time.monotonic() + duration
+
+    def client():
+        latencies, errors = [], 0
+        while time.monotonic() < deadline:
+            started = time.monotonic()
+            try:
+                urllib.request.urlopen(url, timeout=30).read()
+                latencies.append(time.monotonic() - started)
+            except (urllib.error.URLError, ConnectionError, OSError):
+                errors += 1
+        return latencies, errors
+
+    with concurrent.futures.ThreadPoolExecutor(concurrency) as executor:
+        results = list(executor.map(lambda _: client(), range(concurrency)))
+    latencies = sorted(latency for result, _ in results for latency in result)
+    return latencies, sum(errors for _, errors in results)
+
+
+def run(kind, args):
+    port = free_port()
+    url = f'http://127.0.0.1:{port}{args.path}'
+    server = start_server(kind, port, args.workers, args.threads)
+    try:
+        wait_ready(url)
+        load(url, args.concurrency, min(2, args.duration))  # warm-up
+        latencies, errors = load(url, args.concurrency, args.duration)
+    finally:
+        server.terminate()
+        server.wait()
+    label = 'dev server' if kind == 'dev' else f'gunicorn {args.workers}x{args.threads}'
+    if not latencies:
+        print(f'{label:<18} no successful requests ({errors} errors)')
+        return
+    percentile = lambda p: latencies[min(len(latencies) - 1, int(len(latencies) * p))] * 1000
+    print(f'{label:<18} {len(latencies) / args.duration:9.1f} req/s  '
+          f'p50 {statistics.median(latencies) * 1000:7.1f} ms  p95 {percentile(0.95):7.1f} ms  '
+          f'p99 {percentile(0.99):7.1f} ms  errors {errors}')
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('server', choices=('dev', 'gunicorn', 'both'))
+    parser.add_argument('--path', default='/api/enemies/')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=10)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() * 2 + 1)
+    parser.add_argument('--threads', type=int, default=4)
+    args = parser.parse_args()
+    print(f'GET {args.path}, {args.concurrency} concurrent clients, {args.duration:g}s, {os.cpu_count()} CPUs')
+    for kind in (('dev', 'gunicorn') if args.server == 'both' else (args.server,)):
+        run(kind, args)
+
+
+if __name__ == '__main__':
+    main()
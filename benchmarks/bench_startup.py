@@ -0,0 +1,74 @@
+"""Startup time of the application: create_app() and the imports behind it.
+
+Runs `python -X importtime` in fresh processes that import NewApp and call
+create_app(), and reports the wall time, the import time per top-level
+package and the slowest single modules. It also lists which heavy crawl
+dependencies (Selenium, OpenCV, Gemini, PIL) were loaded; a process that
+only serves the API should load none of them. Uses the database of .env,
+but does not connect to it.
+
+    python benchmarks/bench_startup.py [runs] [top]
+"""
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+HEAVY_MODULES = ('selenium', 'cv2', 'google.generativeai', 'PIL')
+
+STARTUP = (
+    'import sys, time; sys.path.insert(0, {root!r}); started = time.perf_counter(); '
+    'from NewApp import create_app; create_app(); '
+    'print(time.perf_counter() - started); '
+    'print(",".join(m for m in {heavy!r} if m in sys.modules))'
+)
+
+
+def measure():
+    """One fresh process: (seconds, heavy modules loaded, [(module, self_us, cumulative_us)])."""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', STARTUP.format(root=ROOT, heavy=HEAVY_MODULES)],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f'create_app() failed:\n{result.stderr[-2000:]}')
+    seconds, heavy = result.stdout.splitlines()[-2:]
+    imports = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        own, cumulative, module = line[len('import time:'):].split('|')
+        imports.append((module.strip(), int(own), int(cumulative)))
+    return float(seconds), [m for m in heavy.split(',') if m], imports
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    top = int(sys.argv[2]) if len(sys.argv) > 2 else 15
+    samples = [measure() for _ in range(runs)]
+    seconds = [sample[0] for sample in samples]
+    _, heavy, imports = samples[-1]
+
+    by_package = {}
+    for module, own, _ in imports:
+        package = module.split('.')[0]
+        by_package[package] = by_package.get(package, 0) + own
+    total = sum(by_package.values())
+
+    print(f'create_app() in a fresh process: median {statistics.median(seconds) * 1000:.0f} ms, '
+          f'min {min(seconds) * 1000:.0f} ms over {runs} runs')
+    print(f'imports: {len(imports)} modules, {total / 1000:.0f} ms')
+    print(f'heavy crawl dependencies loaded: {", ".join(heavy) or "none"}')
+    print(f'\n{"package":<28} {"self ms":>9}')
+    for package, own in sorted(by_package.items(), key=lambda item: -item[1])[:top]:
+        print(f'{package:<28} {own / 1000:9.1f}')
+    print(f'\n{"module":<48} {"cumulative ms":>14}')
+    for module, _, cumulative in sorted(imports, key=lambda item: -item[2])[:top]:
+        print(f'{module:<48} {cumulative / 1000:14.1f}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,15 @@
+# gunicorn -c gunicorn.conf.py wsgi:app
+import multiprocessing
+import os
+from dotenv import load_dotenv
+
+load_dotenv()
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WEB_CONCURRENCY', multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+# Single-link crawls block for a full browser + LLM cycle
+timeout = int(os.getenv('GUNICORN_TIMEOUT', 300))
+# Each worker creates its app, scheduler and election thread after the fork
+preload_app = False
+accesslog = '-'
@@ -0,0 +1,30 @@
+"""cache generations
+
+Revision ID: 0b7d9f1a3c5e
+Revises: f6c8e0a2b4d5
+Create Date: 2026-10-19 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0b7d9f1a3c5e'
+down_revision = 'f6c8e0a2b4d5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'cache_generations',
+        sa.Column('tag', sa.String(length=64), nullable=False),
+        sa.Column('generation', sa.Integer(), nullable=False),
+        sa.Column('changed_at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('tag'),
+    )
+
+
+def downgrade():
+    op.drop_table('cache_generations')
@@ -0,0 +1,71 @@
+"""initial schema
+
+Revision ID: 3f1a9c2b7d10
+Revises: 
+Create Date: 2026-10-19 09:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3f1a9c2b7d10'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'products',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('sku', sa.String(length=100), nullable=True),
+        sa.Column('link', sa.Text(), nullable=True),
+        sa.Column('org_price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('cur_price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.Column('reminder_email', sa.String(length=255), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'enemies',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('domain', sa.String(length=255), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'product_crawls',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('prod_id', sa.Integer(), nullable=False),
+        sa.Column('enemy_id', sa.Integer(), nullable=False),
+        sa.Column('link', sa.Text(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.Column('updated_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['enemy_id'], ['enemies.id'], ondelete='CASCADE'),
+        sa.ForeignKeyConstraint(['prod_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_table(
+        'product_crawl_logs',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('product_crawl_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=255), nullable=False),
+        sa.Column('price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('timestamp', sa.DateTime(), nullable=True),
+        sa.Column('other_data', sa.JSON(), nullable=True),
+        sa.ForeignKeyConstraint(['product_crawl_id'], ['product_crawls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+
+
+def downgrade():
+    op.drop_table('product_crawl_logs')
+    op.drop_table('product_crawls')
+    op.drop_table('enemies')
+    op.drop_table('products')
@@ -0,0 +1,53 @@
+"""link hash column and lookup indexes
+
+Revision ID: 8b2e4d6f0a31
+Revises: 3f1a9c2b7d10
+Create Date: 2026-10-19 09:30:00.000000
+
+"""
+import hashlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8b2e4d6f0a31'
+down_revision = '3f1a9c2b7d10'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('product_crawls', sa.Column('link_hash', sa.CHAR(length=64), nullable=True))
+
+    # Backfill the hash for existing rows before making the column required
+    conn = op.get_bind()
+    product_crawls = sa.table(
+        'product_crawls',
+        sa.column('id', sa.Integer),
+        sa.column('link', sa.Text),
+        sa.column('link_hash', sa.CHAR),
+    )
+    rows = conn.execute(sa.select(product_crawls.c.id, product_crawls.c.link)).fetchall()
+    for row in rows:
+        conn.execute(
+            product_crawls.update()
+            .where(product_crawls.c.id == row.id)
+            .values(link_hash=hashlib.sha256(row.link.encode('utf-8')).hexdigest())
+        )
+
+    with op.batch_alter_table('product_crawls') as batch_op:
+        batch_op.alter_column('link_hash', existing_type=sa.CHAR(length=64), nullable=False)
+        batch_op.create_index('ix_product_crawls_link_hash', ['link_hash'])
+
+    op.create_index('ix_product_crawl_logs_crawl_timestamp', 'product_crawl_logs', ['product_crawl_id', 'timestamp'])
+    op.create_index('ix_enemies_domain', 'enemies', ['domain'])
+
+
+def downgrade():
+    op.drop_index('ix_enemies_domain', table_name='enemies')
+    op.drop_index('ix_product_crawl_logs_crawl_timestamp', table_name='product_crawl_logs')
+    with op.batch_alter_table('product_crawls') as batch_op:
+        batch_op.drop_index('ix_product_crawls_link_hash')
+        batch_op.drop_column('link_hash')
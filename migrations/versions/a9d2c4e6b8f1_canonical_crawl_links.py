@@ -0,0 +1,95 @@
+"""canonical crawl links
+
+Revision ID: a9d2c4e6b8f1
+Revises: f5c1a7e3d9b2
+Create Date: 2026-10-19 13:00:00.000000
+
+"""
+import hashlib
+import os
+from urllib.parse import unquote_plus, urlsplit, urlunsplit
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a9d2c4e6b8f1'
+down_revision = 'f5c1a7e3d9b2'
+branch_labels = None
+depends_on = None
+
+
+# Canonicalization as of this revision, copied from NewApp/urls.py so later
+# changes to the application do not change what this migration computes
+TRACKING_PARAMS = (
+    'utm_*', 'gclid', 'gclsrc', 'gbraid', 'wbraid', 'dclid', 'gad_source', 'srsltid', '_gl',
+    'fbclid', 'msclkid', 'yclid', 'ttclid', 'zarsrc', 'mc_cid', 'mc_eid', '_hsenc', '_hsmi',
+)
+DEFAULT_PORTS = {'http': 80, 'https': 443}
+
+
+def canonicalize_url(link, exact, prefixes):
+    link = link.strip()
+    try:
+        parts = urlsplit(link)
+        port = parts.port
+    except ValueError:
+        return link
+    scheme = parts.scheme.lower()
+    if scheme not in DEFAULT_PORTS or not parts.hostname:
+        return link
+
+    netloc = parts.hostname.rstrip('.')
+    if ':' in netloc:
+        netloc = f'[{netloc}]'
+    if port is not None and port != DEFAULT_PORTS[scheme]:
+        netloc = f'{netloc}:{port}'
+    if parts.username is not None:
+        userinfo = parts.username + (f':{parts.password}' if parts.password is not None else '')
+        netloc = f'{userinfo}@{netloc}'
+
+    path = parts.path.rstrip('/') or '/'
+
+    def is_tracking(param):
+        key = unquote_plus(param.split('=', 1)[0]).lower()
+        return key in exact or key.startswith(prefixes)
+
+    query = '&'.join(sorted(param for param in parts.query.split('&') if param and not is_tracking(param)))
+    return urlunsplit((scheme, netloc, path, query, ''))
+
+
+def upgrade():
+    # Rewrite stored links in canonical form and rehash them, so lookups of
+    # any variant of a link find the existing row
+    conn = op.get_bind()
+    product_crawls = sa.table(
+        'product_crawls',
+        sa.column('id', sa.Integer),
+        sa.column('link', sa.Text),
+        sa.column('link_hash', sa.CHAR),
+    )
+    # URL_TRACKING_PARAMS is deployment configuration and applies as it does in the app
+    value = os.getenv('URL_TRACKING_PARAMS')
+    names = TRACKING_PARAMS if value is None else [name.strip() for name in value.split(',')]
+    names = [name.lower() for name in names if name]
+    exact = frozenset(name for name in names if not name.endswith('*'))
+    prefixes = tuple(name[:-1] for name in names if name.endswith('*'))
+
+    rows = conn.execute(sa.select(product_crawls.c.id, product_crawls.c.link)).fetchall()
+    for row in rows:
+        if row.link is None:
+            continue
+        link = canonicalize_url(row.link, exact, prefixes)
+        if link == row.link:
+            continue
+        conn.execute(
+            product_crawls.update()
+            .where(product_crawls.c.id == row.id)
+            .values(link=link, link_hash=hashlib.sha256(link.encode('utf-8')).hexdigest())
+        )
+
+
+def downgrade():
+    # The original spellings of the links are not kept; canonical links stay valid
+    pass
@@ -0,0 +1,30 @@
+"""adaptive crawl schedule
+
+Revision ID: b3e5f7a9c1d4
+Revises: a9d2c4e6b8f1
+Create Date: 2026-10-19 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b3e5f7a9c1d4'
+down_revision = 'a9d2c4e6b8f1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product_crawls') as batch_op:
+        batch_op.add_column(sa.Column('crawl_interval_minutes', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('next_crawl_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_product_crawls_next_crawl_at', ['next_crawl_at'])
+
+
+def downgrade():
+    with op.batch_alter_table('product_crawls') as batch_op:
+        batch_op.drop_index('ix_product_crawls_next_crawl_at')
+        batch_op.drop_column('next_crawl_at')
+        batch_op.drop_column('crawl_interval_minutes')
@@ -0,0 +1,41 @@
+"""crawl log rollups
+
+Revision ID: c4d8e1a2b5f7
+Revises: 8b2e4d6f0a31
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c4d8e1a2b5f7'
+down_revision = '8b2e4d6f0a31'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'product_crawl_log_rollups',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('product_crawl_id', sa.Integer(), nullable=False),
+        sa.Column('granularity', sa.String(length=10), nullable=False),
+        sa.Column('bucket_start', sa.DateTime(), nullable=False),
+        sa.Column('first_at', sa.DateTime(), nullable=False),
+        sa.Column('last_at', sa.DateTime(), nullable=False),
+        sa.Column('first_price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('last_price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('min_price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('max_price', sa.Numeric(precision=12, scale=2), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('last_name', sa.String(length=255), nullable=True),
+        sa.ForeignKeyConstraint(['product_crawl_id'], ['product_crawls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('product_crawl_id', 'granularity', 'bucket_start', name='uq_product_crawl_log_rollups_bucket')
+    )
+
+
+def downgrade():
+    op.drop_table('product_crawl_log_rollups')
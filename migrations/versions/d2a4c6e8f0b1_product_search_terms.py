@@ -0,0 +1,61 @@
+"""product search terms
+
+Revision ID: d2a4c6e8f0b1
+Revises: c8f1d3b5e7a2
+Create Date: 2026-10-19 16:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from NewApp.search import product_terms
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a4c6e8f0b1'
+down_revision = 'c8f1d3b5e7a2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'product_search_terms',
+        sa.Column('term', sa.String(length=32), nullable=False),
+        sa.Column('product_id', sa.Integer(), nullable=False),
+        sa.Column('weight', sa.SmallInteger(), nullable=False),
+        sa.ForeignKeyConstraint(['product_id'], ['products.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('term', 'product_id'),
+    )
+    op.create_index('ix_product_search_terms_product_id', 'product_search_terms', ['product_id'], unique=False)
+
+    # Index the existing products
+    conn = op.get_bind()
+    products = sa.table('products', sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('sku', sa.String))
+    search_terms = sa.table(
+        'product_search_terms',
+        sa.column('term', sa.String),
+        sa.column('product_id', sa.Integer),
+        sa.column('weight', sa.SmallInteger),
+    )
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(products.c.id, products.c.name, products.c.sku)
+            .where(products.c.id > last_id).order_by(products.c.id).limit(1000)
+        ).fetchall()
+        if not rows:
+            break
+        terms = [
+            {'term': term, 'product_id': row.id, 'weight': weight}
+            for row in rows
+            for term, weight in product_terms(row.name, row.sku).items()
+        ]
+        if terms:
+            conn.execute(search_terms.insert(), terms)
+        last_id = rows[-1].id
+
+
+def downgrade():
+    op.drop_index('ix_product_search_terms_product_id', table_name='product_search_terms')
+    op.drop_table('product_search_terms')
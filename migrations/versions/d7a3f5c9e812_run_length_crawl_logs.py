@@ -0,0 +1,29 @@
+"""run-length crawl logs
+
+Revision ID: d7a3f5c9e812
+Revises: c4d8e1a2b5f7
+Create Date: 2026-10-19 10:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a3f5c9e812'
+down_revision = 'c4d8e1a2b5f7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product_crawl_logs') as batch_op:
+        batch_op.add_column(sa.Column('last_seen_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('observation_count', sa.Integer(), nullable=False, server_default='1'))
+    op.execute('UPDATE product_crawl_logs SET last_seen_at = timestamp')
+
+
+def downgrade():
+    with op.batch_alter_table('product_crawl_logs') as batch_op:
+        batch_op.drop_column('observation_count')
+        batch_op.drop_column('last_seen_at')
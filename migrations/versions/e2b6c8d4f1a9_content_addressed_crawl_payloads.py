@@ -0,0 +1,109 @@
+"""content-addressed crawl payloads
+
+Revision ID: e2b6c8d4f1a9
+Revises: d7a3f5c9e812
+Create Date: 2026-10-19 11:00:00.000000
+
+"""
+import hashlib
+import json
+import zlib
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6c8d4f1a9'
+down_revision = 'd7a3f5c9e812'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 1000
+
+crawl_payloads = sa.Table(
+    'crawl_payloads',
+    sa.MetaData(),
+    sa.Column('id', sa.Integer, primary_key=True),
+    sa.Column('hash', sa.CHAR(64)),
+    sa.Column('data_compressed', sa.LargeBinary),
+    sa.Column('size', sa.Integer),
+    sa.Column('created_at', sa.DateTime),
+)
+
+
+def _encode(data):
+    canonical = json.dumps(data, sort_keys=True, separators=(',', ':'), ensure_ascii=False)
+    raw = json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return hashlib.sha256(canonical.encode('utf-8')).hexdigest(), zlib.compress(raw), len(raw)
+
+
+def upgrade():
+    op.create_table(
+        'crawl_payloads',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('hash', sa.CHAR(length=64), nullable=False),
+        sa.Column('data_compressed', sa.LargeBinary(length=16777215), nullable=False),
+        sa.Column('size', sa.Integer(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('hash')
+    )
+    with op.batch_alter_table('product_crawl_logs') as batch_op:
+        batch_op.add_column(sa.Column('payload_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_product_crawl_logs_payload_id', 'crawl_payloads', ['payload_id'], ['id'])
+
+    # Move every other_data document into crawl_payloads, once per distinct content
+    conn = op.get_bind()
+    logs = sa.table(
+        'product_crawl_logs',
+        sa.column('id', sa.Integer),
+        sa.column('other_data', sa.JSON),
+        sa.column('payload_id', sa.Integer),
+    )
+    payload_ids = {}
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            sa.select(logs.c.id, logs.c.other_data)
+            .where(logs.c.id > last_id)
+            .order_by(logs.c.id)
+            .limit(BATCH_SIZE)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            last_id = row.id
+            if row.other_data is None:
+                continue
+            digest, compressed, size = _encode(row.other_data)
+            if digest not in payload_ids:
+                result = conn.execute(crawl_payloads.insert().values(
+                    hash=digest, data_compressed=compressed, size=size, created_at=sa.func.now()
+                ))
+                payload_ids[digest] = result.inserted_primary_key[0]
+            conn.execute(logs.update().where(logs.c.id == row.id).values(payload_id=payload_ids[digest]))
+
+    with op.batch_alter_table('product_crawl_logs') as batch_op:
+        batch_op.drop_column('other_data')
+
+
+def downgrade():
+    with op.batch_alter_table('product_crawl_logs') as batch_op:
+        batch_op.add_column(sa.Column('other_data', sa.JSON(), nullable=True))
+
+    conn = op.get_bind()
+    logs = sa.table(
+        'product_crawl_logs',
+        sa.column('id', sa.Integer),
+        sa.column('other_data', sa.JSON),
+        sa.column('payload_id', sa.Integer),
+    )
+    for payload in conn.execute(sa.select(crawl_payloads.c.id, crawl_payloads.c.data_compressed)).fetchall():
+        data = json.loads(zlib.decompress(payload.data_compressed).decode('utf-8'))
+        conn.execute(logs.update().where(logs.c.payload_id == payload.id).values(other_data=data))
+
+    with op.batch_alter_table('product_crawl_logs') as batch_op:
+        batch_op.drop_constraint('fk_product_crawl_logs_payload_id', type_='foreignkey')
+        batch_op.drop_column('payload_id')
+    op.drop_table('crawl_payloads')
@@ -0,0 +1,36 @@
+"""enemy health
+
+Revision ID: e4b6d8f0a2c3
+Revises: d2a4c6e8f0b1
+Create Date: 2026-10-19 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e4b6d8f0a2c3'
+down_revision = 'd2a4c6e8f0b1'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'enemy_health',
+        sa.Column('enemy_id', sa.Integer(), nullable=False),
+        sa.Column('state', sa.String(length=10), nullable=False),
+        sa.Column('consecutive_failures', sa.Integer(), nullable=False),
+        sa.Column('trips', sa.Integer(), nullable=False),
+        sa.Column('open_until', sa.DateTime(), nullable=True),
+        sa.Column('last_error', sa.String(length=255), nullable=True),
+        sa.Column('last_failure_at', sa.DateTime(), nullable=True),
+        sa.Column('last_success_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['enemy_id'], ['enemies.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('enemy_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('enemy_health')
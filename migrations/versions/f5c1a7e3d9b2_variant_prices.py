@@ -0,0 +1,41 @@
+"""variant prices
+
+Revision ID: f5c1a7e3d9b2
+Revises: e2b6c8d4f1a9
+Create Date: 2026-10-19 11:30:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f5c1a7e3d9b2'
+down_revision = 'e2b6c8d4f1a9'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'product_crawl_variant_prices',
+        sa.Column('id', sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column('product_crawl_id', sa.Integer(), nullable=False),
+        sa.Column('log_id', sa.Integer(), nullable=True),
+        sa.Column('variant_type', sa.String(length=10), nullable=False),
+        sa.Column('variant_key', sa.String(length=255), nullable=False),
+        sa.Column('variant_label', sa.String(length=255), nullable=True),
+        sa.Column('price', sa.Numeric(precision=12, scale=2), nullable=False),
+        sa.Column('timestamp', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['log_id'], ['product_crawl_logs.id'], ondelete='SET NULL'),
+        sa.ForeignKeyConstraint(['product_crawl_id'], ['product_crawls.id'], ondelete='CASCADE'),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_variant_prices_key_price', 'product_crawl_variant_prices', ['variant_key', 'price'])
+    op.create_index('ix_variant_prices_crawl_key_timestamp', 'product_crawl_variant_prices', ['product_crawl_id', 'variant_key', 'timestamp'])
+
+
+def downgrade():
+    op.drop_index('ix_variant_prices_crawl_key_timestamp', table_name='product_crawl_variant_prices')
+    op.drop_index('ix_variant_prices_key_price', table_name='product_crawl_variant_prices')
+    op.drop_table('product_crawl_variant_prices')
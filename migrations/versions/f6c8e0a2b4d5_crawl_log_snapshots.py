@@ -0,0 +1,30 @@
+"""crawl log snapshots
+
+Revision ID: f6c8e0a2b4d5
+Revises: e4b6d8f0a2c3
+Create Date: 2026-10-19 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f6c8e0a2b4d5'
+down_revision = 'e4b6d8f0a2c3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('product_crawl_logs', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('snapshot_image_hash', sa.CHAR(length=64), nullable=True))
+        batch_op.add_column(sa.Column('snapshot_text_hash', sa.CHAR(length=64), nullable=True))
+        batch_op.create_index('ix_product_crawl_logs_snapshot_image_hash', ['snapshot_image_hash'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product_crawl_logs', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_crawl_logs_snapshot_image_hash')
+        batch_op.drop_column('snapshot_text_hash')
+        batch_op.drop_column('snapshot_image_hash')
@@ -0,0 +1,12 @@
+"""Production entry point: gunicorn -c gunicorn.conf.py wsgi:app
+
+Every worker serves the API; the one holding the scheduler lease also runs
+the scheduled jobs, and another worker takes over if it goes away.
+"""
+from NewApp import create_app
+from NewApp.leader import start_leader_election
+
+app = create_app()
+
+if app.config['SCHEDULER_ENABLED']:
+    start_leader_election(app)